@@ -4,11 +4,15 @@
 # A class of iir Band Pass Filter
 #
 
-import sys
 import numpy as np
-from matplotlib import pyplot as plt
 from scipy import signal
 
+from iir_block1 import Class_Block_Engine, tdf2_filtering
+from coef_cache1 import coef_cache
+from zero_phase1 import Zero_phase_mixin1
+from parallel1 import Parallel_mixin1
+from streaming1 import Streaming_mixin1
+
 # Check version
 #  Python 3.6.4 on win32 (Windows 10)
 #  numpy 1.14.0 
@@ -16,19 +20,63 @@ from scipy import signal
 #  scipy 1.0.0
 
 
-class Class_BPF(object):
-	def __init__(self, fc=1000, gain=1.0, Q=1.0, sampling_rate=48000):
+def freq_response(b, a, freq, sampling_rate=48000, phase=False, group_delay=False):
+	# frequency response of iir filter(s) at arbitrary frequencies, in one numpy call
+	# b, a: shape (n,) one filter, or shape (F, n) one filter per row (as Class_BPF_bank b, a)
+	# freq: frequency array by unit is [Hz]
+	# return amp (magnitude), and phase [rad], group delay [sample] if they are requested.
+	# shape of each is b.shape[:-1] + freq.shape
+	b= np.asarray(b, dtype=np.float64)
+	a= np.asarray(a, dtype=np.float64)
+	freq= np.asarray(freq, dtype=np.float64)
+	f= freq / sampling_rate
+	n= max(b.shape[-1], a.shape[-1])
+	k= np.arange(n)
+	e= np.exp(-2j * np.pi * f[..., None] * k)  # shape freq.shape + (n,), exp(-j w k)
+	e= e.reshape(-1, n)
+	yi= np.dot(b, e[:, :b.shape[-1]].T)
+	yb= np.dot(a, e[:, :a.shape[-1]].T)
+	val= yi/yb
+	shape= b.shape[:-1] + freq.shape
+	result= [np.abs(val).reshape(shape)]
+	if phase:
+		result.append(np.angle(val).reshape(shape))
+	if group_delay:
+		# group delay of polynomial p is Re( sum(k p[k] exp(-j w k)) / sum(p[k] exp(-j w k)) )
+		dyi= np.dot(b * k[:b.shape[-1]], e[:, :b.shape[-1]].T)
+		dyb= np.dot(a * k[:a.shape[-1]], e[:, :a.shape[-1]].T)
+		with np.errstate(divide='ignore', invalid='ignore'):
+			gd= (dyi / yi).real - (dyb / yb).real
+		result.append(gd.reshape(shape))
+	if len(result) == 1:
+		return result[0]
+	return tuple(result)
+
+def log_bands(freq_low=100, freq_high=7500, Band_num=256):
+	# Log scale frequecny list, from freq_low to freq_high, Band_num+1 points
+	fcl=freq_low * 1.0    # convert to float
+	fch=freq_high * 1.0   # convert to float
+	delta1=np.power(fch/fcl, 1.0 / (Band_num)) # Log Scale
+	return fcl * np.power(delta1, np.arange(Band_num+1))
+
+
+class Class_BPF(Zero_phase_mixin1, Parallel_mixin1, Streaming_mixin1):
+	def __init__(self, fc=1000, gain=1.0, Q=1.0, sampling_rate=48000, dtype=np.float64):
 		# initalize
+		# dtype of filtering and output: np.float64 or np.float32
 		self.fc= fc # center frequency of Band Pass Filter by unit is [Hz]
 		self.gain= gain # magnification
 		self.Q= Q   # Q factor
 		# check Q
 		if self.Q <= 0.0:
-			print ('error: Q must be > 0')
-			sys.exit()
+			raise ValueError('Q must be > 0, but %s' % self.Q)
 		
 		self.sr= sampling_rate
-		self.a, self.b = self.bpf1()
+		self.dtype= np.dtype(dtype)
+		self.key= ('Class_BPF', self.fc, self.gain, self.Q, self.sr)
+		self.a, self.b = coef_cache.get(self.key, self.bpf1)
+		self.engine= None
+		self.reset()
 		
 	def bpf1(self,):
 		# primary digital filter
@@ -50,11 +98,27 @@ class Class_BPF(object):
 		
 		return  a,b
 		
-	def iir2(self,x):
+	def iir2(self, x, backend='block'):
 		# filtering process
 		# calculate iir filter: x is input, y is output
 		# y[0]= b[0] * x[0]  + b[1] * x[-1] + b[2] * x[-1]
 		# y[0]= y[0] - a[1] * y[-1] - a[2] * y[-1]
+		# backend:
+		#   'block' block state-space engine, fast, same result as filtering() within rounding error
+		#   'tdf2'  direct form II transposed recurrence, one sample per step, vectorized over channels (x shape (..., len))
+		#   'loop'  direct form I double loop of python, x is 1-D
+		if backend == 'block':
+			if self.engine is None:  # engine matrices are large, they are kept by this object only, not in coef_cache
+				self.engine= Class_Block_Engine(self.b, self.a, dtype=self.dtype)
+			x= np.asarray(x, dtype=self.dtype)
+			y, zf = self.engine.filtering(x[..., None, :])
+			return y[..., 0, :]
+		elif backend == 'tdf2':
+			y, zf = tdf2_filtering(self.b, self.a, x)
+			return y
+		elif backend != 'loop':
+			raise ValueError('unknown backend %s' % backend)
+		
 		y= np.zeros(len(x))
 		for n in range(len(x)):
 			for i in range(len(self.b)):
@@ -66,31 +130,21 @@ class Class_BPF(object):
 		return y
 		
 	def fone(self, xw):
-		# calculate one point of frequecny response
-		f= xw / self.sr
-		yi= self.b[0] + self.b[1] * np.exp(-2j * np.pi * f) + self.b[2] * np.exp(-2j * np.pi * 2 * f)
-		yb= self.a[0] + self.a[1] * np.exp(-2j * np.pi * f) + self.a[2] * np.exp(-2j * np.pi * 2 * f)
-		val= yi/yb
-		return np.sqrt(val.real ** 2 + val.imag ** 2)
-
+		# calculate frequecny response (magnitude), xw is one frequency or frequency array
+		return freq_response(self.b, self.a, xw, self.sr)
+		
+	def response(self, freq, phase=False, group_delay=False):
+		# calculate magnitude, and phase [rad], group delay [sample] if requested, for frequency array freq
+		return freq_response(self.b, self.a, freq, self.sr, phase=phase, group_delay=group_delay)
+		
 	def H0(self, freq_low=100, freq_high=7500, Band_num=256):
 		# get Log scale frequecny response, from freq_low to freq_high, Band_num points
-		amp=[]
-		freq=[]
-		bands= np.zeros(Band_num+1)
-		fcl=freq_low * 1.0    # convert to float
-		fch=freq_high * 1.0   # convert to float
-		delta1=np.power(fch/fcl, 1.0 / (Band_num)) # Log Scale
-		bands[0]=fcl
-		#print ("i,band = 0", bands[0])
-		for i in range(1, Band_num+1):
-			bands[i]= bands[i-1] * delta1
-			#print ("i,band =", i, bands[i]) 
-		for f in bands:
-			amp.append(self.fone(f))
+		bands= log_bands(freq_low, freq_high, Band_num)
+		amp= self.fone(bands)
 		return   np.log10(amp) * 20, bands # = amp value, freq list
 		
 	def H0_show(self,freq_low=100, freq_high=7500, Band_num=256):
+		from matplotlib import pyplot as plt
 		# draw frequecny response
 		plt.xlabel('Hz')
 		plt.ylabel('dB')
@@ -100,11 +154,18 @@ class Class_BPF(object):
 		plt.grid()
 		plt.show()
 		
-	def filtering(self, xin):
+	def filtering(self, xin, axis=-1):
 		# filtering process, using scipy
-		return signal.lfilter(self.b, self.a, xin)
+		# multichannel input such as shape (channels, samples) is filtered along axis in one call
+		return signal.lfilter(self.b.astype(self.dtype), self.a.astype(self.dtype), np.asarray(xin, dtype=self.dtype), axis=axis)
+		
+	def tone_detector(self, hop=1024, window='hann'):
+		# per frame magnitude at fc with the same noise bandwidth as this filter, see tone_detect1.py
+		from tone_detect1 import Class_Tone_Detector
+		return Class_Tone_Detector([self.fc], Q=self.Q, hop=hop, sampling_rate=self.sr, window=window, dtype=self.dtype)
 		
 	def f_show(self, worN=1024):
+		from matplotlib import pyplot as plt
 		# draw frequency response, using scipy
 		wlist, fres = signal.freqz(self.b, self.a, worN=worN)
 		
@@ -4,11 +4,13 @@
 # A class of IIR Band Pass Filter Bank
 #
 
-import sys
 import numpy as np
-from matplotlib import pyplot as plt
 from scipy import signal
 
+from iir_block1 import Class_Block_Engine
+from BPF import freq_response, log_bands
+from coef_cache1 import coef_cache
+
 # Check version
 #  Python 3.6.4 on win32 (Windows 10)
 #  numpy 1.14.0 
@@ -16,30 +18,79 @@ from scipy import signal
 #  scipy 1.0.0
 
 
+def constant_Q(bands_per_octave):
+	# Q of which -3dB bandwidth is the spacing of log spaced bands, fc * (2**(1/(2B)) - 2**(-1/(2B)))
+	return 1.0 / (2.0 ** (0.5 / bands_per_octave) - 2.0 ** (-0.5 / bands_per_octave))
+
+
+def bpf1_batch(fc, gain, Q, sampling_rate=48000):
+	# primary digital filter, vectorized version of Class_BPF_bank.bpf1
+	# fc, gain, Q are arrays (or scalars) of same length N
+	# return a, b as shape (N,3) coefficient matrix
+	# the arithmetic is done in the same order as bpf1(), so that each row is bit-for-bit same as bpf1() output.
+	fc, gain, Q = np.broadcast_arrays(np.asarray(fc, dtype=np.float64), np.asarray(gain, dtype=np.float64), np.asarray(Q, dtype=np.float64))
+	fc= fc.ravel()
+	gain= gain.ravel()
+	Q= Q.ravel()
+	
+	a= np.zeros((len(fc),3))
+	b= np.zeros((len(fc),3))
+	
+	wc= 2.0 * np.pi * fc / sampling_rate
+	g0= 2.0 * np.tan( wc/2.0)
+	
+	a[:,0]=   4.0 +  2.0 * g0 / Q +  g0 * g0
+	a[:,1]=  -8.0 + 2.0 * g0 * g0
+	a[:,2]=   4.0 -  2.0 * g0 / Q +  g0 * g0
+	
+	b[:,0]=   2.0 * gain *  g0 / Q
+	b[:,2]=  -2.0 * gain *  g0 / Q
+	
+	a0= a[:,0:1].copy()
+	b /= a0
+	a /= a0
+	
+	return  a,b
+
+
 class Class_BPF_bank(object):
-	def __init__(self, fbase=100.0, fstep=10.0, fband=5, gain=1.0, Q=10.0, sampling_rate=48000):
+	def __init__(self, fbase=100.0, fstep=10.0, fband=5, gain=1.0, Q=10.0, sampling_rate=48000, dtype=np.float64, bands_per_octave=None, backend='iir', n_fft=None, hop=None):
 		# initalize
 		# number of BPF: fband
 		# center frequency of 1st BPF: fbase [Hz] 
 		# frequency step: fstep [Hz]
+		# dtype of filtering and output: np.float64 or np.float32 (half memory, see README about accuracy)
+		# bands_per_octave: if set, center frequencies are log spaced, fbase * 2 ** (i / bands_per_octave), and fstep is not used.
+		#                   with Q= constant_Q(bands_per_octave), the bands are constant Q bands of -3dB bandwidth = spacing
+		# backend of filtering: 'iir' (time domain, block state-space engine)
+		#                   or 'stft' (frequency domain by fft length n_fft and block hop, see BPF_bank_stft1.py), for thousands of bands
+		#                   framewise values (filtering_frames) and streaming (process_block, process_block_frames) are always time domain,
+		#                   the frequency domain estimate of band power is spectral_frames
 		self.fband= fband # number of filter bank
-		self.fc_list= np.linspace(fbase,(fband-1) * fstep + fbase, fband)  # center frequency of Band Pass Filter by unit is [Hz]
+		if bands_per_octave is None:
+			self.fc_list= np.linspace(fbase,(fband-1) * fstep + fbase, fband)  # center frequency of Band Pass Filter by unit is [Hz]
+		else:
+			self.fc_list= fbase * 2.0 ** (np.arange(fband) / bands_per_octave)
 		self.gain_list= np.ones(fband) * gain # magnification
 		# check Q
 		if Q <= 0.0:
-			print ('error: Q must be > 0')
-			sys.exit()
+			raise ValueError('Q must be > 0, but %s' % Q)
 		else:
 			self.Q_list= np.ones(fband) * Q   # Q factor
 		
 		self.sr= sampling_rate
+		self.dtype= np.dtype(dtype)
+		if backend not in ('iir', 'stft'):
+			raise ValueError('unknown backend %s' % backend)
+		self.backend= backend
+		self.stft_options= {'n_fft': n_fft, 'hop': hop}
 		
-		self.a=np.zeros((fband,3))
-		self.b=np.zeros((fband,3))
-		for i in range( self.fband) :
-			a, b = self.bpf1(self.fc_list[i], self.gain_list[i], self.Q_list[i])
-			self.a[i]=a
-			self.b[i]=b
+		# design all bands in one vectorized pass, same result as calling bpf1() per band
+		self.key= ('Class_BPF_bank', fbase, fstep, fband, gain, Q, self.sr, bands_per_octave)
+		self.a, self.b = coef_cache.get(self.key, lambda: bpf1_batch(self.fc_list, self.gain_list, self.Q_list, self.sr))
+		self.engine= None
+		self.stft= None
+		self.reset()
 		
 	def bpf1(self,fc,gain,Q):
 		# primary digital filter
@@ -61,17 +112,143 @@ class Class_BPF_bank(object):
 		
 		return  a,b
 		
-	def filtering(self, xin):
-		# filtering process, using scipy
-		yout=np.zeros( (self.fband, len(xin)) )
+	def response(self, freq, phase=False, group_delay=False):
+		# calculate magnitude, and phase [rad], group delay [sample] if requested, of all bands for frequency array freq
+		# shape of each output is (fband,) + freq.shape
+		return freq_response(self.b, self.a, freq, self.sr, phase=phase, group_delay=group_delay)
+		
+	def H0(self, freq_low=100, freq_high=7500, Band_num=256):
+		# get Log scale frequecny response of all bands, from freq_low to freq_high, Band_num points
+		bands= log_bands(freq_low, freq_high, Band_num)
+		amp= self.response(bands)
+		return   np.log10(amp) * 20, bands # = amp value shape (fband, Band_num+1), freq list
+		
+	def octave(self,):
+		# octave-decimated multirate implementation of the same bands, see BPF_bank_octave1.py
+		from BPF_bank_octave1 import Class_BPF_bank_octave
+		return Class_BPF_bank_octave(self.fc_list, gain=self.gain_list, Q=self.Q_list, sampling_rate=self.sr, dtype=self.dtype)
+		
+	def get_engine(self,):
+		# block state-space engine of all bands, it is made at first use
+		# the engine matrices grow with bands (and its next levels at first filtering), so they are kept by this object only,
+		# coef_cache holds the coefficients
+		if self.engine is None:
+			self.engine= Class_Block_Engine(self.b, self.a, dtype=self.dtype)
+		return self.engine
+		
+	def get_stft(self,):
+		# frequency domain backend of all bands, it is made at first use
+		if self.stft is None:
+			from BPF_bank_stft1 import Class_BPF_bank_stft
+			self.stft= Class_BPF_bank_stft(self.b, self.a, self.sr, dtype=self.dtype, **self.stft_options)
+		return self.stft
+		
+	def filtering(self, xin, out=None):
+		# filtering process of all bands in one pass
+		# xin shape (samples,) or multichannel (channels, samples)
+		# out: output buffer shape( fband, samples) or (channels, fband, samples) of dtype. if None, it is allocated.
+		if self.backend == 'stft':
+			return self.get_stft().filtering(xin, out=out)
+		yout, zf = self.get_engine().filtering(np.asarray(xin)[..., None, :], out=out)
+		return yout # output yout.shape( fband, len(xin) ) or (channels, fband, samples)
+		
+	def reset(self,):
+		# clear the filter state of process_block and process_block_frames
+		self.zi= None
+		self.frames_state= None
+		
+	def process_block(self, xin, out=None):
+		# streaming filtering process of all bands
+		# the filter state is carried over to the next call, so that
+		# filtering block by block is same as filtering(all blocks at once)
+		yout, self.zi = self.get_engine().filtering(np.asarray(xin)[..., None, :], out=out, zi=self.zi)
+		return yout # output yout.shape( fband, len(xin) ) or (channels, fband, samples)
+		
+	def frames(self, xin, frame=1024, mode='rms', tau=None, state=None, chunk_size=2**20):
+		# filtering of all bands fused with framewise reduction, the full waveform of all bands is not made.
+		# the input is filtered chunk by chunk (about chunk_size output values), and every chunk is reduced to
+		# one value per band and frame of frame samples:
+		#   mode 'rms'       sqrt of mean of y^2
+		#        'peak'      max of abs(y)
+		#        'mean_abs'  mean of abs(y)
+		#        'envelope'  one pole lowpass of abs(y) (time constant tau [sec], default frame/sampling rate),
+		#                    sampled at the last sample of every frame
+		# state: None (start from zero), or the state returned by the previous call (streaming)
+		# the samples after the last full frame are kept in state, and are used at the next call.
+		# return values shape (fband, frames) or (channels, fband, frames), and state
+		if mode not in ('rms', 'peak', 'mean_abs', 'envelope'):
+			raise ValueError('unknown mode %s' % mode)
+		xin= np.asarray(xin, dtype=self.dtype)
+		if state is None:
+			state= {'zi': None, 'pending': xin[..., :0], 'env': None}
+		if state['pending'].shape[-1] > 0:
+			xin= np.concatenate([state['pending'], xin], axis=-1)
+		K= xin.shape[-1] // frame
+		state['pending']= xin[..., K * frame:]
+		lead= xin.shape[:-1] + (self.fband,)
+		values= np.empty(lead + (K,), dtype=self.dtype)
+		
+		if mode == 'envelope':
+			p= np.exp(-1.0 / (frame if tau is None else tau * self.sr))  # pole of one pole lowpass
+			w= ((1.0 - p) * p ** np.arange(frame - 1, -1, -1)).astype(self.dtype)  # weight of abs(y) in the frame
+			if state['env'] is None:
+				state['env']= np.zeros(lead + (1,))
+		
+		engine= self.get_engine()
+		kc= max(1, chunk_size // (int(np.prod(lead)) * frame))  # frames per chunk
+		buf= np.empty(lead + (min(kc, K) * frame,), dtype=self.dtype)
+		for k0 in range(0, K, kc):
+			k1= min(k0 + kc, K)
+			y= buf[..., :(k1 - k0) * frame]
+			y, state['zi'] = engine.filtering(xin[..., None, k0 * frame:k1 * frame], out=y, zi=state['zi'])
+			yr= y.reshape(lead + (k1 - k0, frame))
+			if mode == 'rms':
+				values[..., k0:k1]= np.sqrt(np.einsum('...j,...j->...', yr, yr) / frame)
+			elif mode == 'peak':
+				values[..., k0:k1]= np.maximum(yr.max(axis=-1), -yr.min(axis=-1))
+			else:
+				np.abs(yr, out=yr)
+				if mode == 'mean_abs':
+					values[..., k0:k1]= yr.mean(axis=-1)
+				else:
+					# env[k]= p^frame env[k-1] + sum(w abs(y)), for all frames of the chunk
+					g= np.matmul(yr, w)
+					env, state['env'] = signal.lfilter([1.0], [1.0, -p ** frame], g, axis=-1, zi=state['env'])
+					values[..., k0:k1]= env
+		return values, state
+		
+	def filtering_frames(self, xin, frame=1024, mode='rms', tau=None):
+		# framewise values of all bands, see frames()
+		# xin shape (samples,) or multichannel (channels, samples), the samples after the last full frame are ignored
+		values, state = self.frames(xin, frame=frame, mode=mode, tau=tau)
+		return values # output shape (fband, len(xin) // frame) or (channels, fband, frames)
+		
+	def spectral_frames(self, xin, frame=1024, mode='rms', n_win=None):
+		# band power ('power') or rms ('rms') of every frame, estimated from the power spectrum of the last n_win samples
+		# by the frequency domain backend (see BPF_bank_stft1.py), for banks of hundreds of bands or more.
+		# it is not the rms of the frame of filtering_frames: n_win is longer than frame by default (about the impulse
+		# response of the narrowest band), so every value is smoothed over n_win samples. the mean power over many frames
+		# is the same as the time domain. with n_win=frame, every value is the power of the frame samples only,
+		# but the band skirts are wider by the window resolution (sampling_rate / frame).
+		return self.get_stft().frames(xin, frame=frame, mode=mode, n_win=n_win)
+		
+	def process_block_frames(self, xin, frame=1024, mode='rms', tau=None):
+		# streaming framewise values of all bands, see frames()
+		# the filter state and the samples of unfinished frame are carried over to the next call
+		values, self.frames_state = self.frames(xin, frame=frame, mode=mode, tau=tau, state=self.frames_state)
+		return values
+		
+	def filtering_lfilter(self, xin):
+		# filtering process, using scipy, one lfilter call per band
+		xin= np.asarray(xin, dtype=self.dtype)
+		yout=np.zeros( xin.shape[:-1] + (self.fband, xin.shape[-1]), dtype=self.dtype )
 		for i in range (self.fband):
-			zi= signal.lfilter(self.b[i], self.a[i], np.zeros(len(self.a[i])-1) ) 
-			xout1, zf = signal.lfilter(self.b[i], self.a[i], xin, zi=zi)
-			yout[i]=np.copy(xout1)
+			yout[..., i, :]= signal.lfilter(self.b[i].astype(self.dtype), self.a[i].astype(self.dtype), xin)
 			
 		return yout # output yout.shape( fband, len(xin) )
 		
 	def f_show(self, worN=1024*8):
+		from matplotlib import pyplot as plt
 		# show frequency response, using scipy
 		fig = plt.figure()
 		ax1 = fig.add_subplot(111)
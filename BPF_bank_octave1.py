@@ -0,0 +1,183 @@
+#coding:utf-8
+
+#
+# octave-decimated multirate implementation of IIR Band Pass Filter Bank
+#
+#  the input is decimated by 2 again and again (level j runs at sampling_rate / 2**j), and every band is filtered at
+#  the lowest level of which rate keeps fc <= 0.2 * rate. so one octave of bands runs at each level, and the cost is
+#  about (bands per octave) * samples * (1 + 1/2 + 1/4 + ...), instead of (bands) * samples at the full rate.
+#  before every decimation, an elliptic lowpass (passband 0.175 * rate, stopband from 0.25 * rate, -100dB) removes the
+#  frequencies which would alias. the bands are designed again at the rate of their level (bpf1_batch, same fc), with Q of
+#  which -3dB edges are the same as the full rate design (level_Q), because the bilinear warping is different at the lower rate.
+#  the elliptic lowpass is not linear phase, the delay of lower levels is larger (see group_delay).
+#  output is a list of per level outputs at the level rate, or all bands upsampled to the full rate and advanced by the delay at fc.
+#  the magnitude response is close to the full rate bank, but the waveform is not the same (see filtering).
+
+import numpy as np
+from scipy import signal
+
+from iir_block1 import Class_Block_Engine
+from BPF_bank import bpf1_batch, constant_Q
+from coef_cache1 import coef_cache
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+def octave_lowpass():
+	# anti-alias lowpass of decimation by 2, normalized to nyquist of the rate before decimation
+	return signal.ellip(10, 0.01, 100, 0.35, output='sos')
+
+
+def level_Q(fc, Q, sampling_rate, rate):
+	# Q at rate, of which -3dB edges are the same as bpf1 (fc, Q) at sampling_rate
+	# the edges of bpf1 are at tan(pi f / sr) = r * tan(pi fc / sr),  r - 1/r = +-1/Q
+	fc, Q = np.broadcast_arrays(np.asarray(fc, dtype=np.float64), np.asarray(Q, dtype=np.float64))
+	r2= (1.0 / Q + np.sqrt(1.0 / Q ** 2 + 4.0)) / 2.0
+	t= np.tan(np.pi * fc / sampling_rate)
+	f1= np.arctan(t / r2) * sampling_rate / np.pi
+	f2= np.minimum(np.arctan(t * r2) * sampling_rate / np.pi, 0.499 * rate)
+	return np.tan(np.pi * fc / rate) / (np.tan(np.pi * f2 / rate) - np.tan(np.pi * f1 / rate))
+
+
+class Class_BPF_bank_octave(object):
+	def __init__(self, fc_list, gain=1.0, Q=10.0, sampling_rate=48000, dtype=np.float64, fmax_ratio=0.2, max_level=12):
+		# fc_list: center frequencies [Hz], any spacing, such as Class_BPF_bank(bands_per_octave=...).fc_list
+		# gain, Q: scalar or array of every band
+		# fmax_ratio: a band is filtered at the lowest level of which rate keeps fc <= fmax_ratio * rate
+		# max_level: max number of decimations
+		# dtype: dtype of filtering and output, np.float64 or np.float32
+		self.fc_list= np.asarray(fc_list, dtype=np.float64)
+		self.fband= len(self.fc_list)
+		self.gain_list= np.broadcast_to(np.asarray(gain, dtype=np.float64), (self.fband,))
+		self.Q_list= np.broadcast_to(np.asarray(Q, dtype=np.float64), (self.fband,))
+		if np.any(self.Q_list <= 0.0):
+			raise ValueError('Q must be > 0')
+		if np.any(self.fc_list >= sampling_rate / 2):
+			raise ValueError('center frequency must be < sampling_rate / 2')
+		self.sr= sampling_rate
+		self.dtype= np.dtype(dtype)
+		
+		# level of every band, and rate of every level
+		level= np.floor(np.log2(fmax_ratio * self.sr / self.fc_list)).astype(int)
+		self.band_level= np.clip(level, 0, max_level)
+		self.levels= int(self.band_level.max()) + 1 if self.fband > 0 else 1
+		self.rates= [self.sr / 2 ** j for j in range(self.levels)]
+		self.level_bands= [np.flatnonzero(self.band_level == j) for j in range(self.levels)]  # index of bands in fc_list
+		
+		self.lowpass= coef_cache.get(('octave_lowpass',), octave_lowpass)
+		self.a, self.b, self.engines = [], [], []
+		for j, bands in enumerate(self.level_bands):
+			key= ('Class_BPF_bank_octave', tuple(self.fc_list[bands]), tuple(self.gain_list[bands]), tuple(self.Q_list[bands]), self.rates[j])
+			a, b = coef_cache.get(key, lambda: bpf1_batch(self.fc_list[bands], self.gain_list[bands],
+																level_Q(self.fc_list[bands], self.Q_list[bands], self.sr, self.rates[j]), self.rates[j]))
+			self.a.append(a)
+			self.b.append(b)
+			self.engines.append(Class_Block_Engine(b, a, dtype=self.dtype) if len(bands) else None)  # engines are not cached, see BPF_bank.get_engine
+		self.reset()
+		
+	def reset(self,):
+		# clear the filter state of process_block
+		self.state= None
+		
+	def init_state(self, lead):
+		return {'lp': [np.zeros((len(self.lowpass),) + lead + (2,), dtype=self.dtype) for j in range(self.levels)],  # lowpass state before level j
+				'offset': [0] * self.levels,  # number of samples before level j, for the phase of decimation
+				'zi': [None] * self.levels}
+		
+	def process(self, xin, state):
+		# filtering of all levels, return list of outputs shape (..., bands of level, samples at level rate)
+		x= np.asarray(xin, dtype=self.dtype)
+		if state is None:
+			state= self.init_state(x.shape[:-1])
+		sos= self.lowpass.astype(self.dtype)
+		outs= []
+		u= x
+		for j in range(self.levels):
+			if j > 0:
+				# lowpass and keep samples of even index at the rate of level j-1
+				if u.shape[-1] > 0:  # filtering of empty input returns broken zf
+					u, state['lp'][j] = signal.sosfilt(sos, u, zi=state['lp'][j])
+				skip= state['offset'][j] % 2
+				state['offset'][j] += u.shape[-1]
+				u= u[..., skip::2]
+			if self.engines[j] is None:
+				outs.append(np.zeros(x.shape[:-1] + (0, u.shape[-1]), dtype=self.dtype))
+				continue
+			y, state['zi'][j] = self.engines[j].filtering(u[..., None, :], zi=state['zi'][j])
+			outs.append(y)
+		return outs, state
+		
+	def filtering(self, xin, upsample=False):
+		# filtering process of all bands
+		# xin shape (samples,) or multichannel (channels, samples)
+		# upsample: if False, return list of outputs of every level, shape (..., bands of level, ceil(samples / 2**j)),
+		#           the bands of level j are self.level_bands[j] (index of fc_list).
+		#           if True, every level is upsampled to the full rate (polyphase FIR, resample_poly), and
+		#           return shape (fband, samples) or (channels, fband, samples), same shape as Class_BPF_bank.filtering.
+		#           every band is advanced by the delay of the lowpass cascade at its fc (group_delay, rounded to a sample),
+		#           the input is extended by zeros for that. this removes the bulk delay (hundreds of samples at low bands),
+		#           but the output is close to Class_BPF_bank.filtering in magnitude response only, not in waveform:
+		#           the phase of the lowpass cascade and of the band design at the lower rate differ around fc, and the rms
+		#           difference is 0.2 ... 0.8 of the band output. a fractional delay correction does not reduce it.
+		if not upsample:
+			outs, state = self.process(xin, None)
+			return outs
+		x= np.asarray(xin)
+		n= x.shape[-1]
+		shift= np.round(self.group_delay()).astype(int)  # [samples at the full rate]
+		pad= int(shift.max()) if self.fband > 0 else 0
+		outs, state = self.process(np.concatenate([x, np.zeros(x.shape[:-1] + (pad,), dtype=x.dtype)], axis=-1), None)
+		yout= np.empty(x.shape[:-1] + (self.fband, n), dtype=self.dtype)
+		for j, y in enumerate(outs):
+			if j > 0:
+				y= signal.resample_poly(y, 2 ** j, 1, axis=-1)
+			for i, band in enumerate(self.level_bands[j]):
+				yout[..., band, :]= y[..., i, shift[band]:shift[band] + n]
+		return yout
+		
+	def process_block(self, xin):
+		# streaming filtering process of all bands, list of outputs of every level (see filtering)
+		# the state of lowpass, decimation phase and bands are carried over to the next call
+		outs, self.state = self.process(xin, self.state)
+		return outs
+		
+	def response(self, freq):
+		# magnitude response of every band, including the lowpass of decimations, shape (fband, len(freq))
+		# aliasing (below -100dB) is not included
+		freq= np.asarray(freq, dtype=np.float64)
+		amp= np.empty((self.fband, len(freq)))
+		lp= np.ones(len(freq))
+		for j in range(self.levels):
+			if j > 0:
+				lp= lp * np.abs(signal.sosfreqz(self.lowpass, worN=freq, fs=self.rates[j - 1])[1])
+			for i, band in enumerate(self.level_bands[j]):
+				amp[band]= lp * np.abs(signal.freqz(self.b[j][i], self.a[j][i], worN=freq, fs=self.rates[j])[1])
+		return amp
+		
+	def group_delay(self,):
+		# group delay [samples at the full rate] of the lowpass cascade at every center frequency, shape (fband,)
+		d= np.zeros(self.fband)
+		for j in range(1, self.levels):
+			bands= np.flatnonzero(self.band_level >= j)
+			w, gd = signal.group_delay((signal.sos2tf(self.lowpass)), w=self.fc_list[bands], fs=self.rates[j - 1])
+			d[bands] += gd * 2 ** (j - 1)
+		return d
+		
+	def cost(self,):
+		# relative work per input sample against Class_BPF_bank at the full rate (bands filtering only)
+		return sum(len(self.level_bands[j]) / 2 ** j for j in range(self.levels)) / max(self.fband, 1)
+
+
+if __name__ == '__main__':
+	
+	# 1/3 octave bands from 25Hz
+	B= 3
+	octave_bank= Class_BPF_bank_octave(25.0 * 2.0 ** (np.arange(30) / B), Q=constant_Q(B))
+	for j in range(octave_bank.levels):
+		print ('level', j, 'rate', octave_bank.rates[j], 'bands', np.round(octave_bank.fc_list[octave_bank.level_bands[j]], 1))
+	print ('relative work of band filters', octave_bank.cost())
+	
+#This file uses TAB
@@ -0,0 +1,168 @@
+#coding:utf-8
+
+#
+# FFT (STFT) frequency domain backend of IIR Band Pass Filter Bank, for banks of very many bands
+#
+#  the response of every band H = rfft(b, n_fft) / rfft(a, n_fft) (the response of the b/a matrices at n_fft points)
+#  is applied to the spectrum of the input:
+#  filtering: the input is cut into blocks of hop samples, every block is zero padded to n_fft, multiplied by H,
+#             and the outputs (n_fft samples) are overlap-added. this is linear convolution with the impulse response
+#             aliased at n_fft - hop samples, so the error against the time domain filtering is the impulse response tail
+#             after n_fft - hop samples, about tol of the output scale (n_fft is chosen from the max pole radius).
+#  frames:    power of every band in frames of frame samples, estimated from the power spectrum of the last n_win samples
+#             (hann window) as  sum |H|^2 |X|^2 / (n_win * sum window^2).  all bands are one matrix product per frame,
+#             so the cost is (frames) * (n_win / 2) * (bands), no band output is made.
+#             it is a spectral estimate smoothed over n_win samples: the mean power over many frames is the same as
+#             the time domain filtering, but every frame value is not (see README).
+#  the cost of filtering is about (bands) * samples * 2 * log2(n_fft) per block overlap, independent of Q, except n_fft.
+
+import numpy as np
+
+from iir_block1 import tdf2_state_space
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+def stft_length(b, a, tol=1e-6, max_length=2**22):
+	# number of samples, until the impulse response of all bands decays to tol (by the max pole radius)
+	A= tdf2_state_space(b, a)[0]
+	r= np.max(np.abs(np.linalg.eigvals(A))) if A.shape[-1] else 0.0
+	if r <= 0.0:
+		return 1
+	if r >= 1.0:
+		return max_length
+	return int(min(max_length, np.ceil(np.log(tol) / np.log(r))))
+
+
+class Class_BPF_bank_stft(object):
+	def __init__(self, b, a, sampling_rate=48000, n_fft=None, hop=None, tol=1e-6, dtype=np.float64):
+		# b, a: coefficient matrices of all bands, shape (fband, n), such as Class_BPF_bank b, a
+		# n_fft: fft length. if None, the power of 2 >= 2 * (length of impulse response until tol), at least 256
+		# hop: block size of filtering [samples]. if None, n_fft / 2
+		# dtype: dtype of filtering and output, np.float64 or np.float32
+		self.b= np.atleast_2d(np.asarray(b, dtype=np.float64))
+		self.a= np.atleast_2d(np.asarray(a, dtype=np.float64))
+		self.fband= len(self.b)
+		self.sr= sampling_rate
+		self.dtype= np.dtype(dtype)
+		self.impulse_length= stft_length(self.b, self.a, tol)
+		if n_fft is None:
+			n_fft= max(256, 1 << int(np.ceil(np.log2(2 * self.impulse_length))))
+		self.n_fft= int(n_fft)
+		self.hop= self.n_fft // 2 if hop is None else int(hop)
+		if not 0 < self.hop <= self.n_fft:
+			raise ValueError('hop must be 1 ... n_fft')
+		self.bins= self.n_fft // 2 + 1
+		self.weights= {}  # power weights of frames, per frame length
+		
+	def response(self, bands=slice(None)):
+		# complex response of bands at the rfft bins of n_fft, shape (bands, n_fft / 2 + 1)
+		return np.fft.rfft(self.b[bands], self.n_fft, axis=-1) / np.fft.rfft(self.a[bands], self.n_fft, axis=-1)
+		
+	def band_chunk(self, chunk_size):
+		# number of bands per chunk, for about chunk_size complex values of responses
+		return max(1, min(self.fband, chunk_size // self.bins))
+		
+	def filtering(self, xin, out=None, chunk_size=2**22):
+		# filtering process of all bands by overlap-add
+		# xin shape (samples,) or multichannel (channels, samples)
+		# out: output buffer shape (fband, samples) or (channels, fband, samples) of dtype. if None, it is allocated.
+		# chunk_size: about number of complex values of work arrays
+		x= np.asarray(xin, dtype=self.dtype)
+		lead, n = x.shape[:-1], x.shape[-1]
+		if out is None:
+			out= np.empty(lead + (self.fband, n), dtype=self.dtype)
+		N, hop = self.n_fft, self.hop
+		K= -(-n // hop)  # number of blocks
+		P= -(-N // hop)  # number of blocks one output overlaps
+		xb= np.zeros(lead + (K * hop,), dtype=self.dtype)
+		xb[..., :n]= x
+		X= np.fft.rfft(xb.reshape(lead + (K, hop)), N, axis=-1)  # spectrum of every block
+		ctype= X.dtype
+		bc= self.band_chunk(chunk_size)
+		kc= max(1, chunk_size // (bc * self.bins * max(int(np.prod(lead)), 1)))  # blocks per chunk
+		ext= np.empty(lead + (bc, (K + P) * hop), dtype=self.dtype)
+		for f0 in range(0, self.fband, bc):
+			f1= min(f0 + bc, self.fband)
+			H= self.response(slice(f0, f1)).astype(ctype)[:, None, :]
+			acc= ext[..., :f1 - f0, :]
+			acc[...]= 0.0
+			acc_blocks= acc.reshape(lead + (f1 - f0, K + P, hop))
+			for k0 in range(0, K, kc):
+				k1= min(k0 + kc, K)
+				y= np.fft.irfft(X[..., None, k0:k1, :] * H, N, axis=-1)
+				if P * hop > N:
+					y= np.concatenate([y, np.zeros(y.shape[:-1] + (P * hop - N,), dtype=y.dtype)], axis=-1)
+				y= y.reshape(y.shape[:-1] + (P, hop))
+				for p in range(P):
+					acc_blocks[..., k0 + p:k1 + p, :] += y[..., p, :]
+			out[..., f0:f1, :]= acc[..., :n]
+		return out # output shape (fband, samples) or (channels, fband, samples)
+		
+	def frame_weights(self, n_win):
+		# power weights of all bands, shape (n_win / 2 + 1, fband), and hann window of n_win
+		if n_win not in self.weights:
+			w= np.hanning(n_win + 2)[1:-1]
+			c= np.full(n_win // 2 + 1, 2.0)
+			c[0]= 1.0
+			if n_win % 2 == 0:
+				c[-1]= 1.0
+			H2= np.abs(np.fft.rfft(self.b, n_win, axis=-1) / np.fft.rfft(self.a, n_win, axis=-1)) ** 2
+			G= (H2 * c).T / (n_win * np.sum(w * w))
+			self.weights[n_win]= (G.astype(self.dtype), w.astype(self.dtype))
+		return self.weights[n_win]
+		
+	def frames(self, xin, frame=1024, mode='rms', n_win=None, chunk_size=2**22):
+		# power ('power') or rms ('rms') of all bands in every frame of frame samples
+		# frame k (samples k*frame ... (k+1)*frame-1) is estimated from the n_win samples until its end
+		# (zeros before the start of xin). the samples after the last full frame are ignored
+		# n_win: window length. if None, the power of 2 >= max(frame, impulse_length / 4) (about 3.5 time constants of
+		#        the narrowest band, so the window resolution is about the band width)
+		# return values shape (fband, frames) or (channels, fband, frames)
+		if mode not in ('rms', 'power'):
+			raise ValueError('unknown mode %s, rms or power' % mode)
+		x= np.asarray(xin, dtype=self.dtype)
+		lead= x.shape[:-1]
+		if n_win is None:
+			n_win= 1 << int(np.ceil(np.log2(max(frame, self.impulse_length / 4, 1))))
+		n_win= max(int(n_win), frame)
+		G, w = self.frame_weights(n_win)
+		K= x.shape[-1] // frame
+		xp= np.zeros(lead + (n_win - frame + K * frame,), dtype=self.dtype)
+		xp[..., n_win - frame:]= x[..., :K * frame]
+		segments= np.lib.stride_tricks.sliding_window_view(xp, n_win, axis=-1)[..., ::frame, :]
+		values= np.empty(lead + (self.fband, K), dtype=self.dtype)
+		kc= max(1, chunk_size // ((n_win // 2 + 1) * max(int(np.prod(lead)), 1)))  # frames per chunk
+		for k0 in range(0, K, kc):
+			k1= min(k0 + kc, K)
+			S= np.fft.rfft(segments[..., k0:k1, :] * w, axis=-1)
+			Pxx= (S.real ** 2 + S.imag ** 2).astype(self.dtype)
+			values[..., k0:k1]= np.swapaxes(Pxx @ G, -1, -2)
+		if mode == 'rms':
+			np.sqrt(values, out=values)
+		return values
+		
+	def cost(self,):
+		# number of real multiply-adds per input sample of filtering, all bands (fft as 2.5 n log2 n per real fft)
+		fft= 2.5 * self.n_fft * np.log2(self.n_fft)
+		return (fft + self.fband * (fft + 4 * self.bins + self.n_fft)) / self.hop
+
+
+if __name__ == '__main__':
+	
+	from BPF_bank import Class_BPF_bank
+	# compare with the time domain filtering
+	bank= Class_BPF_bank(fbase=100.0, fstep=10.0, fband=200, Q=10.0)
+	stft= Class_BPF_bank_stft(bank.b, bank.a, bank.sr)
+	x= np.random.RandomState(0).standard_normal(48000 * 2)
+	y0= bank.filtering(x)
+	y1= stft.filtering(x)
+	print ('n_fft', stft.n_fft, 'hop', stft.hop, 'max error / max output %.2e' % (np.max(np.abs(y1 - y0)) / np.max(np.abs(y0))))
+	p0= bank.filtering_frames(x, frame=1024)[:, 10:] ** 2
+	p1= stft.frames(x, frame=1024, mode='power')[:, 10:]
+	print ('mean band power difference max %.3f dB' % np.max(np.abs(10 * np.log10(p1.mean(axis=-1) / p0.mean(axis=-1)))))
+	
+#This file uses TAB
@@ -0,0 +1,43 @@
+#coding:utf-8
+
+#
+# benchmark: Class_BPF_bank filtering throughput vs band count
+#
+#  compares
+#  1: one lfilter call per band (Class_BPF_bank.filtering_lfilter)
+#  2: block state-space engine, all bands in one pass, writing into a caller-supplied buffer (Class_BPF_bank.filtering)
+#  throughput is shown as input samples/s and as band-samples/s (= output values/s).
+
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench_util1 import best_time
+from BPF_bank import Class_BPF_bank
+
+
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='benchmark Class_BPF_bank filtering throughput vs band count')
+    parser.add_argument('--bands', '-n', type=int, nargs='+', default=[1, 10, 100, 300], help='number of bands')
+    parser.add_argument('--seconds', '-t', type=float, default=5.0, help='signal length [sec]')
+    parser.add_argument('--sampling_rate', '-s', type=int, default=48000, help='sampling rate')
+    args = parser.parse_args()
+    
+    sr= args.sampling_rate
+    x= np.random.RandomState(0).standard_normal(int(args.seconds * sr))
+    
+    print ('signal length', len(x), 'samples')
+    for n in args.bands:
+        bank= Class_BPF_bank(fbase=50.0, fstep=(sr * 0.45 - 50.0) / max(n, 1), fband=n, Q=10.0, sampling_rate=sr)
+        bank.get_engine()  # design of engine is not included
+        out= np.empty((n, len(x)))
+        
+        t_loop, y_loop= best_time(lambda: bank.filtering_lfilter(x))
+        t_engine, y_engine= best_time(lambda: bank.filtering(x, out=out))
+        err= np.max(np.abs(y_loop - y_engine))
+        print ('bands %5d  lfilter loop %10.3e samples/s (%9.3e band-samples/s)  engine %10.3e samples/s (%9.3e band-samples/s)  speedup %5.2f  max error %.1e' %
+               (n, len(x) / t_loop, n * len(x) / t_loop, len(x) / t_engine, n * len(x) / t_engine, t_loop / t_engine, err))
+        del y_loop, y_engine, out
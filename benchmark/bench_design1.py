@@ -0,0 +1,93 @@
+#coding:utf-8
+
+#
+# benchmark: per-band loop design vs vectorized batch design
+#
+#  compares
+#  1: Class_BPF_bank.bpf1() per band  vs  bpf1_batch()
+#  2: Class_IIR_Peaking1.set_peaking() per band  vs  set_peaking_batch()
+#  3: Class_IIR_LowShelving1.set_lowshelving() per band  vs  set_lowshelving_batch()
+#  4: Class_IIR_highShelving1.set_highshelving() per band  vs  set_highshelving_batch()
+#  and checks that both outputs are bit-for-bit same.
+
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench_util1 import best_time
+from BPF_bank import Class_BPF_bank, bpf1_batch
+from iir_peaking1 import Class_IIR_Peaking1, set_peaking_batch
+from iir_LowShelving1 import Class_IIR_LowShelving1, set_lowshelving_batch
+from iir_HighShelving1 import Class_IIR_highShelving1, set_highshelving_batch
+
+
+def loop_bpf(bank, fc, gain, Q):
+    a= np.zeros((len(fc),3))
+    b= np.zeros((len(fc),3))
+    for i in range(len(fc)):
+        a[i], b[i] = bank.bpf1(fc[i], gain[i], Q[i])
+    return a, b
+
+def loop_peaking(pk, fc, gain, Q):
+    b= np.zeros((len(fc),3))
+    a= np.zeros((len(fc),3))
+    for i in range(len(fc)):
+        b[i], a[i] = pk.set_peaking(fc[i], gain[i], Q[i])
+    return b, a
+
+def loop_shelving(cls, method, fc, gain, slope, sr):
+    b= np.zeros((len(fc),3))
+    a= np.zeros((len(fc),3))
+    for i in range(len(fc)):
+        sh= cls(fc=fc[i], gain=gain[i], slope=slope[i], sampling_rate=sr)
+        b[i], a[i] = getattr(sh, method)()
+    return b, a
+
+
+def report(name, n, t_loop, t_batch, r_loop, r_batch):
+    same= all( np.array_equal(x, y) for x, y in zip(r_loop, r_batch))
+    print ('%-16s N=%6d  loop %9.3f ms  batch %8.3f ms  speedup %7.1f  bit-for-bit %s' % (name, n, t_loop * 1e3, t_batch * 1e3, t_loop / t_batch, same))
+    return same
+
+
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='benchmark per-band loop design vs vectorized batch design')
+    parser.add_argument('--bands', '-n', type=int, nargs='+', default=[10, 100, 1000, 5000], help='number of bands')
+    parser.add_argument('--sampling_rate', '-s', type=int, default=48000, help='sampling rate')
+    args = parser.parse_args()
+    
+    sr= args.sampling_rate
+    bank= Class_BPF_bank(fband=1, sampling_rate=sr)
+    pk= Class_IIR_Peaking1(sampling_rate=sr)
+    ok= True
+    
+    for n in args.bands:
+        rng= np.random.RandomState(n)
+        fc= np.exp(rng.uniform(np.log(20.0), np.log(sr * 0.45), n))
+        gain= rng.uniform(0.25, 4.0, n)
+        gain[::7]= 1.0  # include flat peaking bands
+        Q= rng.uniform(0.3, 20.0, n)
+        slope= rng.uniform(0.3, 1.0, n)
+        
+        t_loop, r_loop= best_time(lambda: loop_bpf(bank, fc, gain, Q), repeat=5)
+        t_batch, r_batch= best_time(lambda: bpf1_batch(fc, gain, Q, sr), repeat=5)
+        ok &= report('bpf1', n, t_loop, t_batch, r_loop, r_batch)
+        
+        t_loop, r_loop= best_time(lambda: loop_peaking(pk, fc, gain, Q), repeat=5)
+        t_batch, r_batch= best_time(lambda: set_peaking_batch(fc, gain, Q, sr), repeat=5)
+        ok &= report('set_peaking', n, t_loop, t_batch, r_loop, r_batch)
+        
+        t_loop, r_loop= best_time(lambda: loop_shelving(Class_IIR_LowShelving1, 'set_lowshelving', fc, gain, slope, sr), repeat=5)
+        t_batch, r_batch= best_time(lambda: set_lowshelving_batch(fc, gain, slope, sr), repeat=5)
+        ok &= report('set_lowshelving', n, t_loop, t_batch, r_loop, r_batch)
+        
+        t_loop, r_loop= best_time(lambda: loop_shelving(Class_IIR_highShelving1, 'set_highshelving', fc, gain, slope, sr), repeat=5)
+        t_batch, r_batch= best_time(lambda: set_highshelving_batch(fc, gain, slope, sr), repeat=5)
+        ok &= report('set_highshelving', n, t_loop, t_batch, r_loop, r_batch)
+    
+    if not ok:
+        print ('error: batch design is not bit-for-bit same as loop design')
+        sys.exit(1)
@@ -0,0 +1,80 @@
+#coding:utf-8
+
+#
+# float32 against float64: accuracy, speed and output memory
+#
+#  runs every filter class with dtype=np.float32 and np.float64 on the same input,
+#  and prints max error of float32 output relative to the max of float64 output, speed and output bytes.
+#  exits 1, if an error is larger than --tol.
+
+import os
+import sys
+import argparse
+import contextlib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_design'))
+from bench_util1 import best_time
+from BPF import Class_BPF
+from BPF_bank import Class_BPF_bank
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_LowShelving1 import Class_IIR_LowShelving1
+from iir_HighShelving1 import Class_IIR_highShelving1
+from iir_eq_chain1 import Class_IIR_EQ_Chain1
+from filter_class1 import HPF4, LPF4, BPF4_butter, BPF2_Q
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='float32 against float64: accuracy, speed and output memory')
+    parser.add_argument('--length', '-l', type=int, default=48000 * 10, help='signal length [samples]')
+    parser.add_argument('--fband', type=int, default=100, help='number of bands of Class_BPF_bank')
+    parser.add_argument('--tol', type=float, default=0.1, help='max relative error allowed')
+    args = parser.parse_args()
+
+    x= np.random.RandomState(0).standard_normal(args.length) * 0.25
+    cases= [
+        ('Class_BPF 1000Hz Q1 block', lambda d: Class_BPF(fc=1000, Q=1.0, dtype=d), lambda f, x: f.iir2(x)),
+        ('Class_BPF 1000Hz Q1 lfilter', lambda d: Class_BPF(fc=1000, Q=1.0, dtype=d), lambda f, x: f.filtering(x)),
+        ('Class_BPF 50Hz Q30 block', lambda d: Class_BPF(fc=50, Q=30.0, dtype=d), lambda f, x: f.iir2(x)),
+        ('Class_BPF 50Hz Q30 lfilter', lambda d: Class_BPF(fc=50, Q=30.0, dtype=d), lambda f, x: f.filtering(x)),
+        ('Class_IIR_Peaking1 1000Hz', lambda d: Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=1.0, dtype=d), lambda f, x: f.filtering(x)),
+        ('Class_IIR_LowShelving1 100Hz', lambda d: Class_IIR_LowShelving1(fc=100, gain=2.0, dtype=d), lambda f, x: f.filtering(x)),
+        ('Class_IIR_highShelving1 8kHz', lambda d: Class_IIR_highShelving1(fc=8000, gain=2.0, dtype=d), lambda f, x: f.filtering(x)),
+        ('Class_IIR_EQ_Chain1 3 stages', lambda d: Class_IIR_EQ_Chain1([Class_IIR_LowShelving1(fc=100), Class_IIR_Peaking1(fpeak=1000), Class_IIR_highShelving1(fc=8000)], dtype=d),
+            lambda f, x: f.filtering(x)),
+        ('HPF4 5000Hz', lambda d: HPF4(dtype=d), lambda f, x: f(x)),
+        ('LPF4 100Hz', lambda d: LPF4(dtype=d), lambda f, x: f(x)),
+        ('BPF4_butter', lambda d: BPF4_butter(dtype=d), lambda f, x: f(x)),
+        ('BPF2_Q', lambda d: BPF2_Q(dtype=d), lambda f, x: f(x)),
+        ('Class_BPF_bank %d bands 100Hz+10Hz Q10' % args.fband, lambda d: Class_BPF_bank(fbase=100, fstep=10, fband=args.fband, Q=10.0, dtype=d),
+            lambda f, x: f.filtering(x)),
+        ('Class_BPF_bank %d bands 20Hz+2Hz Q30' % args.fband, lambda d: Class_BPF_bank(fbase=20, fstep=2, fband=args.fband, Q=30.0, dtype=d),
+            lambda f, x: f.filtering(x)),
+    ]
+
+    ok= True
+    print ('%-40s %12s %12s %12s %12s' % ('filter', 'rel. error', 'f64 samp/s', 'f32 samp/s', 'f32/f64 MB'))
+    for name, make, run in cases:
+        t= {}
+        y= {}
+        for d in [np.float64, np.float32]:
+            with contextlib.redirect_stdout(None):  # some classes print their coefficients
+                filt= make(d)
+            x_d= x.astype(d)
+            run(filt, x_d)  # first run makes the engine
+            t[d], y[d] = best_time(lambda: run(filt, x_d))
+        if y[np.float32].dtype != np.float32:
+            print ('error: output is not float32', name, y[np.float32].dtype)
+            ok= False
+        # error relative to the max of each output channel (band)
+        scale= np.max(np.abs(y[np.float64]), axis=-1, keepdims=True)
+        err= np.max(np.abs(y[np.float32] - y[np.float64]) / scale)
+        ok &= err < args.tol
+        n= y[np.float64].size
+        print ('%-40s %12.2e %12.3e %12.3e %6.1f/%.1f' % (name, err, n / t[np.float64], n / t[np.float32], y[np.float32].nbytes / 2 ** 20, y[np.float64].nbytes / 2 ** 20))
+
+    if not ok:
+        print ('error: float32 output is out of tolerance')
+        sys.exit(1)
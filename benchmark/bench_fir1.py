@@ -0,0 +1,69 @@
+#coding:utf-8
+
+#
+# batch filtering of many signals: IIR (lfilter / sosfilt) vs FIR conversion with FFT overlap-save
+#
+#  for every filter and batch size, prints FIR length, time of IIR filtering of the batch in one call,
+#  time of Class_FIR1 filtering (float64 and float32), speedup, max error against IIR (relative to max input)
+#  and the error bound of the conversion. the faster way is marked.
+#  exits 1, if an error is larger than its bound.
+
+import os
+import sys
+import argparse
+import contextlib
+import numpy as np
+from scipy import signal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_design'))
+from bench_util1 import best_time
+from fir_convert1 import Class_FIR1
+from BPF import Class_BPF
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_LowShelving1 import Class_IIR_LowShelving1
+from iir_HighShelving1 import Class_IIR_highShelving1
+from iir_eq_chain1 import Class_IIR_EQ_Chain1
+from filter_class1 import HPF4, LPF4, BPF2_Q
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='batch filtering, IIR vs FIR conversion with FFT overlap-save')
+    parser.add_argument('--batch', '-n', type=int, nargs='+', default=[1, 100, 1000], help='number of signals')
+    parser.add_argument('--samples', type=int, default=48000, help='samples of every signal')
+    parser.add_argument('--tol', type=float, default=1e-6, help='error bound of conversion')
+    parser.add_argument('--workers', type=int, default=None, help='threads of scipy.fft, -1 is all cpu')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(None):  # some classes print their coefficients
+        cases= [
+            ('HPF4 5000Hz', HPF4()),
+            ('BPF2_Q 1500Hz', BPF2_Q()),
+            ('Class_IIR_Peaking1 1000Hz', Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=1.0)),
+            ('EQ chain 10 stages', Class_IIR_EQ_Chain1([Class_IIR_Peaking1(fpeak=f, gain=1.5, Q=2.0) for f in np.geomspace(100, 10000, 10)])),
+            ('HPF4 -> Peaking -> BPF2_Q', [HPF4(fc=200), Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=1.0), BPF2_Q()]),
+            ('LPF4 100Hz', LPF4()),
+            ('Class_BPF 50Hz Q30', Class_BPF(fc=50, Q=30.0)),
+        ]
+
+    ok= True
+    print ('%-28s %6s %7s | %10s %10s %10s %8s | %9s %9s %5s' % ('filter', 'batch', 'FIR len', 'IIR [s]', 'FIR [s]', 'FIR32 [s]', 'speedup',
+           'error', 'bound', 'win'))
+    for name, source in cases:
+        fir= Class_FIR1(source, tol=args.tol)
+        fir32= Class_FIR1(source, tol=args.tol, dtype=np.float32)
+        for B in args.batch:
+            x= np.random.RandomState(0).uniform(-1.0, 1.0, (B, args.samples))
+            t_iir, y0= best_time(lambda: fir.filtering_iir(x))
+            t_fir, y1= best_time(lambda: fir.filtering(x, workers=args.workers))
+            t_fir32, y2= best_time(lambda: fir32.filtering(x, workers=args.workers))
+            err= np.max(np.abs(y1 - y0)) / np.max(np.abs(x))
+            ok &= err <= fir.error_bound * 1.01 + 1e-12
+            print ('%-28s %6d %7d | %10.3f %10.3f %10.3f %8.2f | %9.2e %9.2e %5s' % (name, B, fir.length, t_iir, t_fir, t_fir32,
+                   t_iir / min(t_fir, t_fir32), err, fir.error_bound, 'FIR' if min(t_fir, t_fir32) < t_iir else 'IIR'))
+            del y0, y1, y2
+
+    if not ok:
+        print ('error: FIR error is over its bound')
+        sys.exit(1)
@@ -0,0 +1,58 @@
+#coding:utf-8
+
+#
+# benchmark and equivalence check of Class_BPF.iir2 backends
+#
+#  compares iir2(backend='loop'), iir2(backend='tdf2'), iir2(backend='block') and filtering() (scipy lfilter)
+#  and checks that every backend gives same result as signal.lfilter within tolerance.
+#  'loop' is slow, it runs on the first --loop_len samples only.
+
+import os
+import sys
+import argparse
+import numpy as np
+from scipy import signal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench_util1 import best_time
+from BPF import Class_BPF
+
+
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='benchmark and equivalence check of Class_BPF.iir2 backends')
+    parser.add_argument('--length', '-l', type=int, default=48000 * 10, help='signal length [samples]')
+    parser.add_argument('--loop_len', type=int, default=20000, help='signal length for the loop backend [samples]')
+    parser.add_argument('--channels', '-c', type=int, default=8, help='number of channels for the tdf2 vectorized run')
+    parser.add_argument('--tol', type=float, default=1e-8, help='max relative error allowed against signal.lfilter')
+    args = parser.parse_args()
+    
+    ok= True
+    rng= np.random.RandomState(0)
+    for fc, Q in [(1000, 10.0), (100, 50.0), (10000, 0.7)]:
+        bpf= Class_BPF(fc=fc, Q=Q, sampling_rate=48000)
+        x= rng.standard_normal(args.length)
+        t_ref, y_ref= best_time(lambda: signal.lfilter(bpf.b, bpf.a, x))
+        scale= np.max(np.abs(y_ref))
+        print ('fc %d Q %.1f' % (fc, Q))
+        
+        for backend in ['loop', 'tdf2', 'block']:
+            n= args.loop_len if backend == 'loop' else len(x)
+            t, y= best_time(lambda: bpf.iir2(x[:n], backend=backend), repeat=1 if backend == 'loop' else 3)
+            err= np.max(np.abs(y - y_ref[:n])) / scale
+            ok &= err < args.tol
+            print ('  iir2 %-6s %10.3e samples/s  relative max error %.1e' % (backend, n / t, err))
+        print ('  lfilter     %10.3e samples/s' % (len(x) / t_ref))
+        
+        # tdf2 and block are vectorized over channels
+        xc= rng.standard_normal((args.channels, args.length // 10))
+        yc_ref= signal.lfilter(bpf.b, bpf.a, xc)
+        for backend in ['tdf2', 'block']:
+            t, yc= best_time(lambda: bpf.iir2(xc, backend=backend))
+            err= np.max(np.abs(yc - yc_ref)) / np.max(np.abs(yc_ref))
+            ok &= err < args.tol
+            print ('  iir2 %-6s %d channels %10.3e samples/s  relative max error %.1e' % (backend, args.channels, xc.size / t, err))
+    
+    if not ok:
+        print ('error: iir2 is not same as signal.lfilter')
+        sys.exit(1)
@@ -0,0 +1,82 @@
+#coding:utf-8
+
+#
+# import time budget of processing modules
+#
+#  every case is imported in a fresh python process, best of --repeat runs.
+#  numpy and scipy.signal are imported first, and timed separately, so the time of the case is
+#  the cost of the repository modules. it must be under --budget [sec],
+#  and GUI/plotting modules (matplotlib, tkinter, PyQt) must not be loaded.
+#  exits 1, if a case is over budget or loads a plotting module.
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+root= os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# the child process prints import time and loaded plotting modules as JSON
+child= '''
+import sys, time, json
+sys.path.append(%r)
+sys.path.append(%r)
+t0= time.perf_counter()
+import numpy, scipy.signal
+t1= time.perf_counter()
+%s
+t2= time.perf_counter()
+print(json.dumps({'base': t1 - t0, 'time': t2 - t1, 'plot': sorted(m for m in sys.modules if m.split('.')[0] in ('matplotlib', 'tkinter', 'PyQt5', 'PyQt6', 'PySide6'))}))
+'''
+
+cases= [
+    ('import filter_design', 'import filter_design'),
+    ('filter_design.HPF4', 'import filter_design; filter_design.HPF4'),
+    ('filter_design.Class_BPF_bank', 'import filter_design; filter_design.Class_BPF_bank'),
+    ('filter_design.filter_wav_file', 'import filter_design; filter_design.filter_wav_file'),
+    ('BPF', 'import BPF'),
+    ('BPF_bank', 'import BPF_bank'),
+    ('BPF_bank_octave1', 'import BPF_bank_octave1'),
+    ('BPF_bank_stft1', 'import BPF_bank_stft1'),
+    ('tone_detect1', 'import tone_detect1'),
+    ('fir_convert1', 'import fir_convert1'),
+    ('iir_peaking1', 'import iir_peaking1'),
+    ('iir_eq_chain1', 'import iir_eq_chain1'),
+    ('filter_class1', 'import filter_class1'),
+    ('multirate1', 'import multirate1'),
+    ('filter1', 'import filter1'),
+    ('wav_stream1', 'import wav_stream1'),
+]
+
+
+def import_time(statement, repeat=3):
+    # best import time of statement in a fresh process, and loaded plotting modules
+    best= None
+    for i in range(repeat):
+        code= child % (root, os.path.join(root, 'filter_design'), statement)
+        out= subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=root)
+        r= json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or r['time'] < best['time']:
+            best= r
+    return best
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='import time budget of processing modules')
+    parser.add_argument('--budget', type=float, default=0.1, help='max import time after numpy and scipy.signal [sec]')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='number of runs, the best time is used')
+    args = parser.parse_args()
+
+    ok= True
+    print ('%-36s %10s %16s  %s' % ('import', 'time [s]', 'numpy+scipy [s]', 'plotting modules'))
+    for name, statement in cases:
+        r= import_time(statement, args.repeat)
+        good= r['time'] < args.budget and not r['plot']
+        ok &= good
+        print ('%-36s %10.3f %16.3f  %s %s' % (name, r['time'], r['base'], ','.join(r['plot'][:3]) or '-', '' if good else '<- fail'))
+
+    if not ok:
+        print ('error: import time is over budget, or a plotting module is loaded')
+        sys.exit(1)
@@ -0,0 +1,55 @@
+#coding:utf-8
+
+#
+# log spaced Class_BPF_bank: full rate filtering vs octave-decimated multirate filtering
+#
+#  for every bands per octave, prints time of Class_BPF_bank.filtering (full rate), of Class_BPF_bank_octave.filtering
+#  (output at level rates) and with upsample=True, relative work of band filters (cost), and the max difference of
+#  the magnitude response against the full rate bank, where the full rate response is over -3dB and over -10dB.
+#  exits 1, if the difference over -3dB is larger than --tol [dB].
+
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench_util1 import best_time
+from BPF_bank import Class_BPF_bank, constant_Q
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='log spaced band pass filter bank, full rate vs octave-decimated multirate')
+    parser.add_argument('--bands_per_octave', '-B', type=int, nargs='+', default=[3, 6, 12, 24], help='bands per octave')
+    parser.add_argument('--fbase', type=float, default=25.0, help='center frequency of 1st band [Hz]')
+    parser.add_argument('--octaves', type=int, default=9, help='number of octaves')
+    parser.add_argument('--seconds', '-t', type=float, default=10.0, help='signal length [sec]')
+    parser.add_argument('--tol', type=float, default=0.5, help='max response difference over -3dB allowed [dB]')
+    args = parser.parse_args()
+
+    sr= 48000
+    x= np.random.RandomState(0).standard_normal(int(args.seconds * sr)) * 0.25
+    freq= np.geomspace(args.fbase / 2, sr * 0.45, 4000)
+
+    ok= True
+    print ('%5s %6s %10s %10s %10s %7s %8s %10s %10s' % ('B', 'bands', 'full [s]', 'octave [s]', 'upsamp [s]', 'cost', 'speedup', 'diff -3dB', 'diff -10dB'))
+    for B in args.bands_per_octave:
+        bank= Class_BPF_bank(fbase=args.fbase, fband=args.octaves * B, Q=constant_Q(B), sampling_rate=sr, bands_per_octave=B)
+        octave_bank= bank.octave()
+        bank.get_engine()  # design of engine is not included
+        t_full, y= best_time(lambda: bank.filtering(x))
+        del y
+        t_oct, y= best_time(lambda: octave_bank.filtering(x))
+        t_up, y= best_time(lambda: octave_bank.filtering(x, upsample=True), repeat=1)
+        del y
+        r0= 20 * np.log10(np.maximum(bank.response(freq), 1e-12))
+        r1= 20 * np.log10(np.maximum(octave_bank.response(freq), 1e-12))
+        d3= np.max(np.abs(r1 - r0)[r0 > -3.0])
+        d10= np.max(np.abs(r1 - r0)[r0 > -10.0])
+        ok &= d3 < args.tol
+        print ('%5d %6d %10.3f %10.3f %10.3f %7.3f %8.2f %10.3f %10.3f' % (B, bank.fband, t_full, t_oct, t_up, octave_bank.cost(), t_full / t_oct, d3, d10))
+
+    if not ok:
+        print ('error: response of octave-decimated bank is out of tolerance')
+        sys.exit(1)
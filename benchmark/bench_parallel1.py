@@ -0,0 +1,66 @@
+#coding:utf-8
+
+#
+# scaling of parallel-in-time filtering against number of workers
+#
+#  for every class, prints time of serial filtering and of parallel filtering with 1, 2, 4, ... workers,
+#  speedup against serial, and max error against serial (relative to the max output).
+#  exits 1, if an error is larger than --tol.
+
+import os
+import sys
+import argparse
+import contextlib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_design'))
+from bench_util1 import best_time
+from BPF import Class_BPF
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_eq_chain1 import Class_IIR_EQ_Chain1
+from iir_LowShelving1 import Class_IIR_LowShelving1
+from iir_HighShelving1 import Class_IIR_highShelving1
+from filter_class1 import HPF4, LPF4
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='scaling of parallel-in-time filtering against number of workers')
+    parser.add_argument('--seconds', '-t', type=float, default=600.0, help='signal length [sec]')
+    parser.add_argument('--channels', '-c', type=int, default=1, help='number of channels')
+    parser.add_argument('--workers', '-w', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='numbers of workers')
+    parser.add_argument('--executor', default='thread', choices=['thread', 'process'], help='pool of workers')
+    parser.add_argument('--tol', type=float, default=1e-9, help='max error against serial allowed')
+    args = parser.parse_args()
+
+    print ('cpu', os.cpu_count())
+    x= np.random.RandomState(0).standard_normal((args.channels, int(args.seconds * 48000)))[0 if args.channels == 1 else slice(None)] * 0.25
+    cases= [
+        ('HPF4 5000Hz', lambda: HPF4(), lambda f: f(x), lambda f, w: f.parallel(x, workers=w, executor=args.executor)),
+        ('LPF4 100Hz', lambda: LPF4(), lambda f: f(x), lambda f, w: f.parallel(x, workers=w, executor=args.executor)),
+        ('Class_BPF 50Hz Q30', lambda: Class_BPF(fc=50, Q=30.0), lambda f: f.filtering(x),
+            lambda f, w: f.filtering_parallel(x, workers=w, executor=args.executor)),
+        ('Class_IIR_Peaking1 1000Hz', lambda: Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=1.0), lambda f: f.filtering(x),
+            lambda f, w: f.filtering_parallel(x, workers=w, executor=args.executor)),
+        ('Class_IIR_EQ_Chain1 3 stages', lambda: Class_IIR_EQ_Chain1([Class_IIR_LowShelving1(fc=100), Class_IIR_Peaking1(fpeak=1000), Class_IIR_highShelving1(fc=8000)]),
+            lambda f: f.filtering(x), lambda f, w: f.filtering_parallel(x, workers=w, executor=args.executor)),
+    ]
+
+    ok= True
+    print ('%-30s %8s %10s %8s %10s' % ('filter', 'workers', 'time [s]', 'speedup', 'error'))
+    for name, make, serial, parallel in cases:
+        with contextlib.redirect_stdout(None):  # some classes print their coefficients
+            filt= make()
+        t0, y0 = best_time(lambda: serial(filt))
+        scale= np.max(np.abs(y0))
+        print ('%-30s %8s %10.3f %8.2f' % (name, 'serial', t0, 1.0))
+        for w in args.workers:
+            t, y = best_time(lambda: parallel(filt, w))
+            err= np.max(np.abs(y - y0)) / scale
+            ok &= err < args.tol
+            print ('%-30s %8d %10.3f %8.2f %10.2e' % ('', w, t, t0 / t, err))
+
+    if not ok:
+        print ('error: parallel filtering is out of tolerance')
+        sys.exit(1)
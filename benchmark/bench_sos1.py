@@ -0,0 +1,48 @@
+#coding:utf-8
+
+#
+# stability and precision report of sos form against (b, a) form of filter_class1 classes
+#
+#  for every class and order (4, 8, 12, 16), prints the max pole radius of sos and of (b, a),
+#  the error of lfilter(b, a) impulse response against sosfilt, and speed of sosfilt and lfilter.
+#  exits 1, if a sos design is unstable.
+
+import os
+import sys
+import argparse
+import contextlib
+import numpy as np
+from scipy import signal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_design'))
+from bench_util1 import best_time
+from filter_class1 import HPF4, LPF4, BPF4_butter, BPF2_Q
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='stability and precision report of sos form against (b, a) form')
+    parser.add_argument('--length', '-l', type=int, default=48000 * 10, help='signal length for speed [samples]')
+    parser.add_argument('--orders', type=int, nargs='+', default=[4, 8, 12, 16], help='filter orders')
+    args = parser.parse_args()
+
+    ok= True
+    x= np.random.RandomState(0).standard_normal(args.length)
+    classes= [('HPF4 5000Hz', lambda N: HPF4(N=N)), ('LPF4 100Hz', lambda N: LPF4(N=N)), ('LPF4 20Hz', lambda N: LPF4(fc=20, N=N)),
+              ('BPF4_butter', lambda N: BPF4_butter(N=N)), ('BPF2_Q', lambda N: BPF2_Q(N=N))]
+    print ('%-12s %5s %8s %14s %14s %14s %12s %12s' % ('class', 'order', 'sections', 'radius sos', 'radius (b,a)', '(b,a) error', 'sosfilt/s', 'lfilter/s'))
+    for name, make in classes:
+        for N in args.orders:
+            with contextlib.redirect_stdout(None):  # the classes print their coefficients
+                filt= make(N)
+            r= filt.stability_report()
+            ok &= bool(r['stable_sos'])
+            t_sos, y= best_time(lambda: filt(x))
+            with np.errstate(all='ignore'):
+                t_tf, y= best_time(lambda: signal.lfilter(filt.b, filt.a, x))
+            print ('%-12s %5d %8d %14.10f %14.10f %14.2e %12.3e %12.3e' % (name, r['order'], r['sections'], r['pole_radius_sos'], r['pole_radius_tf'],
+                   r['tf_impulse_error'], len(x) / t_sos, len(x) / t_tf))
+
+    if not ok:
+        print ('error: sos design is unstable')
+        sys.exit(1)
@@ -0,0 +1,70 @@
+#coding:utf-8
+
+#
+# crossover of Class_BPF_bank backends: time domain ('iir') vs frequency domain ('stft') against number of bands
+#
+#  for every Q and number of bands (linear spacing from 100Hz to 0.45 * sampling rate), prints
+#  output:  time of filtering (band outputs) by both backends, and max error of stft (relative to the max output)
+#  frames:  time of filtering_frames (time domain rms per frame) and spectral_frames (frequency domain estimate),
+#           and max difference of mean band power [dB]
+#  the faster backend of each row is marked. exits 1, if an output error is larger than --tol.
+
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench_util1 import best_time
+from BPF_bank import Class_BPF_bank
+
+
+def faster(t_iir, t_stft):
+    return 'iir' if t_iir <= t_stft else 'stft'
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='crossover of Class_BPF_bank backends, iir vs stft')
+    parser.add_argument('--bands', '-n', type=int, nargs='+', default=[10, 100, 300, 1000, 3000], help='number of bands')
+    parser.add_argument('--Q', type=float, nargs='+', default=[10.0, 30.0], help='Q of bands')
+    parser.add_argument('--seconds', '-t', type=float, default=1.0, help='signal length of band outputs [sec]')
+    parser.add_argument('--frames_seconds', type=float, default=20.0, help='signal length of frames [sec]')
+    parser.add_argument('--frame', type=int, default=1024, help='frame size [samples]')
+    parser.add_argument('--max_values', type=float, default=2e8, help='skip band outputs of more values (memory)')
+    parser.add_argument('--tol', type=float, default=1e-5, help='max output error of stft allowed')
+    args = parser.parse_args()
+
+    sr= 48000
+    x= np.random.RandomState(0).standard_normal(int(args.seconds * sr)) * 0.25
+    xf= np.random.RandomState(1).standard_normal(int(args.frames_seconds * sr)) * 0.25
+
+    ok= True
+    print ('%6s %6s %7s | %10s %10s %9s %5s | %10s %10s %9s %5s' % ('Q', 'bands', 'n_fft', 'iir [s]', 'stft [s]', 'error', 'win',
+           'iir fr [s]', 'stft fr [s]', 'power dB', 'win'))
+    for Q in args.Q:
+        for n in args.bands:
+            iir= Class_BPF_bank(fbase=100.0, fstep=(sr * 0.45 - 100.0) / max(n, 1), fband=n, Q=Q, sampling_rate=sr)
+            stft= Class_BPF_bank(fbase=100.0, fstep=(sr * 0.45 - 100.0) / max(n, 1), fband=n, Q=Q, sampling_rate=sr, backend='stft')
+            iir.get_engine()  # design is not included
+            stft.get_stft()
+            line= '%6.1f %6d %7d |' % (Q, n, stft.get_stft().n_fft)
+            if n * len(x) <= args.max_values:
+                t_iir, y0= best_time(lambda: iir.filtering(x))
+                t_stft, y1= best_time(lambda: stft.filtering(x))
+                err= np.max(np.abs(y1 - y0)) / np.max(np.abs(y0))
+                ok &= err < args.tol
+                del y0, y1
+                line += ' %10.3f %10.3f %9.2e %5s |' % (t_iir, t_stft, err, faster(t_iir, t_stft))
+            else:
+                line += ' %10s %10s %9s %5s |' % ('-', '-', '-', '')
+            t_iir, p0= best_time(lambda: iir.filtering_frames(xf, frame=args.frame), repeat=1)
+            t_stft, p1= best_time(lambda: stft.spectral_frames(xf, frame=args.frame), repeat=1)
+            skip= min(p0.shape[-1] // 2, stft.get_stft().n_fft // args.frame)  # frames of the window over the start
+            diff= np.max(np.abs(10 * np.log10(np.mean(p1[:, skip:] ** 2, axis=-1) / np.mean(p0[:, skip:] ** 2, axis=-1))))
+            line += ' %10.3f %10.3f %9.3f %5s' % (t_iir, t_stft, diff, faster(t_iir, t_stft))
+            print (line)
+
+    if not ok:
+        print ('error: stft backend output is out of tolerance')
+        sys.exit(1)
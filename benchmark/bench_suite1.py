@@ -0,0 +1,205 @@
+#coding:utf-8
+
+#
+# benchmark suite of every filter class and driver path, with JSON output
+#
+#  groups
+#  design      design time of every class (coefficient cache is cleared before each run)
+#  throughput  one-shot filtering of a synthetic (channels, samples) signal, samples/s and peak memory
+#  iir2        Class_BPF.iir2 backends vs filtering (lfilter)
+#  bank        Class_BPF_bank engine vs lfilter loop vs band count, and framewise rms output
+#  latency     process_block time per call vs block size, and real time factor (call time / block duration)
+#  wav         wav round trip: read, filter block by block, write (filter_wav_file)
+#
+#  the result is written as JSON (--output), and compared with a baseline JSON (--baseline).
+#  if a time of the same name is slower than baseline * --threshold, exits 1.
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+import scipy
+from scipy import signal
+from scipy.io.wavfile import write as wavwrite
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_design'))
+from bench_util1 import best_time, peak_memory
+from coef_cache1 import coef_cache
+from BPF import Class_BPF
+from BPF_bank import Class_BPF_bank
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_LowShelving1 import Class_IIR_LowShelving1
+from iir_HighShelving1 import Class_IIR_highShelving1
+from iir_eq_chain1 import Class_IIR_EQ_Chain1
+from filter_class1 import HPF4, LPF4, BPF4_butter, BPF2_Q, LPF1, Envelope1
+from wav_stream1 import filter_wav_file
+
+
+def quiet(func):
+    # some classes print their coefficients
+    with contextlib.redirect_stdout(None):
+        return func()
+
+
+class Bench_suite1(object):
+    def __init__(self, seconds=5.0, channels=2, sr=48000, repeat=3, memory=True):
+        self.sr= sr
+        self.repeat= repeat
+        self.memory= memory
+        self.x= np.random.RandomState(0).standard_normal((channels, int(seconds * sr))) * 0.25
+        if channels == 1:
+            self.x= self.x[0]
+        self.results= []
+
+    def add(self, group, name, func, samples=None, repeat=None, **params):
+        # run func, and append result
+        t, y = best_time(func, self.repeat if repeat is None else repeat)
+        result= {'group': group, 'name': group + '/' + name, 'time': t}
+        if samples is not None:
+            result['samples_per_sec']= samples / t
+        if self.memory:
+            result['peak_mb']= peak_memory(func)
+        result.update(params)
+        self.results.append(result)
+        print ('%-60s %10.3e s' % (result['name'], t) + ('  %10.3e samples/s' % result['samples_per_sec'] if samples is not None else '') +
+               ('  %8.1f MB' % result['peak_mb'] if self.memory else ''))
+        return y
+
+    def makers(self,):
+        # (name, make filter, filtering function) of every filter class
+        chain= lambda: Class_IIR_EQ_Chain1([Class_IIR_LowShelving1(fc=100), Class_IIR_Peaking1(fpeak=1000), Class_IIR_highShelving1(fc=8000)], sampling_rate=self.sr)
+        return [
+            ('Class_BPF', lambda: Class_BPF(fc=1000, Q=5.0, sampling_rate=self.sr), lambda f, x: f.filtering(x)),
+            ('Class_IIR_Peaking1', lambda: Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=1.0, sampling_rate=self.sr), lambda f, x: f.filtering(x)),
+            ('Class_IIR_LowShelving1', lambda: Class_IIR_LowShelving1(fc=100, gain=2.0, sampling_rate=self.sr), lambda f, x: f.filtering(x)),
+            ('Class_IIR_highShelving1', lambda: Class_IIR_highShelving1(fc=8000, gain=2.0, sampling_rate=self.sr), lambda f, x: f.filtering(x)),
+            ('Class_IIR_EQ_Chain1', chain, lambda f, x: f.filtering(x)),
+            ('HPF4', lambda: HPF4(sr=self.sr), lambda f, x: f(x)),
+            ('LPF4', lambda: LPF4(sr=self.sr), lambda f, x: f(x)),
+            ('BPF4_butter', lambda: BPF4_butter(sr=self.sr), lambda f, x: f(x)),
+            ('BPF2_Q', lambda: BPF2_Q(sr=self.sr), lambda f, x: f(x)),
+            ('LPF1', lambda: LPF1(sr=self.sr), lambda f, x: f(x)),
+            ('Envelope1', lambda: Envelope1(sr=self.sr), lambda f, x: f(x)),
+            ('Class_BPF_bank_32', lambda: Class_BPF_bank(fband=32, sampling_rate=self.sr), lambda f, x: f.filtering(x)),
+        ]
+
+    def design(self,):
+        def run(make):
+            coef_cache.clear()
+            return quiet(make)
+        for name, make, filt in self.makers():
+            self.add('design', name, lambda: run(make), repeat=max(self.repeat, 5))
+        for n in [100, 1000]:
+            self.add('design', 'Class_BPF_bank_%d' % n, lambda: run(lambda: Class_BPF_bank(fband=n, sampling_rate=self.sr)), repeat=max(self.repeat, 5), bands=n)
+        coef_cache.clear()
+
+    def throughput(self,):
+        for name, make, filt in self.makers():
+            f= quiet(make)
+            filt(f, self.x[..., :1024])  # first call makes lazy parts (engine)
+            self.add('throughput', name, lambda: filt(f, self.x), samples=self.x.size)
+
+    def iir2(self,):
+        bpf= Class_BPF(fc=1000, Q=5.0, sampling_rate=self.sr)
+        bpf.iir2(self.x[..., :1024])
+        for backend in ['block', 'tdf2']:
+            self.add('iir2', backend, lambda: bpf.iir2(self.x, backend=backend), samples=self.x.size)
+        self.add('iir2', 'filtering', lambda: bpf.filtering(self.x), samples=self.x.size)
+        x1= np.ravel(self.x)[:2000]
+        self.add('iir2', 'loop', lambda: bpf.iir2(x1, backend='loop'), samples=x1.size, repeat=1)
+
+    def bank(self, bands):
+        x1= np.ravel(self.x)[:self.x.shape[-1]]  # one channel
+        for n in bands:
+            bank= Class_BPF_bank(fbase=50.0, fstep=(self.sr * 0.45 - 50.0) / max(n, 1), fband=n, Q=10.0, sampling_rate=self.sr)
+            bank.get_engine()
+            self.add('bank', 'engine_%d' % n, lambda: bank.filtering(x1), samples=x1.size, bands=n)
+            self.add('bank', 'lfilter_%d' % n, lambda: bank.filtering_lfilter(x1), samples=x1.size, bands=n)
+            self.add('bank', 'frames_rms_%d' % n, lambda: bank.filtering_frames(x1, frame=1024, mode='rms'), samples=x1.size, bands=n)
+
+    def latency(self, block_sizes):
+        for name, make in [('Class_IIR_Peaking1', lambda: Class_IIR_Peaking1(fpeak=1000, sampling_rate=self.sr)),
+                           ('HPF4', lambda: HPF4(sr=self.sr)),
+                           ('Class_BPF_bank_32', lambda: Class_BPF_bank(fband=32, sampling_rate=self.sr))]:
+            f= quiet(make)
+            for block in block_sizes:
+                blocks= [self.x[..., i:i + block] for i in range(0, min(self.x.shape[-1], 200 * block), block)]
+                def run():
+                    f.reset()
+                    for w in blocks:
+                        f.process_block(w)
+                run()
+                t, y = best_time(run, self.repeat)
+                t_call= t / len(blocks)
+                result= {'group': 'latency', 'name': 'latency/%s_%d' % (name, block), 'time': t_call, 'block': block,
+                         'real_time_factor': t_call / (block / self.sr)}
+                self.results.append(result)
+                print ('%-60s %10.3e s per block  real time factor %.4f' % (result['name'], t_call, result['real_time_factor']))
+
+    def wav(self,):
+        with tempfile.TemporaryDirectory() as tmp:
+            file_in= os.path.join(tmp, 'in.wav')
+            file_out= os.path.join(tmp, 'out.wav')
+            wavwrite(file_in, self.sr, np.array(32767 * np.clip(self.x, -1.0, 1.0).T, dtype=np.int16))
+            for dtype in ['float64', 'float32']:
+                f= quiet(lambda: HPF4(sr=self.sr, dtype=dtype))
+                self.add('wav', 'HPF4_' + dtype, lambda: quiet(lambda: filter_wav_file(file_in, file_out, f, dtype=dtype)), samples=self.x.size)
+
+    def meta(self, args):
+        return {'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy.__version__,
+                'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'args': vars(args)}
+
+
+def compare(results, baseline, threshold=1.2):
+    # return list of (name, time, baseline time) slower than baseline time * threshold
+    base= {r['name']: r['time'] for r in baseline['results']}
+    return [(r['name'], r['time'], base[r['name']]) for r in results['results'] if r['name'] in base and r['time'] > base[r['name']] * threshold]
+
+
+if __name__ == '__main__':
+
+    groups= ['design', 'throughput', 'iir2', 'bank', 'latency', 'wav']
+    parser = argparse.ArgumentParser(description='benchmark suite of every filter class and driver path, with JSON output')
+    parser.add_argument('--seconds', '-t', type=float, default=5.0, help='signal length [sec]')
+    parser.add_argument('--channels', '-c', type=int, default=2, help='number of channels')
+    parser.add_argument('--sampling_rate', '-s', type=int, default=48000, help='sampling rate')
+    parser.add_argument('--bands', '-n', type=int, nargs='+', default=[10, 100, 300], help='number of bands of bank group')
+    parser.add_argument('--block_sizes', type=int, nargs='+', default=[64, 256, 1024, 4096], help='block sizes of latency group')
+    parser.add_argument('--groups', '-g', nargs='+', default=groups, choices=groups, help='groups to run')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='number of runs, the best time is used')
+    parser.add_argument('--no_memory', action='store_true', help='do not measure peak memory (one extra run per case)')
+    parser.add_argument('--output', '-o', default='bench_result.json', help='output JSON file')
+    parser.add_argument('--baseline', '-b', default=None, help='baseline JSON file to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2, help='regression, if time > baseline time * threshold')
+    args = parser.parse_args()
+
+    suite= Bench_suite1(seconds=args.seconds, channels=args.channels, sr=args.sampling_rate, repeat=args.repeat, memory=not args.no_memory)
+    for group in args.groups:
+        if group == 'bank':
+            suite.bank(args.bands)
+        elif group == 'latency':
+            suite.latency(args.block_sizes)
+        else:
+            getattr(suite, group)()
+
+    results= {'meta': suite.meta(args), 'results': suite.results}
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print ('wrote ', args.output)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline= json.load(f)
+        slow= compare(results, baseline, args.threshold)
+        for name, t, t_base in slow:
+            print ('regression: %-50s %10.3e s  baseline %10.3e s  (x%.2f)' % (name, t, t_base, t / t_base))
+        if slow:
+            sys.exit(1)
+        print ('no regression against', args.baseline)
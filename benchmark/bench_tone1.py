@@ -0,0 +1,91 @@
+#coding:utf-8
+
+#
+# tone detection: Class_Tone_Detector vs band pass filters and framing
+#
+#  a multichannel signal (noise and one tone per channel at one of the target frequencies) is analysed at all
+#  target frequencies, rms in frames of hop samples, by
+#     detector dft / goertzel           Class_Tone_Detector with Q
+#     Class_BPF x freqs                 one Class_BPF(f, Q).filtering per frequency, and rms of every frame
+#     Class_BPF_bank frames             Class_BPF_bank(...).filtering_frames (the target frequencies are linear spaced)
+#  and prints time, max difference of tone rms against Class_BPF [dB], and of noise rms (noise only signal) [dB].
+#  exits 1, if a difference is larger than --tol [dB].
+
+import os
+import sys
+import argparse
+import contextlib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench_util1 import best_time
+from BPF import Class_BPF
+from BPF_bank import Class_BPF_bank
+from tone_detect1 import Class_Tone_Detector
+
+
+def bpf_frames(freqs, Q, x, hop, sr):
+    # rms of Class_BPF output in frames of hop samples, shape (channels, freqs, frames)
+    K= x.shape[-1] // hop
+    values= np.empty(x.shape[:-1] + (len(freqs), K))
+    for i, f in enumerate(freqs):
+        y= Class_BPF(fc=f, Q=Q, sampling_rate=sr).filtering(x[..., :K * hop])
+        values[..., i, :]= np.sqrt(np.mean(y.reshape(x.shape[:-1] + (K, hop)) ** 2, axis=-1))
+    return values
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='tone detection, Class_Tone_Detector vs band pass filters')
+    parser.add_argument('--tones', '-n', type=int, default=50, help='number of target frequencies (500Hz ... 5000Hz)')
+    parser.add_argument('--channels', '-c', type=int, default=100, help='number of channels')
+    parser.add_argument('--seconds', '-t', type=float, default=2.0, help='signal length [sec]')
+    parser.add_argument('--Q', type=float, default=10.0, help='Q of band pass filters')
+    parser.add_argument('--hop', type=int, default=1024, help='frame size [samples]')
+    parser.add_argument('--tol', type=float, default=0.5, help='max rms difference against Class_BPF allowed [dB]')
+    args = parser.parse_args()
+
+    sr= 48000
+    freqs= np.linspace(500.0, 5000.0, args.tones)
+    n= int(args.seconds * sr)
+    rng= np.random.RandomState(0)
+    tone_of= np.arange(args.channels) % args.tones  # index of tone of every channel
+    x= rng.standard_normal((args.channels, n)) * 0.01 + 0.5 * np.sin(2.0 * np.pi * freqs[tone_of, None] * np.arange(n) / sr)
+    noise= rng.standard_normal((8, int(20 * sr)))
+
+    detector= Class_Tone_Detector(freqs, Q=args.Q, hop=args.hop, sampling_rate=sr)
+    with contextlib.redirect_stdout(None):
+        bank= Class_BPF_bank(fbase=freqs[0], fstep=freqs[1] - freqs[0] if args.tones > 1 else 1.0, fband=args.tones, Q=args.Q, sampling_rate=sr)
+    bank.get_engine()  # design is not included
+    cases= [
+        ('detector dft', lambda: detector.detect(x, mode='rms'), lambda: detector.detect(noise, mode='rms')),
+        ('detector goertzel', lambda: detector.detect(x, mode='rms', method='goertzel'), None),
+        ('Class_BPF x %d' % args.tones, lambda: bpf_frames(freqs, args.Q, x, args.hop, sr), lambda: bpf_frames(freqs, args.Q, noise, args.hop, sr)),
+        ('Class_BPF_bank frames', lambda: bank.filtering_frames(x, frame=args.hop), None),
+    ]
+
+    print ('tones', args.tones, 'channels', args.channels, 'samples', n, 'window length', detector.N_list.min(), '...', detector.N_list.max())
+    results= {}
+    for name, run, run_noise in cases:
+        t, v = best_time(run, repeat=1)
+        results[name]= (t, v, run_noise() if run_noise is not None else None)
+    t_ref, v_ref, noise_ref = results['Class_BPF x %d' % args.tones]
+    skip= -(-detector.length // args.hop)  # frames over the start
+
+    ok= True
+    print ('%-24s %10s %8s %14s %14s' % ('', 'time [s]', 'speedup', 'tone diff dB', 'noise diff dB'))
+    for name, (t, v, vn) in results.items():
+        tone= np.median(v[np.arange(args.channels), tone_of, skip:], axis=-1)
+        tone_ref= np.median(v_ref[np.arange(args.channels), tone_of, skip:], axis=-1)
+        d_tone= np.max(np.abs(20 * np.log10(tone / tone_ref)))
+        ok &= d_tone < args.tol
+        line= '%-24s %10.3f %8.2f %14.3f' % (name, t, t_ref / t, d_tone)
+        if vn is not None:
+            d_noise= np.max(np.abs(10 * np.log10(np.mean(vn[..., skip:] ** 2, axis=(0, -1)) / np.mean(noise_ref[..., skip:] ** 2, axis=(0, -1)))))
+            ok &= d_noise < args.tol
+            line += ' %14.3f' % d_noise
+        print (line)
+
+    if not ok:
+        print ('error: tone detector is out of tolerance against Class_BPF')
+        sys.exit(1)
@@ -0,0 +1,36 @@
+#coding:utf-8
+
+#
+# common measures of the benchmark scripts: best wall time of repeat runs, and peak memory of one run
+#
+
+import time
+import tracemalloc
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+def best_time(func, repeat=3):
+    # return the best wall time of repeat runs, and the last result
+    t_best= None
+    for i in range(repeat):
+        t0= time.perf_counter()
+        result= func()
+        t1= time.perf_counter() - t0
+        if t_best is None or t1 < t_best:
+            t_best= t1
+    return t_best, result
+
+
+def peak_memory(func):
+    # peak memory [MB] of numpy and python allocations during one run of func
+    tracemalloc.start()
+    try:
+        func()
+        peak= tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
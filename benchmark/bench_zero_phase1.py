@@ -0,0 +1,84 @@
+#coding:utf-8
+
+#
+# zero phase filtering: one-shot filtfilt, chunked filtfilt_chunks, and filtering twice with array reversal
+#
+#  for every class, prints speed and peak memory of each way, and the max deviation of filtfilt_chunks
+#  from filtfilt (relative to the max output), with the automatic overlap and with 1/4 of it.
+#  chunked output is consumed chunk by chunk, so its peak memory is the working memory only.
+#  exits 1, if the deviation with the automatic overlap is larger than --tol.
+
+import os
+import sys
+import argparse
+import contextlib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_design'))
+from bench_util1 import best_time, peak_memory
+from zero_phase1 import decay_length, ba_to_sos
+from BPF import Class_BPF
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_LowShelving1 import Class_IIR_LowShelving1
+from iir_HighShelving1 import Class_IIR_highShelving1
+from iir_eq_chain1 import Class_IIR_EQ_Chain1
+from filter_class1 import HPF4, LPF4, BPF4_butter
+
+
+def chunked(filt, x, chunk_size, overlap=None, keep=True):
+    # run filtfilt_chunks, return the output (keep) or only consume it
+    ys= []
+    for y in filt.filtfilt_chunks(x, chunk_size=chunk_size, overlap=overlap):
+        if keep:
+            ys.append(y)
+    return np.concatenate(ys, axis=-1) if keep else None
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='zero phase filtering, one-shot, chunked and twice with reversal')
+    parser.add_argument('--seconds', '-t', type=float, default=30.0, help='signal length [sec]')
+    parser.add_argument('--channels', '-c', type=int, default=2, help='number of channels')
+    parser.add_argument('--chunk_size', type=int, default=2**16, help='chunk size of filtfilt_chunks [samples]')
+    parser.add_argument('--tol', type=float, default=1e-6, help='max deviation of chunked output allowed')
+    args = parser.parse_args()
+
+    x= np.random.RandomState(0).standard_normal((args.channels, int(args.seconds * 48000))) * 0.25
+    cases= [
+        ('HPF4 5000Hz', lambda: HPF4(), lambda f: f.sos, lambda f, x: f(x)),
+        ('LPF4 100Hz', lambda: LPF4(), lambda f: f.sos, lambda f, x: f(x)),
+        ('BPF4_butter', lambda: BPF4_butter(), lambda f: f.sos, lambda f, x: f(x)),
+        ('Class_BPF 1000Hz Q5', lambda: Class_BPF(fc=1000, Q=5.0), lambda f: ba_to_sos(f.b, f.a), lambda f, x: f.filtering(x)),
+        ('Class_BPF 50Hz Q30', lambda: Class_BPF(fc=50, Q=30.0), lambda f: ba_to_sos(f.b, f.a), lambda f, x: f.filtering(x)),
+        ('Class_IIR_Peaking1 1000Hz', lambda: Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=1.0), lambda f: ba_to_sos(f.b, f.a), lambda f, x: f.filtering(x)),
+        ('Class_IIR_LowShelving1 100Hz', lambda: Class_IIR_LowShelving1(fc=100, gain=2.0), lambda f: ba_to_sos(f.b, f.a), lambda f, x: f.filtering(x)),
+        ('Class_IIR_highShelving1 8kHz', lambda: Class_IIR_highShelving1(fc=8000, gain=2.0), lambda f: ba_to_sos(f.b, f.a), lambda f, x: f.filtering(x)),
+        ('Class_IIR_EQ_Chain1 3 stages', lambda: Class_IIR_EQ_Chain1([Class_IIR_LowShelving1(fc=100), Class_IIR_Peaking1(fpeak=1000), Class_IIR_highShelving1(fc=8000)]),
+            lambda f: f.sos, lambda f, x: f.filtering(x)),
+    ]
+
+    ok= True
+    print ('%-30s %8s %11s %11s %11s %9s %9s %9s %10s %10s' % ('filter', 'overlap', 'twice samp/s', 'filtfilt/s', 'chunked/s',
+           'twice MB', 'ff MB', 'chunk MB', 'deviation', 'dev L/4'))
+    for name, make, sos, forward in cases:
+        with contextlib.redirect_stdout(None):  # some classes print their coefficients
+            filt= make()
+        L= decay_length(sos(filt))
+        twice= lambda: forward(filt, forward(filt, x)[..., ::-1])[..., ::-1]
+        t_twice, y= best_time(twice)
+        t_ff, y0= best_time(lambda: filt.filtfilt(x))
+        t_ch, y= best_time(lambda: chunked(filt, x, args.chunk_size, keep=False))
+        m_twice= peak_memory(twice)
+        m_ff= peak_memory(lambda: filt.filtfilt(x))
+        m_ch= peak_memory(lambda: chunked(filt, x, args.chunk_size, keep=False))
+        scale= np.max(np.abs(y0))
+        dev= np.max(np.abs(chunked(filt, x, args.chunk_size) - y0)) / scale
+        dev4= np.max(np.abs(chunked(filt, x, args.chunk_size, overlap=max(L // 4, 1)) - y0)) / scale
+        ok &= dev < args.tol
+        n= x.size
+        print ('%-30s %8d %11.3e %11.3e %11.3e %9.1f %9.1f %9.1f %10.2e %10.2e' % (name, L, n / t_twice, n / t_ff, n / t_ch, m_twice, m_ff, m_ch, dev, dev4))
+
+    if not ok:
+        print ('error: deviation of chunked zero phase filtering is out of tolerance')
+        sys.exit(1)
@@ -0,0 +1,79 @@
+#coding:utf-8
+
+#
+# A shared coefficient design cache with LRU eviction
+#
+#  filter classes ask the cache for their coefficients by a key of (type, params, sampling rate).
+#  when same settings are used again, the design (iirfilter, bilinear, ...) is skipped.
+#  cached arrays are set read-only, because they are shared between filter instances.
+#  the cache is bounded by number of entries, so only coefficients and responses (small arrays) are cached,
+#  processing objects of large matrices (Class_Block_Engine) are kept by the filter object.
+
+import threading
+import collections
+import numpy as np
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+
+
+class Class_Coef_Cache1(object):
+    def __init__(self, maxsize=1024):
+        # maxsize: max number of cached designs, the least recently used one is evicted
+        self.maxsize= maxsize
+        self.data= collections.OrderedDict()
+        self.lock= threading.Lock()
+        self.hits= 0
+        self.misses= 0
+
+    def get(self, key, design):
+        # return cached value of key, or call design() and cache its return value
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+        value= design()
+        set_read_only(value)
+        with self.lock:
+            self.misses += 1
+            self.data[key]= value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+        return value
+
+    def info(self,):
+        # hit/miss counters
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.data), 'maxsize': self.maxsize}
+
+    def resize(self, maxsize):
+        with self.lock:
+            self.maxsize= maxsize
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self,):
+        # clear cached designs and counters
+        with self.lock:
+            self.data.clear()
+            self.hits= 0
+            self.misses= 0
+
+
+def set_read_only(value):
+    # set numpy arrays in value (array, or tuple/list/dict of arrays) read-only
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            set_read_only(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            set_read_only(v)
+
+
+# the cache shared by all filter classes
+coef_cache= Class_Coef_Cache1()
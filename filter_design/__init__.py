@@ -0,0 +1,77 @@
+#coding:utf-8
+
+#  filter_design package
+#
+#  import filter_design
+#  filt= filter_design.HPF4(fc=5000)
+#
+#  names are imported lazily on first access, so importing the package costs almost nothing,
+#  and a processing class loads only numpy and scipy (matplotlib is imported inside f_show/H0_show and demos).
+#  this package is a shim over the flat modules of this repository, not a self-contained package:
+#  the modules are scripts that import each other as flat modules (from filter_class1 import *), so this directory and
+#  the parent directory (BPF, BPF_bank, iir_peaking1, ...) are appended to sys.path, and every name is
+#  taken from the flat module, that is, there is only one copy of each module.
+#  the flat names (BPF, filter1, batch1, ...) are generic. a module of the same name found earlier on sys.path
+#  would shadow them, then access raises ImportError instead of returning the other module (see _import).
+#  use the names of this package (__all__) in other projects, and not the flat modules.
+#  this is the only place that changes sys.path on import (filter_class1 does it only when run as a script).
+
+import os
+import sys
+import importlib
+
+_dir= os.path.dirname(os.path.abspath(__file__))
+_paths= [_dir, os.path.dirname(_dir)]
+for _path in _paths:
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+# module of each public name
+_names= {
+    'filter_class1': ['Base_filter1', 'HPF4', 'LPF4', 'BPF4_butter', 'BPF2_Q', 'LPF1', 'Envelope1', 'sos_design'],
+    'multirate1': ['Multirate1', 'auto_factor'],
+    'wav_stream1': ['Wav_reader1', 'Wav_writer1', 'Wav_error1', 'filter_wav_file', 'filtfilt_wav_file', 'to_dtype', 'to_int16'],
+    'filter1': ['read_wav', 'save_wav'],
+    'fan_out1': ['Fan_out1'],
+    'batch1': ['batch_filter', 'make_filter', 'parse_filter_spec'],
+    'BPF': ['Class_BPF', 'freq_response', 'log_bands'],
+    'BPF_bank': ['Class_BPF_bank', 'constant_Q'],
+    'BPF_bank_octave1': ['Class_BPF_bank_octave'],
+    'BPF_bank_stft1': ['Class_BPF_bank_stft'],
+    'tone_detect1': ['Class_Tone_Detector'],
+    'fir_convert1': ['Class_FIR1', 'iir_to_fir', 'overlap_save'],
+    'iir_peaking1': ['Class_IIR_Peaking1'],
+    'iir_LowShelving1': ['Class_IIR_LowShelving1'],
+    'iir_HighShelving1': ['Class_IIR_highShelving1'],
+    'iir_eq_chain1': ['Class_IIR_EQ_Chain1'],
+    'iir_block1': ['Class_Block_Engine'],
+    'zero_phase1': ['sosfiltfilt_chunks', 'sosfiltfilt_chunked', 'decay_length'],
+    'parallel1': ['parallel_lfilter', 'parallel_sosfilt'],
+    'coef_cache1': ['coef_cache'],
+}
+_module_of= {name: module for module, names in _names.items() for name in names}
+
+__all__= sorted(_module_of)
+
+
+def _import(module):
+    # flat module of this repository, ImportError if the module of that name is another file
+    m= importlib.import_module(module)
+    path= os.path.normcase(os.path.dirname(os.path.abspath(getattr(m, '__file__', None) or '')))
+    if path not in [os.path.normcase(p) for p in _paths]:
+        raise ImportError('module %r is shadowed by %r, not in %s' % (module, getattr(m, '__file__', None), _paths), name=module)
+    return m
+
+
+def __getattr__(name):
+    if name in _module_of:
+        value= getattr(_import(_module_of[name]), name)
+        globals()[name]= value  # next access does not come here
+        return value
+    if name in _names:
+        return _import(name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__ + list(_names))
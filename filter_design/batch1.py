@@ -0,0 +1,228 @@
+#coding:utf-8
+
+#  batch filtering of a directory tree of wav files, with a process pool
+#
+#  python3 batch1.py -i in_dir -o out_dir -f "HPF4(fc=3000)" -j 4
+#
+#  the filter spec is a class name with keyword arguments, such as
+#    HPF4(fc=3000, N=4)   Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=2.0)   Class_BPF_bank(fband=32, fstep=100.0)
+#  the sampling rate is taken from each file.
+#  every worker process makes the filter once per sampling rate, and reuses it (and its coefficients) for all files.
+#  every file is filtered block by block (filter_wav_file), written to a temporary file, and renamed when finished,
+#  so an output file is complete, if it exists. an output newer than its input, and made by the same filter spec and dtype,
+#  is up to date, and skipped. the spec and dtype of every output are recorded in the manifest file .batch1.json of the output directory.
+#  an error of a file is reported, and the other files are processed.
+
+
+import os
+import ast
+import sys
+import json
+import time
+import inspect
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from filter_class1 import *
+from wav_stream1 import Wav_reader1, filter_wav_file
+from BPF import Class_BPF
+from BPF_bank import Class_BPF_bank
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_LowShelving1 import Class_IIR_LowShelving1
+from iir_HighShelving1 import Class_IIR_highShelving1
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+# filter classes of batch, output has the same sampling rate as input
+batch_classes= {c.__name__: c for c in [HPF4, LPF4, BPF4_butter, BPF2_Q, LPF1, Class_BPF, Class_BPF_bank,
+                                        Class_IIR_Peaking1, Class_IIR_LowShelving1, Class_IIR_highShelving1]}
+
+
+def parse_filter_spec(spec):
+    # return class name and keyword arguments of spec 'Name' or 'Name(key=value, ...)'
+    # values must be python literals. raise ValueError, if spec is wrong
+    try:
+        node= ast.parse(spec.strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ValueError('filter spec syntax %r' % spec) from e
+    if isinstance(node, ast.Name):
+        name, kwargs = node.id, {}
+    elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.args:
+        try:
+            name, kwargs = node.func.id, {k.arg: ast.literal_eval(k.value) for k in node.keywords}
+        except ValueError as e:
+            raise ValueError('filter spec values must be literals %r' % spec) from e
+    else:
+        raise ValueError('filter spec must be Name(key=value, ...) %r' % spec)
+    if name not in batch_classes:
+        raise ValueError('unknown filter class %s, one of %s' % (name, ', '.join(batch_classes)))
+    return name, kwargs
+
+
+def make_filter(spec, sr, dtype=np.float64):
+    # make filter of spec at sampling rate sr
+    # raise ValueError, if spec is wrong, or the design is not finite (such as Q=0)
+    name, kwargs = parse_filter_spec(spec)
+    cls= batch_classes[name]
+    params= inspect.signature(cls.__init__).parameters
+    kwargs= dict(kwargs, dtype=dtype)
+    kwargs['sr' if 'sr' in params else 'sampling_rate']= sr
+    unknown= [k for k in kwargs if k not in params]
+    if unknown:
+        raise ValueError('%s has no argument %s' % (name, ', '.join(unknown)))
+    filt= cls(**kwargs)
+    for coef in ['b', 'a', 'sos']:
+        if not np.all(np.isfinite(getattr(filt, coef, 0.0))):
+            raise ValueError('%s: coefficients are not finite, check the arguments %s' % (name, spec))
+    return filt
+
+
+def find_wav_files(dir_in, dir_out, suffix=''):
+    # list of (input path, output path) of every .wav under dir_in, the tree is mirrored to dir_out
+    pairs= []
+    for root, dirs, files in os.walk(dir_in):
+        dirs.sort()
+        for f in sorted(files):
+            if f.lower().endswith('.wav'):
+                base, ext = os.path.splitext(f)
+                path_out= os.path.join(dir_out, os.path.relpath(root, dir_in), base + suffix + ext)
+                pairs.append((os.path.join(root, f), os.path.normpath(path_out)))
+    return pairs
+
+
+MANIFEST= '.batch1.json'  # settings of every output, in the output directory
+
+
+def filter_settings(spec, dtype):
+    # settings of outputs: filter spec in canonical form (sorted keyword arguments) and dtype
+    name, kwargs = parse_filter_spec(spec)
+    return {'spec': '%s(%s)' % (name, ', '.join('%s=%r' % (k, kwargs[k]) for k in sorted(kwargs))), 'dtype': np.dtype(dtype).name}
+
+
+def read_manifest(dir_out):
+    # settings of every output, the key is the path relative to dir_out. empty, if there is no manifest (or it is broken)
+    try:
+        with open(os.path.join(dir_out, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(dir_out, manifest):
+    # written to a temporary file, and renamed
+    os.makedirs(dir_out, exist_ok=True)
+    path= os.path.join(dir_out, MANIFEST)
+    with open(path + '.part', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.part', path)
+
+
+def is_up_to_date(path_in, path_out, settings=None, recorded=None):
+    # output exists, is not older than input, and (if settings is not None) was made by the same settings
+    # recorded: settings of the output in the manifest, or None if it is not recorded
+    if settings is not None and recorded != settings:
+        return False
+    return os.path.exists(path_out) and os.path.getmtime(path_out) >= os.path.getmtime(path_in)
+
+
+# state of worker process: filter spec and filters made per sampling rate
+_worker= {}
+
+def _init_worker(spec, dtype, block_size):
+    _worker.update(spec=spec, dtype=np.dtype(dtype), block_size=block_size, filters={})
+
+def _filter_one(path_in, path_out):
+    # filter one file in a worker, return (path_in, samples, sampling rate, error message or None)
+    tmp= path_out + '.part'
+    try:
+        sr= Wav_reader1(path_in).sr  # header only, the samples are memory-mapped
+        filters= _worker['filters']
+        if sr not in filters:
+            filters[sr]= make_filter(_worker['spec'], sr, _worker['dtype'])
+        os.makedirs(os.path.dirname(path_out) or '.', exist_ok=True)
+        sr, length = filter_wav_file(path_in, tmp, filters[sr], block_size=_worker['block_size'], dtype=_worker['dtype'], verbose=False)
+        os.replace(tmp, path_out)
+        return path_in, length, sr, None
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return path_in, 0, 0, '%s: %s' % (type(e).__name__, e)
+
+
+def batch_filter(dir_in, dir_out, spec, jobs=None, dtype=np.float64, block_size=65536, suffix='', force=False, interval=1.0):
+    # filter every wav file under dir_in to dir_out with a pool of jobs processes
+    # prints progress every interval [sec] and errors, and returns summary dict
+    make_filter(spec, 48000, dtype)  # check the spec before starting workers
+    settings= filter_settings(spec, dtype)
+    manifest= read_manifest(dir_out)
+    key= lambda path_out: os.path.relpath(path_out, dir_out).replace(os.sep, '/')
+    pairs= find_wav_files(dir_in, dir_out, suffix)
+    todo= [(i, o) for i, o in pairs if force or not is_up_to_date(i, o, settings, manifest.get(key(o)))]
+    for i, o in todo:
+        manifest.pop(key(o), None)  # it is not valid, until the output is made again
+    summary= {'files': len(pairs), 'skipped': len(pairs) - len(todo), 'done': 0, 'failed': 0, 'samples': 0, 'seconds': 0.0, 'errors': []}
+    print ('files', len(pairs), 'up to date', summary['skipped'], 'to do', len(todo))
+    t0= time.perf_counter()
+    t_print= t0
+    if todo:
+        write_manifest(dir_out, manifest)
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(spec, np.dtype(dtype).str, block_size)) as pool:
+            futures= {pool.submit(_filter_one, i, o): o for i, o in todo}
+            try:
+                for fut in as_completed(futures):
+                    path_in, length, sr, error = fut.result()
+                    if error is None:
+                        manifest[key(futures[fut])]= settings
+                        summary['done'] += 1
+                        summary['samples'] += length
+                        summary['seconds'] += length / sr
+                    else:
+                        summary['failed'] += 1
+                        summary['errors'].append((path_in, error))
+                        print ('error:', path_in, error)
+                    t= time.perf_counter()
+                    if t - t_print >= interval:
+                        t_print= t
+                        print ('%d/%d files  %.1f sec audio  %.1f x real time' % (summary['done'] + summary['failed'], len(todo),
+                               summary['seconds'], summary['seconds'] / (t - t0)))
+            except KeyboardInterrupt:
+                for fut in futures:
+                    fut.cancel()
+                raise
+            finally:
+                write_manifest(dir_out, manifest)
+    summary['time']= time.perf_counter() - t0
+    return summary
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='batch filtering of a directory tree of wav files, with a process pool')
+    parser.add_argument('--input_dir', '-i', default='wav', help='input directory, searched recursively for .wav (16bit)')
+    parser.add_argument('--output_dir', '-o', default='wav_out', help='output directory, same tree as input')
+    parser.add_argument('--filter', '-f', default='HPF4', help='filter spec, such as "HPF4(fc=3000)" one of ' + ', '.join(batch_classes))
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='number of worker processes (default: number of cpu)')
+    parser.add_argument('--block_size', '-b', type=int, default=65536, help='block size [samples]')
+    parser.add_argument('--dtype', default='float64', choices=['float64', 'float32'], help='dtype of filtering')
+    parser.add_argument('--suffix', default='', help='added to output file name, before .wav')
+    parser.add_argument('--force', action='store_true', help='process files of up to date output too')
+    args = parser.parse_args()
+
+    try:
+        s= batch_filter(args.input_dir, args.output_dir, args.filter, jobs=args.jobs, dtype=args.dtype, block_size=args.block_size,
+                        suffix=args.suffix, force=args.force)
+    except ValueError as e:
+        print ('error:', e)
+        sys.exit(2)
+    except KeyboardInterrupt:
+        print ('interrupted')
+        sys.exit(130)
+    print ('done %d  skipped %d  failed %d  time %.2f sec  %.3e samples/s  %.1f x real time' % (s['done'], s['skipped'], s['failed'], s['time'],
+           s['samples'] / max(s['time'], 1e-9), s['seconds'] / max(s['time'], 1e-9)))
+    if s['failed']:
+        sys.exit(1)
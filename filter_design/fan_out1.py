@@ -0,0 +1,115 @@
+#coding:utf-8
+
+#  fan-out filtering: many filters over one input, in one read pass
+#
+#  each input block is read once and dispatched to every filter.
+#  every filter has its own single thread (lfilter releases the GIL), which filters the block
+#  with process_block and then writes the result, so filtering of one filter,
+#  filtering of other filters, writing of outputs and reading of the next block run concurrently.
+#  wall time approaches the cost of the slowest filter, not the sum of all filters.
+
+
+import argparse
+import collections
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from filter_class1 import *
+from wav_stream1 import Wav_reader1, Wav_writer1
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+class Fan_out1(object):
+    # filters: list of filter class of process_block and reset
+    # threads: if True, every filter runs in its own thread. if False, all run in the caller thread.
+    # depth: number of blocks in flight per filter, bounds memory
+    def __init__(self, filters, threads=True, depth=2):
+        self.filters= list(filters)
+        self.threads= threads
+        self.depth= depth
+        self.pool= None  # thread pool of process_block, it is made at first use
+
+    def reset(self,):
+        for filt in self.filters:
+            filt.reset()
+
+    def close(self,):
+        # stop the threads of process_block
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool= None
+
+    def __enter__(self,):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def process_block(self, w):
+        # filter one block with every filter, return list of outputs
+        # the threads are kept for the next call, until close()
+        if not self.threads:
+            return [filt.process_block(w) for filt in self.filters]
+        if self.pool is None:
+            self.pool= ThreadPoolExecutor(len(self.filters))
+        return list(self.pool.map(lambda filt: filt.process_block(w), self.filters))
+
+    def process_file(self, file_path_in, file_paths_out, block_size=65536, dtype=np.float64):
+        # filter wav file with every filter, and write the i-th filter output to file_paths_out[i]
+        # dtype: dtype of input blocks, see Wav_reader1.blocks
+        if len(file_paths_out) != len(self.filters):
+            raise ValueError('number of output files must be number of filters')
+        reader= Wav_reader1(file_path_in)
+        self.reset()
+        writers= [None] * len(self.filters)
+
+        def run(i, w):
+            # filtering and writing of i-th filter, called in order of blocks
+            y= self.filters[i].process_block(w)
+            if writers[i] is None:
+                writers[i]= Wav_writer1(file_paths_out[i], sr=reader.sr, channels=1 if np.ndim(y) == 1 else np.shape(y)[0])
+            writers[i].write(y)
+
+        try:
+            if self.threads:
+                pools= [ThreadPoolExecutor(1) for filt in self.filters]  # one thread per filter keeps the block order
+                in_flight= collections.deque()
+                try:
+                    for w in reader.blocks(block_size, dtype=dtype):
+                        in_flight.append([pool.submit(run, i, w) for i, pool in enumerate(pools)])
+                        if len(in_flight) > self.depth:
+                            for fut in in_flight.popleft():
+                                fut.result()
+                    while in_flight:
+                        for fut in in_flight.popleft():
+                            fut.result()
+                finally:
+                    for pool in pools:
+                        pool.shutdown()
+            else:
+                for w in reader.blocks(block_size, dtype=dtype):
+                    for i in range(len(self.filters)):
+                        run(i, w)
+        finally:
+            # the header of every output is completed, also when a filter or a write failed
+            for writer in writers:
+                if writer is not None:
+                    writer.close()
+        return reader.sr
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='filter wav file with many filters in one read pass')
+    parser.add_argument('--input_wav', '-i', default='wav/MIX100-1500-5000-10dB_ST_10sec.wav', help='wav file name(16bit)')
+    parser.add_argument('--block_size', '-b', type=int, default=65536, help='block size [samples]')
+    parser.add_argument('--no_threads', action='store_true', help='run all filters in one thread')
+    args = parser.parse_args()
+
+    sr= Wav_reader1(args.input_wav).sr
+    fan_out= Fan_out1([HPF4(sr=sr), LPF4(sr=sr), BPF4_butter(sr=sr), BPF2_Q(sr=sr)], threads=not args.no_threads)
+    fan_out.process_file(args.input_wav, ['wav/hpf4_out.wav', 'wav/lpf4_out.wav', 'wav/bpf4b_out.wav', 'wav/bpf2q_out.wav'], block_size=args.block_size)
@@ -10,6 +10,8 @@ from scipy.io.wavfile import read as wavread
 from scipy.io.wavfile import write as wavwrite
 
 from filter_class1 import *
+from fan_out1 import Fan_out1
+from wav_stream1 import to_dtype, to_int16, Wav_error1
 
 # Check version
 #  Python 3.6.4 on win32 (Windows 10)
@@ -17,27 +19,36 @@ from filter_class1 import *
 #  scipy 1.4.1
 
 
-def read_wav( file_path ):
+def read_wav( file_path, mono=False, dtype=np.float64 ):
+    # return w, sr
+    # w shape is (samples,) if 1 channel, or (channels, samples) if multichannel.
+    # if mono is True, multichannel is converted to mono
+    # dtype: np.float64 or np.float32, scaled to -1.0 ... 1.0.  other dtype raises ValueError (see to_dtype)
+    # raise Wav_error1, if the file cannot be read
     try:
         sr, w = wavread( file_path)
-    except:
-        print ('error: wavread ', file_path)
-        sys.exit()
+    except Exception as e:
+        raise Wav_error1('wavread %s: %s' % (file_path, e)) from e
     else:
-        w= w / (2 ** 15)
-        if w.ndim == 2:  # if stereo, convert to mono
-            w= np.average(w, axis=1)
+        w= to_dtype(w, dtype)
+        if w.ndim == 2:
+            if mono:  # if stereo, convert to mono
+                w= np.average(w, axis=1).astype(w.dtype)
+            else:  # keep channel layout, as (channels, samples)
+                w= w.T
         print ('sampling rate ', sr)
-        print ('size', w.shape[0])
+        print ('size', w.shape[-1])
+        if w.ndim == 2:
+            print ('channels', w.shape[0])
     return w, sr
 
 def save_wav( file_path, data, sr=48000):
-    amplitude = np.iinfo(np.int16).max
+    # data shape is (samples,) or (channels, samples), float (clipped to -1.0 ... 1.0) or int16
+    # raise Wav_error1, if the file cannot be written
     try:
-        wavwrite( file_path , sr, np.array( amplitude * data , dtype=np.int16))
-    except:
-        print ('error: wavwrite ', file_path)
-        sys.exit()
+        wavwrite( file_path , sr, to_int16(data).T)
+    except Exception as e:
+        raise Wav_error1('wavwrite %s: %s' % (file_path, e)) from e
     print ('wrote ', file_path)
 
 
@@ -49,24 +60,20 @@ if __name__ == '__main__':
     
     file_path_in= args.input_wav
     
-    w,sr= read_wav( file_path_in )
+    try:
+        w,sr= read_wav( file_path_in )
+    except Wav_error1 as e:
+        print ('error:', e)
+        sys.exit(1)
     
     hpf= HPF4(sr=sr)  # sr sampling rate
     lpf= LPF4(sr=sr)
     bpf4b= BPF4_butter(sr=sr)
     bpf2q= BPF2_Q(sr=sr)
     
-    y= hpf(w)
-    save_wav('wav/hpf4_out.wav', y, sr=sr)
-    
-    y= lpf(w)
-    save_wav('wav/lpf4_out.wav', y, sr=sr)
-    
-    y= bpf4b(w)
-    save_wav('wav/bpf4b_out.wav', y, sr=sr)
-    
-    y= bpf2q(w)
-    save_wav('wav/bpf2q_out.wav', y, sr=sr)
+    # read the input once, and run all filters and writes concurrently
+    fan_out= Fan_out1([hpf, lpf, bpf4b, bpf2q])
+    fan_out.process_file(file_path_in, ['wav/hpf4_out.wav', 'wav/lpf4_out.wav', 'wav/bpf4b_out.wav', 'wav/bpf2q_out.wav'])
     
     
     # moving average
@@ -74,15 +81,15 @@ if __name__ == '__main__':
     lpf1=LPF1(MAPN=N,sr=sr)
     y= lpf1(np.abs(w))
     save_wav('wav/moving_average_out.wav', y, sr=sr)
-    yma=y[:N * int(len(w)/N)][::N] # get every N point data
+    yma= Envelope1(MAPN=N, mode='abs', sr=sr)(w) # get every N point data, level at the end of every N points
     print (yma.shape)
     
     # N points mean
-    yn=np.abs(w[:N * int(len(w)/N)]).reshape(-1,N).mean(axis=1)
+    yn= Envelope1(MAPN=N, mode='mean', sr=sr)(w)
     print ( yn.shape)
     save_wav('wav/N_point_average_out.wav', yn, sr=sr)
     
-    # comparison
-    yma_vs_yn= np.stack([yma, yn], 1)
+    # comparison, yma channels then yn channels
+    yma_vs_yn= np.stack([yma, yn], 0).reshape(-1, yma.shape[-1])
     save_wav('wav/moving_average_vs_N_point_average_out.wav', yma_vs_yn, sr=sr)
    
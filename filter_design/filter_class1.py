@@ -11,9 +11,23 @@
 #  5: LPF1 moving average points number 1024  order 1
 
 
+import os
+import sys
+import warnings
 import numpy as np
 from scipy import signal   # version > 1.2.0
-from matplotlib import pyplot as plt
+
+try:
+    from coef_cache1 import coef_cache
+except ImportError:
+    # script shim, same as filter_design/__init__: run as a script in this directory, the flat modules of
+    # the parent directory are not on sys.path. imported through the filter_design package, its __init__ has put them
+    # on sys.path already, and this is not used.
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from coef_cache1 import coef_cache
+from zero_phase1 import Zero_phase_mixin1
+from parallel1 import Parallel_mixin1
+from streaming1 import Streaming_mixin1
 
 # Check version
 #  Python 3.6.4 on win32 (Windows 10)
@@ -21,72 +35,143 @@ from matplotlib import pyplot as plt
 #  matplotlib  2.1.1
 #  scipy 1.4.1
 
-class HPF4(object):
+def sos_design(sos):
+    # return sos, and b, a of the sos (b, a is for information, processing uses sos)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', signal.BadCoefficients)  # (b, a) of high order is badly conditioned
+        b, a = signal.sos2tf(sos)
+    while len(a) > 1 and a[-1] == 0 and b[-1] == 0:  # odd order has a first order section
+        b, a = b[:-1], a[:-1]
+    return sos, b, a
+
+def writable(sos):
+    # scipy sosfilt needs writable sos, but cached coefficients are read-only
+    return sos if sos.flags.writeable else sos.copy()
+
+class Base_filter1(Zero_phase_mixin1, Parallel_mixin1, Streaming_mixin1):
+    # common filtering process of the filter classes, sos (and b, a) are set by the sub class
+    # processing uses second-order sections, because (b, a) of high order or low cut off is unstable
+    dtype= np.dtype(np.float64)  # dtype of filtering and output, np.float64 or np.float32
+    resp= None  # frequency response, it is computed at first access of w, h, hlist
+    
+    def get_response(self, name):
+        # lazy frequency response, freq_response() is defined by the sub class
+        if self.resp is None:
+            self.resp= coef_cache.get(('response',) + self.key, self.freq_response)
+        return self.resp[name]
+        
+    w= property(lambda self: self.get_response('w'))
+    h= property(lambda self: self.get_response('h'))
+    hlist= property(lambda self: self.get_response('hlist'))
+    
+    def sos_dtype(self,):
+        # sos in dtype of filtering, it is a writable copy of the cached sos
+        return self.sos.astype(self.dtype)
+        
+    def __call__(self, x_in, axis=-1):
+        # multichannel input such as shape (channels, samples) is filtered along axis in one call
+        return signal.sosfilt(self.sos_dtype(), np.asarray(x_in, dtype=self.dtype), axis=axis)
+        
+    parallel= Parallel_mixin1.filtering_parallel  # same as __call__(x_in) by a pool of workers, see parallel1.py
+        
+    def stability_report(self, n=None):
+        # compare sos form with (b, a) form
+        # pole radius of both forms, and error of lfilter(b, a) impulse response against sosfilt
+        # n: impulse response length, default is until decay to about 1e-9
+        p_sos= np.concatenate([np.roots(section[3:]) for section in self.sos])
+        p_tf= np.roots(self.a)
+        r_sos= np.max(np.abs(p_sos))
+        r_tf= np.max(np.abs(p_tf))
+        if n is None:
+            n= int(min(2 ** 20, 20.0 / max(1.0 - r_sos, 1e-6)))
+        imp= np.zeros(n)
+        imp[0]= 1.0
+        h_sos= signal.sosfilt(writable(self.sos), imp)
+        with np.errstate(all='ignore'):
+            h_tf= signal.lfilter(self.b, self.a, imp)
+            err= np.max(np.abs(h_tf - h_sos)) / np.max(np.abs(h_sos))
+        return {'order': len(p_sos), 'sections': len(self.sos),
+                'pole_radius_sos': r_sos, 'pole_radius_tf': r_tf, 'stable_sos': r_sos < 1.0, 'stable_tf': r_tf < 1.0,
+                'tf_impulse_error': err}
+
+class HPF4(Base_filter1):
     # fc cut off frequency
     # N filter order
     # sr sampling rate
     # num  f-points
-    def __init__(self,fc=5000, N=4, sr=48000, num=1000 ):
+    # dtype  dtype of filtering and output, np.float64 or np.float32
+    def __init__(self,fc=5000, N=4, sr=48000, num=1000, dtype=np.float64):
         self.fc= fc
         self.N= N
         self.sr= sr
         self.num= num
-        self.b, self.a = signal.iirfilter(self.N,  self.fc ,  btype='highpass', ftype='butter', fs=self.sr )
-        self.w, self.h = signal.freqz(self.b, self.a, self.num, fs=self.sr)
-        self.hlist= 20 * np.log10(abs(self.h))
+        self.dtype= np.dtype(dtype)
+        self.key= ('HPF4', self.fc, self.N, self.sr, self.num)
+        self.sos, self.b, self.a = coef_cache.get(self.key, lambda: sos_design(signal.iirfilter(self.N,  self.fc ,  btype='highpass', ftype='butter', fs=self.sr, output='sos' )))
         self.title= 'highpass butter ' + str(self.N) + ' fc ' + str(self.fc)
         print ( 'HPF4 b len, a len', len(self.b), len(self.a))
         
-    def __call__(self, x_in):
-        return signal.lfilter(self.b, self.a, x_in)
+    def freq_response(self,):
+        w, h = signal.sosfreqz(self.sos, self.num, fs=self.sr)
+        return {'w': w, 'h': h, 'hlist': 20 * np.log10(np.maximum(abs(h), 1e-10))}
 
-class LPF4(object):
+class LPF4(Base_filter1):
     # fc cut off frequency
     # N filter order
     # sr sampling rate
     # num  f-points
-    def __init__(self,fc=100, N=4, sr=48000, num=1000):
+    # dtype  dtype of filtering and output, np.float64 or np.float32
+    def __init__(self,fc=100, N=4, sr=48000, num=1000, dtype=np.float64):
         self.fc= fc
         self.N= N
         self.sr= sr
         self.num= num
-        self.b, self.a = signal.iirfilter(self.N,  self.fc ,  btype='lowpass', ftype='butter', fs=self.sr )
-        self.w, self.h = signal.freqz(self.b, self.a, self.num, fs=self.sr )
-        self.hlist= 20 * np.log10(abs(self.h))
+        self.dtype= np.dtype(dtype)
+        self.key= ('LPF4', self.fc, self.N, self.sr, self.num)
+        self.sos, self.b, self.a = coef_cache.get(self.key, lambda: sos_design(signal.iirfilter(self.N,  self.fc ,  btype='lowpass', ftype='butter', fs=self.sr, output='sos' )))
         self.title= 'lowpass butter ' + str(self.N) + ' fc ' + str(self.fc)
         print ( 'LPF4 b len, a len', len(self.b), len(self.a))
         
-    def __call__(self, x_in):
-        return signal.lfilter(self.b, self.a, x_in)
+    def freq_response(self,):
+        w, h = signal.sosfreqz(self.sos, self.num, fs=self.sr )
+        return {'w': w, 'h': h, 'hlist': 20 * np.log10(abs(h))}
+        
+    def multirate(self, factor=None, interpolate=True):
+        # multirate processing of this filter, see multirate1.py
+        from multirate1 import Multirate1
+        return Multirate1(self, factor=factor, interpolate=interpolate)
 
-class BPF4_butter(object):
+class BPF4_butter(Base_filter1):
     # fc1, fc2  cut off frequency
     # N filter order, N should be even number.
     # sr sampling rate
     # num  f-points
-    def __init__(self,fc1=1000, fc2=2000, N=4, sr=48000, num=1000):
+    # dtype  dtype of filtering and output, np.float64 or np.float32
+    def __init__(self,fc1=1000, fc2=2000, N=4, sr=48000, num=1000, dtype=np.float64):
         self.fc1= fc1
         self.fc2= fc2
         self.N= N
         self.N2= int(N/2)
         self.sr= sr
         self.num= num
-        self.b, self.a = signal.iirfilter(self.N2,  [self.fc1, self.fc2 ],  btype='bandpass', ftype='butter', fs=self.sr )
-        self.w, self.h = signal.freqz(self.b, self.a, self.num, fs=self.sr )
-        self.hlist= 20 * np.log10((np.maximum(abs(self.h), 1e-10)))
+        self.dtype= np.dtype(dtype)
+        self.key= ('BPF4_butter', self.fc1, self.fc2, self.N, self.sr, self.num)
+        self.sos, self.b, self.a = coef_cache.get(self.key, lambda: sos_design(signal.iirfilter(self.N2,  [self.fc1, self.fc2 ],  btype='bandpass', ftype='butter', fs=self.sr, output='sos' )))
         self.title= 'bandpass butter ' + str(self.N) + ' fc1 ' + str(self.fc1) + ' fc2 ' + str(self.fc2)
         print ( 'BPF4_butter b len, a len', len(self.b), len(self.a))
         
-    def __call__(self, x_in):
-        return signal.lfilter(self.b, self.a, x_in)
+    def freq_response(self,):
+        w, h = signal.sosfreqz(self.sos, self.num, fs=self.sr )
+        return {'w': w, 'h': h, 'hlist': 20 * np.log10((np.maximum(abs(h), 1e-10)))}
 
-class BPF2_Q(object):
+class BPF2_Q(Base_filter1):
     # fc center frequency
     # Q
     # N filter order, N should be even number.
     # sr sampling rate
     # num  f-points
-    def __init__(self,fc=1500, Q=0.7071, N=2, sr=48000, num=1000):
+    # dtype  dtype of filtering and output, np.float64 or np.float32
+    def __init__(self,fc=1500, Q=0.7071, N=2, sr=48000, num=1000, dtype=np.float64):
         self.fc= fc
         self.Q= Q
         self.BW= self.fc / self.Q
@@ -94,48 +179,153 @@ class BPF2_Q(object):
         self.N2 = int(N/2)
         self.sr= sr
         self.num= num
+        self.dtype= np.dtype(dtype)
         
+        self.key= ('BPF2_Q', self.fc, self.Q, self.N, self.sr, self.num)
+        self.b_analog, self.a_analog, self.sos, self.b, self.a = coef_cache.get(self.key, self.design)
+        self.titles= 'bandpass (analog) ' + str(self.N) + ' fc ' + str(self.fc) + ' Q ' + str(self.Q)
+        self.title= 'bandpass (digital) ' + str(self.N) + ' fc ' + str(self.fc) + ' Q ' + str(self.Q)
+        print ( 'BPF2_Q b len, a len', len(self.b), len(self.a))
+        
+    def design(self,):
+        # return analog b, a (frequency unit is [Hz]), and digital sos, b, a
         z,p,k= signal.buttap(self.N2)  # analog prototype of Nth-order Butterworth filter
         b,a= signal.zpk2tf(z,p,k)     # polynomial transfer function representation from zeros and poles
         b,a= signal.lp2bp(b,a, wo=self.fc, bw=self.BW) # Transform a lowpass filter prototype to a bandpass filter
-        self.ws, self.hs= signal.freqs(b, a, worN=np.logspace(1, 4.3, self.num)) # analog
-        self.hslist= 20 * np.log10(abs(self.hs)) # analog
-        self.titles= 'bandpass (analog) ' + str(self.N) + ' fc ' + str(self.fc) + ' Q ' + str(self.Q)
         
-        self.b, self.a = signal.bilinear(b, a, fs=self.sr/( 2.0 * np.pi )) # Transform from the analog s-plane to the digital z-plane 
-                                                                           # The reason (fs=fs.sr/!(2.0 * np.pi)!) is unknown.
-        self.wz, self.hz = signal.freqz(self.b, self.a, worN=np.logspace(1, 4.3, self.num), fs=self.sr)
-        self.hzlist= 20 * np.log10(np.maximum(abs(self.hz), 1e-10))
-        self.title= 'bandpass (digital) ' + str(self.N) + ' fc ' + str(self.fc) + ' Q ' + str(self.Q)
-        print ( 'BPF2_Q b len, a len', len(self.b), len(self.a))
+        # digital: the bandpass is made in [rad/s] with prewarped center frequency, so that the peak is at fc,
+        # and Transform from the analog s-plane to the digital z-plane by bilinear(fs=sr)
+        wo= 2.0 * self.sr * np.tan(np.pi * self.fc / self.sr)
+        zz,pz,kz= signal.lp2bp_zpk(z,p,k, wo=wo, bw=wo / self.Q)
+        zz,pz,kz= signal.bilinear_zpk(zz,pz,kz, fs=self.sr)
+        return (b, a) + sos_design(signal.zpk2sos(zz,pz,kz))
         
-    def __call__(self, x_in):
-        return signal.lfilter(self.b, self.a, x_in)
+    def freq_response(self,):
+        ws, hs= signal.freqs(self.b_analog, self.a_analog, worN=np.logspace(1, 4.3, self.num)) # analog
+        wz, hz = signal.sosfreqz(self.sos, worN=np.logspace(1, 4.3, self.num), fs=self.sr)
+        return {'ws': ws, 'hs': hs, 'hslist': 20 * np.log10(abs(hs)),
+                'wz': wz, 'hz': hz, 'hzlist': 20 * np.log10(np.maximum(abs(hz), 1e-10))}
+        
+    ws= property(lambda self: self.get_response('ws'))
+    hs= property(lambda self: self.get_response('hs'))
+    hslist= property(lambda self: self.get_response('hslist')) # analog
+    wz= property(lambda self: self.get_response('wz'))
+    hz= property(lambda self: self.get_response('hz'))
+    hzlist= property(lambda self: self.get_response('hzlist'))
 
 
-class LPF1(object):
+class LPF1(Base_filter1):
     # MAPN moving average points number
     # sr sampling rate
     # num  f-points
-    def __init__(self, MAPN=1024, sr=48000, num=1000):
+    # dtype  dtype of filtering and output, np.float64 or np.float32
+    def __init__(self, MAPN=1024, sr=48000, num=1000, dtype=np.float64):
         self.MAPN= MAPN # moving average points number
         self.N= 1  # lpf order
         self.sr= sr
         self.num= num
+        self.dtype= np.dtype(dtype)
         self.fc= 0.443/ np.sqrt(self.MAPN * self.MAPN - 1.0) *  self.sr
         print ('fc ', self.fc)
-        self.b, self.a = signal.iirfilter(self.N,  self.fc ,  btype='lowpass', ftype='butter', fs=self.sr )
-        self.w, self.h = signal.freqz(self.b, self.a, self.num, fs=self.sr )
-        self.hlist= 20 * np.log10(abs(self.h))
+        self.key= ('LPF1', self.MAPN, self.sr, self.num)
+        self.sos, self.b, self.a = coef_cache.get(self.key, lambda: sos_design(signal.iirfilter(self.N,  self.fc ,  btype='lowpass', ftype='butter', fs=self.sr, output='sos' )))
         self.title= 'lowpass butter ' + str(self.N) + ' fc ' + str(self.fc)
         print ( 'LPF1 b', self.b, '   alfa ', self.b[0])
         print ( 'LPF1 a', self.a)
         
+    def freq_response(self,):
+        w, h = signal.sosfreqz(self.sos, self.num, fs=self.sr )
+        return {'w': w, 'h': h, 'hlist': 20 * np.log10(abs(h))}
+        
+    def multirate(self, factor=None, interpolate=True):
+        # multirate processing of this filter, see multirate1.py
+        from multirate1 import Multirate1
+        return Multirate1(self, factor=factor, interpolate=interpolate)
+
+
+class Envelope1(LPF1):
+    # envelope follower / RMS meter on LPF1, output is the level every hop samples (control rate)
+    # MAPN moving average points number of LPF1
+    # hop  decimation of output, default is MAPN
+    # mode 'abs'  LPF1 of abs(x),       same as LPF1()(np.abs(x))[..., hop-1::hop]
+    #      'rms'  sqrt of LPF1 of x^2
+    #      'mean' hop points mean of abs(x), same as np.abs(x).reshape(-1, hop).mean(axis=-1)
+    # the level at the end of every hop is computed directly from the input block,
+    # without full rate LPF1 output:
+    #   state after block  s[k+1] = p^hop s[k] + sum( w * x_block )
+    #   level at block end y[k]   = p^(hop-1) s[k] + sum( wy * x_block )
+    # so it is two weighted sums per block (one matrix product) and one lfilter over blocks.
+    # dtype  dtype of the levels and their computation, default is a compact float32 level array
+    def __init__(self, MAPN=1024, hop=None, mode='abs', sr=48000, num=1000, dtype=np.float32):
+        LPF1.__init__(self, MAPN=MAPN, sr=sr, num=num, dtype=dtype)
+        self.hop= MAPN if hop is None else hop
+        if mode not in ('abs', 'rms', 'mean'):
+            raise ValueError('mode must be abs, rms or mean, but %s' % mode)
+        self.mode= mode
+        
+        # direct form II transposed of 1st order: y= s + b0 x,  s_next= p s + (b1 - a1 b0) x,  p= -a1
+        b= self.b / self.a[0]
+        a= self.a / self.a[0]
+        p= -a[1]
+        q= b[1] - a[1] * b[0]
+        N= self.hop
+        W= np.zeros((N, 2))
+        W[:, 0]= p ** np.arange(N-1, -1, -1) * q  # input to state after block
+        W[:N-1, 1]= p ** np.arange(N-2, -1, -1) * q  # input to level at block end
+        W[N-1, 1]= b[0]
+        if mode == 'mean':
+            W[:, 1]= 1.0 / N
+        self.W= W.astype(self.dtype)
+        self.phi= p ** N
+        self.cy= p ** (N-1) if mode != 'mean' else 0.0
+        self.reset()
+        
+    def reset(self,):
+        # clear the state of process_block
+        self.zi= None
+        self.pending= None  # input samples of the not finished hop
+        
+    def levels(self, x_in, zi=None):
+        # level of every full hop of x_in (the rest samples are ignored), and the state after them
+        # x_in shape (samples,) or (channels, samples)
+        x_in= np.asarray(x_in, dtype=self.dtype)
+        N= self.hop
+        K= x_in.shape[-1] // N
+        lead= x_in.shape[:-1]
+        xb= x_in[..., :K*N].reshape(lead + (K, N))
+        xb= xb * xb if self.mode == 'rms' else np.abs(xb)
+        gu= np.matmul(xb, self.W)  # (..., K, 2)
+        s0= np.zeros(lead, dtype=self.dtype) if zi is None else zi
+        # state at the start of every block
+        s_after= signal.lfilter(np.ones(1, dtype=self.dtype), np.array([1.0, -self.phi], dtype=self.dtype), gu[..., 0], axis=-1,
+                                zi=(self.phi * s0)[..., None].astype(self.dtype))[0]
+        s_start= np.concatenate([s0[..., None], s_after[..., :-1]], axis=-1)
+        y= (self.cy * s_start + gu[..., 1]).astype(self.dtype, copy=False)
+        if self.mode == 'rms':
+            y= np.sqrt(np.maximum(y, 0.0))
+        s= s_after[..., -1] if K > 0 else s0
+        return y, s
+        
     def __call__(self, x_in):
-        return signal.lfilter(self.b, self.a, x_in)
+        # one-shot level of x_in, dtype shape (K,) or (channels, K), K= samples // hop
+        y, s = self.levels(x_in)
+        return y
+        
+    def process_block(self, x_in):
+        # streaming level, the state and the not finished hop are carried over to the next call
+        x_in= np.asarray(x_in, dtype=self.dtype)
+        if self.pending is not None:
+            x_in= np.concatenate([self.pending, x_in], axis=-1)
+        if self.zi is None:
+            self.zi= np.zeros(x_in.shape[:-1], dtype=self.dtype)
+        K= x_in.shape[-1] // self.hop
+        y, self.zi = self.levels(x_in[..., :K*self.hop], zi=self.zi)
+        self.pending= x_in[..., K*self.hop:]
+        return y
 
 
 if __name__ == '__main__':
+    from matplotlib import pyplot as plt
     #
     hpf= HPF4()
     lpf= LPF4()
@@ -0,0 +1,183 @@
+#coding:utf-8
+
+#  multirate processing of low frequency lowpass filter, such as LPF4 and LPF1
+#
+#  the input is decimated by factor R with a polyphase anti-alias FIR, the lowpass filter is
+#  designed again at the reduced rate sr/R and filtered there, and optionally the output is
+#  interpolated back to sr with a polyphase FIR of the same prototype.
+#  the low cut off frequency is far from 0 at the reduced rate, so the design is well conditioned,
+#  and the IIR runs on 1/R samples.
+#  the anti-alias FIR is linear phase, so the output is delayed by q*R samples per FIR stage.
+#  when it is worth using: every FIR stage costs about 2q+1 multiply-adds per sample at sr, whatever R is,
+#  which is as much as the full rate 4th order IIR itself (LPF4 is 2 second-order sections).
+#  so the speedup is from the output at sr/R (interpolate=False: LPF4 about 1.7, LPF1 about 3.5 with 10 sec 48kHz),
+#  and interpolate=True is about as fast as the full rate filter (LPF4 about 1.0, LPF1 1.1 ... 1.5).
+#  use interpolate=True for the numerical robustness of a very low cut off, not for speed.
+
+
+import time
+import argparse
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+from filter_class1 import *
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+def auto_factor(fc, sr, margin=16.0, max_factor=256):
+    # the largest decimation factor, which keeps the reduced nyquist frequency margin times of fc
+    # a large factor does not make the FIR stages cheaper, it makes the IIR and the output at sr/R smaller (see above)
+    return int(max(1, min(max_factor, np.floor(sr / (2.0 * margin * fc)))))
+
+
+class Multirate1(object):
+    # filt: lowpass butter filter class, LPF4 or LPF1
+    # factor: decimation factor R. if None, it is chosen from the cut off frequency by auto_factor
+    # interpolate: if True, output is interpolated back to sr. if False, output is at sr/R
+    # q: anti-alias FIR length is 2*q*R+1
+    # beta: kaiser window beta of anti-alias FIR
+    # filtering and output are in dtype of filt
+    def __init__(self, filt, factor=None, interpolate=True, q=4, beta=6.0, margin=16.0):
+        if not isinstance(filt, (LPF4, LPF1)):
+            raise ValueError('multirate supports lowpass LPF4 and LPF1 only')
+        self.filt= filt
+        self.fc= filt.fc
+        self.N= filt.N
+        self.sr= filt.sr
+        self.dtype= np.dtype(filt.dtype)
+        self.factor= auto_factor(self.fc, self.sr, margin) if factor is None else int(factor)
+        if self.fc >= 0.45 * self.sr / self.factor:
+            raise ValueError('factor %d is too large for cut off frequency %s' % (self.factor, self.fc))
+        self.interpolate= interpolate
+        self.q= q
+        R= self.factor
+
+        # anti-alias FIR, cut off at the reduced nyquist frequency, zero padded to (2q+1)*R
+        self.h= coef_cache.get(('Multirate1 fir', R, q, beta), lambda: signal.firwin(2 * q * R + 1, 1.0 / R, window=('kaiser', beta)))
+        h_pad= np.concatenate([self.h, np.zeros(R - 1)]).reshape(2 * q + 1, R)
+        self.Hd= np.ascontiguousarray(h_pad[:, ::-1].T, dtype=self.dtype)  # decimator phases,  Hd[c, j]= h[j R + R-1-c]
+        self.Hi= np.ascontiguousarray(R * h_pad[::-1], dtype=self.dtype)   # interpolator phases, Hi[2q-j, r]= R h[j R + r]
+
+        # lowpass filter designed at the reduced rate
+        self.sr_low= self.sr / R
+        self.key= ('Multirate1', self.fc, self.N, self.sr, R)
+        self.sos= coef_cache.get(self.key, lambda: signal.iirfilter(self.N, self.fc, btype='lowpass', ftype='butter', fs=self.sr_low, output='sos'))
+        self.delay= (2 if interpolate else 1) * q * R  # delay [samples at sr] against the full rate filter
+        self.reset()
+
+    def reset(self,):
+        # clear the state of process_block
+        self.state= None
+
+    def init_state(self, lead):
+        R= self.factor
+        return {'pending': np.zeros(lead + (R - 1,), dtype=self.dtype),  # input samples of the not finished frame, frame i ends at x[i R]
+                'P': np.zeros(lead + (2 * self.q, 2 * self.q + 1), dtype=self.dtype),  # partial sums of last 2q frames
+                'zi': np.zeros((len(self.sos),) + lead + (2,), dtype=self.dtype),
+                'u': np.zeros(lead + (2 * self.q,), dtype=self.dtype),  # last 2q samples at sr/R
+                'out': np.zeros(lead + (0,), dtype=self.dtype)}  # interpolated samples not returned yet
+
+    def decimate(self, x, state):
+        # anti-alias filtering and decimation by R, one output per finished frame
+        R= self.factor
+        q2= 2 * self.q
+        lead= x.shape[:-1]
+        k= R - state['pending'].shape[-1]  # samples to finish the pending frame
+        if x.shape[-1] < k:
+            state['pending']= np.concatenate([state['pending'], x], axis=-1)
+            return np.zeros(lead + (0,), dtype=self.dtype)
+        F= (x.shape[-1] - k) // R
+        # partial sum of every frame and phase, the frames are reshaped views of x
+        head= np.concatenate([state['pending'], x[..., :k]], axis=-1)[..., None, :]
+        P= np.concatenate([state['P'], np.matmul(head, self.Hd), np.matmul(x[..., k:k + F * R].reshape(lead + (F, R)), self.Hd)], axis=-2)
+        state['pending']= x[..., k + F * R:]
+        state['P']= P[..., F + 1:, :]
+        y= P[..., q2:, 0].copy()
+        for j in range(1, q2 + 1):
+            y += P[..., q2 - j:q2 - j + F + 1, j]
+        return y
+
+    def interpolation(self, u, state):
+        # polyphase interpolation by R, R output samples per input sample
+        if u.shape[-1] == 0:
+            return np.zeros(u.shape, dtype=self.dtype)
+        ucat= np.concatenate([state['u'], u], axis=-1)
+        state['u']= ucat[..., u.shape[-1]:]
+        Z= np.matmul(sliding_window_view(ucat, 2 * self.q + 1, axis=-1), self.Hi)
+        return Z.reshape(u.shape[:-1] + (-1,))
+
+    def process(self, x_in, state):
+        x= np.asarray(x_in, dtype=self.dtype)
+        if state is None:
+            state= self.init_state(x.shape[:-1])
+        u= self.decimate(x, state)
+        if u.shape[-1] > 0:  # filtering of empty input returns broken zf
+            u, state['zi'] = signal.sosfilt(self.sos.astype(self.dtype), u, zi=state['zi'])
+        if not self.interpolate:
+            return u, state
+        # return the same number of samples as input, the rest is kept to the next call
+        n= x.shape[-1]
+        z= self.interpolation(u, state)
+        if state['out'].shape[-1] == 0 and z.shape[-1] >= n:
+            # nothing kept from the previous call (such as one-shot), the output is the head of z without copy
+            state['out']= z[..., n:].copy()
+            return z[..., :n], state
+        p= min(state['out'].shape[-1], n)
+        y= np.empty(x.shape, dtype=self.dtype)
+        y[..., :p]= state['out'][..., :n]
+        y[..., p:]= z[..., :n - p]
+        state['out']= np.concatenate([state['out'][..., n:], z[..., n - p:]], axis=-1)
+        return y, state
+
+    def __call__(self, x_in):
+        # one-shot multirate filtering of x_in, shape (samples,) or (channels, samples)
+        y, state = self.process(x_in, None)
+        return y
+
+    def process_block(self, x_in):
+        # streaming multirate filtering, the state is carried over to the next call
+        y, self.state = self.process(x_in, self.state)
+        return y
+
+    def report(self, x_in, repeat=5):
+        # speedup and error against the full rate filter, the delay is compensated
+        x= np.asarray(x_in, dtype=np.float64)
+        t_full, t_multi = np.inf, np.inf
+        for _ in range(repeat):
+            t0= time.perf_counter()
+            ref= self.filt(x)
+            t1= time.perf_counter()
+            y= self(x)
+            t2= time.perf_counter()
+            t_full, t_multi = min(t_full, t1 - t0), min(t_multi, t2 - t1)
+        d= self.delay
+        if self.interpolate:
+            y, ref = y[..., d:], ref[..., :ref.shape[-1] - d]
+        else:
+            # y[m] is the output at sample m R - q R
+            m0= -(-d // self.factor)
+            y, ref = y[..., m0:], ref[..., m0 * self.factor - d::self.factor][..., :y.shape[-1] - m0]
+        err= np.max(np.abs(y - ref))
+        return {'factor': self.factor, 'delay': d, 'time_full': t_full, 'time_multirate': t_multi,
+                'speedup': t_full / t_multi, 'max_error': err, 'relative_error': err / np.max(np.abs(ref))}
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='multirate processing of LPF4 and LPF1, speedup and error against full rate')
+    parser.add_argument('--seconds', '-s', type=float, default=10.0, help='length of test signal [sec]')
+    parser.add_argument('--sr', type=int, default=48000, help='sampling rate')
+    args = parser.parse_args()
+
+    x= np.random.RandomState(0).standard_normal(int(args.seconds * args.sr))
+    # LPF1 is used for envelope, so its input is abs(x)
+    for filt, x_in in [(LPF4(sr=args.sr), x), (LPF1(sr=args.sr), np.abs(x))]:
+        for interpolate in [True, False]:
+            r= filt.multirate(interpolate=interpolate).report(x_in)
+            print (type(filt).__name__, 'interpolate' if interpolate else 'decimated  ', 'factor', r['factor'], 'delay', r['delay'],
+                   'speedup %.2f' % r['speedup'], 'relative error %.2e' % r['relative_error'])
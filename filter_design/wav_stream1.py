@@ -0,0 +1,157 @@
+#coding:utf-8
+
+#  streaming wav file filtering, block by block
+#
+#  the input wav is memory-mapped, each block is converted to float and filtered with process_block
+#  (filter state is carried over between blocks), and the output is written block by block.
+#  so peak memory is about block size, regardless of the file length.
+#  with dtype float32 (the filter made with dtype=np.float32 too), int16 -> float32 -> int16 has no float64 step.
+
+
+import wave
+import argparse
+import numpy as np
+from scipy.io.wavfile import read as wavread
+
+from filter_class1 import *
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+class Wav_error1(IOError):
+    # wav file read or write error
+    pass
+
+
+def to_dtype( w, dtype=np.float64 ):
+    # convert 16bit samples to dtype, float is scaled by 1/2**15 in that dtype (no float64 intermediate for float32)
+    # raise ValueError, if dtype is not float, because the filter output is written as float scale (-1.0 ... 1.0)
+    dtype= np.dtype(dtype)
+    if dtype.kind != 'f':
+        raise ValueError('dtype of filtering must be float, such as np.float64 or np.float32, but %s' % dtype)
+    return w.astype(dtype) * dtype.type(1.0 / (2 ** 15))
+
+
+def to_int16( data ):
+    # convert float data (-1.0 ... 1.0) to 16bit samples, in the dtype of data. int16 data is returned as it is.
+    # data out of -1.0 ... 1.0 is clipped, instead of wrap around
+    data= np.asarray(data)
+    if data.dtype == np.int16:
+        return data
+    amplitude = np.iinfo(np.int16).max
+    return np.array( data.dtype.type(amplitude) * np.clip(data, -1.0, 1.0) , dtype=np.int16)
+
+
+class Wav_reader1(object):
+    # memory-mapped wav reader
+    # block is (samples,) if 1 channel, or (channels, samples) if multichannel, same as read_wav
+    def __init__(self, file_path):
+        self.file_path= file_path
+        try:
+            self.sr, self.w = wavread( file_path, mmap=True)
+        except Exception as e:
+            raise Wav_error1('wavread %s: %s' % (file_path, e)) from e
+        if self.w.dtype != np.int16:
+            raise Wav_error1('only 16bit wav is supported %s %s' % (file_path, self.w.dtype))
+        self.length= self.w.shape[0]
+        self.channels= 1 if self.w.ndim == 1 else self.w.shape[1]
+
+    def blocks(self, block_size=65536, dtype=np.float64):
+        # generator of blocks, dtype is same as read_wav
+        for start in range(0, self.length, block_size):
+            w= self.w[start:start + block_size]
+            yield to_dtype(w.T, dtype)
+
+
+class Wav_writer1(object):
+    # incremental 16bit wav writer, data is converted same as save_wav
+    # verbose: if True, prints the file name at close
+    def __init__(self, file_path, sr=48000, channels=1, verbose=True):
+        self.file_path= file_path
+        self.channels= channels
+        self.verbose= verbose
+        try:
+            self.wf= wave.open(file_path, 'wb')
+            self.wf.setnchannels(channels)
+            self.wf.setsampwidth(2)
+            self.wf.setframerate(sr)
+        except Exception as e:
+            raise Wav_error1('wavwrite %s: %s' % (file_path, e)) from e
+
+    def write(self, data):
+        # data shape is (samples,) or (channels, samples), float or int16
+        data= np.asarray(data)
+        if (1 if data.ndim == 1 else data.shape[0]) != self.channels or data.ndim > 2:
+            raise Wav_error1('wavwrite channels mismatch %s %s' % (self.file_path, data.shape))
+        self.wf.writeframes(to_int16(data).T.astype('<i2').tobytes())
+
+    def close(self,):
+        self.wf.close()
+        if self.verbose:
+            print ('wrote ', self.file_path)
+
+    def __enter__(self,):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def filter_wav_file( file_path_in, file_path_out, filt, block_size=65536, dtype=np.float64, verbose=True):
+    # filter wav file block by block with filt.process_block, and write to file_path_out
+    # filt is any filter class of process_block and reset
+    # output of filter bank, (channels, bands, samples), is written as channels * bands channels
+    # dtype: dtype of input blocks
+    # return sampling rate and number of samples (per channel)
+    reader= Wav_reader1(file_path_in)
+    filt.reset()
+    writer= None
+    try:
+        for w in reader.blocks(block_size, dtype=dtype):
+            y= filt.process_block(w)
+            if np.ndim(y) > 2:
+                y= np.reshape(y, (-1, np.shape(y)[-1]))
+            if writer is None:
+                writer= Wav_writer1(file_path_out, sr=reader.sr, channels=1 if np.ndim(y) == 1 else np.shape(y)[0], verbose=verbose)
+            writer.write(y)
+    finally:
+        if writer is not None:
+            writer.close()
+    return reader.sr, reader.length
+
+
+def filtfilt_wav_file( file_path_in, file_path_out, filt, chunk_size=2**16, overlap=None, verbose=True):
+    # zero phase filtering of wav file by chunks with filt.filtfilt_chunks, and write to file_path_out
+    # the input is memory-mapped, so memory is about chunk_size + overlap samples, regardless of the file length
+    # int16 samples are filtered as they are, and the output is scaled by 1/2**15 (the filter is linear)
+    # return sampling rate and number of samples (per channel)
+    reader= Wav_reader1(file_path_in)
+    writer= Wav_writer1(file_path_out, sr=reader.sr, channels=reader.channels, verbose=verbose)
+    try:
+        for y in filt.filtfilt_chunks(reader.w.T, chunk_size=chunk_size, overlap=overlap):
+            writer.write(y * y.dtype.type(1.0 / (2 ** 15)))
+    finally:
+        writer.close()
+    return reader.sr, reader.length
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='streaming filter wav file block by block')
+    parser.add_argument('--input_wav', '-i', default='wav/MIX100-1500-5000-10dB_ST_10sec.wav', help='wav file name(16bit)')
+    parser.add_argument('--output_wav', '-o', default='wav/hpf4_stream_out.wav', help='output wav file name')
+    parser.add_argument('--filter', '-f', default='HPF4', choices=['HPF4', 'LPF4', 'BPF4_butter', 'BPF2_Q', 'LPF1'], help='filter class')
+    parser.add_argument('--block_size', '-b', type=int, default=65536, help='block size [samples]')
+    parser.add_argument('--dtype', default='float64', choices=['float64', 'float32'], help='dtype of filtering')
+    parser.add_argument('--zero_phase', action='store_true', help='zero phase (forward and backward) filtering, block size is chunk size')
+    args = parser.parse_args()
+
+    sr= Wav_reader1(args.input_wav).sr
+    filt= globals()[args.filter](sr=sr, dtype=args.dtype)
+    if args.zero_phase:
+        filtfilt_wav_file(args.input_wav, args.output_wav, filt, chunk_size=args.block_size)
+    else:
+        filter_wav_file(args.input_wav, args.output_wav, filt, block_size=args.block_size, dtype=args.dtype)
@@ -0,0 +1,147 @@
+#coding:utf-8
+
+#
+# IIR to FIR conversion, and FFT overlap-save convolution of many signals in one call
+#
+#  for offline batch filtering, where latency does not matter, any designed filter (sos, or b, a) or a chain of them
+#  is converted to its impulse response truncated at L samples. the output error of the FIR against the IIR filter is
+#     |y_fir - y_iir| <= sum(|h[n]|, n >= L) * max|x|       (error_bound)
+#  L is estimated from the max pole radius r (the tail after L is about r^L / (1 - r)), and the tail is measured
+#  from the impulse response after L, L is doubled until the bound is under tol.
+#  the FIR is applied by overlap-save: blocks of n_fft - L + 1 new samples (with L - 1 samples before) are multiplied by
+#  rfft(h) in the frequency domain. all blocks of all signals are independent, so it is vectorized over batch and time,
+#  instead of the sample by sample recursion of lfilter/sosfilt. n_fft is chosen to minimize fft work per output sample.
+
+import numpy as np
+from scipy import signal, fft
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+def filter_sos(source):
+    # sos of source: sos array, filter with sos (HPF4, Class_IIR_EQ_Chain1, ...), filter with b, a (Class_BPF,
+    # Class_IIR_Peaking1, ...), or a list of them (a chain, filtered in the order)
+    if isinstance(source, (list, tuple)):
+        return np.concatenate([filter_sos(s) for s in source], axis=0)
+    if hasattr(source, 'sos'):
+        return np.array(source.sos, dtype=np.float64)
+    if hasattr(source, 'b') and hasattr(source, 'a'):
+        return signal.tf2sos(np.asarray(source.b, dtype=np.float64), np.asarray(source.a, dtype=np.float64))
+    return np.array(source, dtype=np.float64).reshape(-1, 6)
+
+
+def pole_radius(sos):
+    # max pole radius of sos
+    return max(np.max(np.abs(np.roots(section[3:]))) if np.any(section[4:]) else 0.0 for section in np.asarray(sos))
+
+
+def estimate_length(sos, tol=1e-6, max_length=2**20):
+    # first estimate of truncation length by the max pole radius, r^L / (1 - r) <= tol
+    r= pole_radius(sos)
+    if r <= 0.0:
+        return int(2 * len(sos) + 1)  # FIR already
+    if r >= 1.0:
+        return max_length
+    return int(min(max_length, max(2 * len(sos) + 1, np.ceil(np.log(tol * (1.0 - r)) / np.log(r)))))
+
+
+def iir_to_fir(source, tol=1e-6, max_length=2**20):
+    # impulse response h truncated so that error_bound <= tol, return h and error_bound
+    # error_bound: max output error against the IIR filter for input of max|x| = 1
+    sos= filter_sos(source)
+    r= pole_radius(sos)
+    L= estimate_length(sos, tol, max_length)
+    while True:
+        imp= np.zeros(2 * L)
+        imp[0]= 1.0
+        h= signal.sosfilt(sos, imp)
+        tail= np.sum(np.abs(h[L:]))
+        if r > 0.0:
+            tail /= max(1.0 - r ** L, 1e-12)  # after 2L, by the decay of r
+        if tail <= tol or L >= max_length:
+            return h[:L].copy(), tail
+        L= min(2 * L, max_length)
+
+
+def fft_length(M, n=None):
+    # fft length of overlap-save of FIR length M, least fft work per output sample (n: signal length)
+    best= None
+    for N in [1 << k for k in range(max(int(np.ceil(np.log2(M))) + 1, 6), 27)]:
+        work= N * np.log2(N) / (N - M + 1)
+        if best is None or work < best[0]:
+            best= (work, N)
+        if n is not None and N - M + 1 >= n:
+            break
+    return best[1]
+
+
+def overlap_save(h, x_in, n_fft=None, out=None, workers=None, chunk_size=2**22, dtype=np.float64):
+    # causal FIR filtering of x_in along the last axis, same as scipy.signal.lfilter(h, 1, x_in)
+    # x_in shape (..., samples), such as (signals, samples) of a batch
+    # out: output buffer shape x_in.shape of dtype. if None, it is allocated
+    # workers: threads of scipy.fft, -1 is all cpu
+    # chunk_size: about number of values of work arrays
+    dtype= np.dtype(dtype)
+    x= np.asarray(x_in, dtype=dtype)
+    lead, n = x.shape[:-1], x.shape[-1]
+    if out is None:
+        out= np.empty(x.shape, dtype=dtype)
+    if n == 0:
+        return out
+    M= len(h)
+    N= fft_length(M, n) if n_fft is None else int(n_fft)
+    if N < M:
+        raise ValueError('n_fft must be >= FIR length %d' % M)
+    step= N - M + 1
+    K= -(-n // step)  # number of blocks
+    x2= x.reshape((-1, n))
+    out2= out.reshape((-1, n))
+    H= fft.rfft(np.asarray(h, dtype=dtype), N)
+    xp= np.zeros((x2.shape[0], M - 1 + K * step), dtype=dtype)
+    xp[:, M - 1:M - 1 + n]= x2
+    blocks= np.lib.stride_tricks.sliding_window_view(xp, N, axis=-1)[:, ::step]  # shape (signals, K, N)
+    kc= max(1, min(K, chunk_size // N))  # blocks per chunk
+    rc= max(1, chunk_size // (kc * N))  # signals per chunk
+    for i0 in range(0, x2.shape[0], rc):
+        i1= min(i0 + rc, x2.shape[0])
+        for k0 in range(0, K, kc):
+            k1= min(k0 + kc, K)
+            y= fft.irfft(fft.rfft(blocks[i0:i1, k0:k1], axis=-1, workers=workers) * H, N, axis=-1, workers=workers)[..., M - 1:]
+            s, e = k0 * step, min(k1 * step, n)
+            out2[i0:i1, s:e]= y.reshape(i1 - i0, -1)[:, :e - s]
+    return out
+
+
+class Class_FIR1(object):
+    def __init__(self, source, tol=1e-6, max_length=2**20, n_fft=None, dtype=np.float64):
+        # FIR of source (see filter_sos) with output error_bound <= tol (for max|x| = 1)
+        # n_fft: fft length of overlap-save, if None, it is chosen by the FIR length and the signal length
+        # dtype: dtype of filtering and output, np.float64 or np.float32
+        self.sos= filter_sos(source)
+        self.tol= tol
+        self.h, self.error_bound = iir_to_fir(self.sos, tol, max_length)
+        self.length= len(self.h)
+        self.n_fft= n_fft
+        self.dtype= np.dtype(dtype)
+
+    def filtering(self, x_in, out=None, workers=None):
+        # filtering of every signal along the last axis, x_in shape (samples,) or (signals, samples)
+        return overlap_save(self.h, x_in, n_fft=self.n_fft, out=out, workers=workers, dtype=self.dtype)
+
+    def filtering_iir(self, x_in):
+        # reference filtering by the sos of source
+        return signal.sosfilt(self.sos.astype(self.dtype), np.asarray(x_in, dtype=self.dtype))
+
+
+if __name__ == '__main__':
+
+    from iir_peaking1 import Class_IIR_Peaking1
+    # compare with the IIR filtering
+    x= np.random.RandomState(0).standard_normal((100, 48000))
+    for tol in [1e-3, 1e-6, 1e-9]:
+        fir= Class_FIR1(Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=1.0), tol=tol)
+        err= np.max(np.abs(fir.filtering(x) - fir.filtering_iir(x))) / np.max(np.abs(x))
+        print ('tol %.0e  FIR length %5d  error bound %.2e  max error / max input %.2e' % (tol, fir.length, fir.error_bound, err))
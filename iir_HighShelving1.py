@@ -9,30 +9,71 @@
 #  matplotlib  2.1.1
 
 
-import matplotlib.pyplot as plt
 import numpy as np
 from scipy import signal
 
+from coef_cache1 import coef_cache
+from zero_phase1 import Zero_phase_mixin1
+from parallel1 import Parallel_mixin1
+from streaming1 import Streaming_mixin1
 
-class Class_IIR_highShelving1(object):
-    def __init__(self, fc=2500, gain=2.0, slope=1.0, sampling_rate=48000):
+
+def set_highshelving_batch(fc, gain, slope, sampling_rate=48000):
+    # vectorized version of Class_IIR_highShelving1.set_highshelving
+    # fc, gain, slope are arrays (or scalars) of same length N, gain is the amplification factor as given to Class_IIR_highShelving1
+    # return b, a as shape (N,3) coefficient matrix.
+    # each row is bit-for-bit same as set_highshelving() output.
+    fc, gain, slope = np.broadcast_arrays(np.asarray(fc, dtype=np.float64), np.asarray(gain, dtype=np.float64), np.asarray(slope, dtype=np.float64))
+    fc= fc.ravel()
+    g= np.sqrt(gain.ravel())
+    slope= slope.ravel()
+    
+    omega= (fc / sampling_rate) * np.pi * 2.0
+    sn= np.sin(omega)
+    cs= np.cos(omega)
+    alpha = sn / 2.0 * np.sqrt((g + 1.0/g) * (1.0/slope - 1.0) + 2.0)
+    
+    b=np.zeros((len(fc),3)) # umerator(bunsi)
+    a=np.zeros((len(fc),3)) # denominator(bunbo)
+    
+    a[:,0]= ((g + 1.0 ) - (g - 1.0) * cs + 2.0 * np.sqrt(g) * alpha)
+    a[:,1]= 2.0 * (( g - 1.0) - ( g + 1.0) * cs)
+    a[:,2]= ((g + 1.0) - (g - 1.0 ) * cs - 2.0 * np.sqrt( g) * alpha )
+    
+    b[:,0]= g * ((g +1.0 ) + (g - 1.0) * cs + 2.0 * np.sqrt(g) * alpha )
+    b[:,1]= -2.0 * g * ((g - 1.0) + (g + 1.0 ) * cs)
+    b[:,2]= g * ((g + 1.0) + (g - 1.0) * cs - 2.0 * np.sqrt(g) * alpha)
+    
+    a0= a[:,0:1].copy()
+    b /= a0
+    a /= a0
+    
+    return b, a
+
+
+class Class_IIR_highShelving1(Zero_phase_mixin1, Parallel_mixin1, Streaming_mixin1):
+    def __init__(self, fc=2500, gain=2.0, slope=1.0, sampling_rate=48000, dtype=np.float64):
         # design iir high Shelving filter
         # initalize
         self.fc= fc # midpoint frequecny by unit is [Hz]
         self.sr= sampling_rate # sampling frequecny by unit is [Hz]
+        self.dtype= np.dtype(dtype) # dtype of filtering and output, np.float64 or np.float32
         self.gain= gain # amplification factor (magnification).   This must be > 0.0
         self.gain= np.sqrt(self.gain)
         self.slope= slope # shelf slope (S=1 for steepest slope)
-        self.b, self.a= self.set_highshelving()
+        self.key= ('Class_IIR_highShelving1', self.fc, self.gain, self.slope, self.sr)
+        self.b, self.a= coef_cache.get(self.key, self.set_highshelving)
+        self.reset()
         #print ('self.b,self.a', self.b, self.a)
 
-    def filtering(self, xin):
+    def filtering(self, xin, axis=-1):
     	# process filtering, using scipy
-    	# input xin
+    	# input xin, multichannel input such as shape (channels, samples) is filtered along axis in one call
     	# output filtered xin
-        return signal.lfilter(self.b, self.a, xin)
-        
+        return signal.lfilter(self.b.astype(self.dtype), self.a.astype(self.dtype), np.asarray(xin, dtype=self.dtype), axis=axis)
+
     def f_show(self, worN=1024):
+        import matplotlib.pyplot as plt
         # draw frequency response, using scipy
         wlist, fres = signal.freqz(self.b, self.a, worN=worN)
         
@@ -0,0 +1,331 @@
+#coding:utf-8
+
+#
+# A block state-space engine for a bank of iir filters
+#
+#  runs many iir filters (one (b,a) row per filter) over the signal in a single pass.
+#  the signal is cut into blocks of L samples, and every block of every filter is computed by matrix products
+#     y_block = T x_block + O s        T: Toeplitz matrix of impulse response, O: zero-input response of the state
+#     s_next  = Phi s + G x_block      Phi = A^L, G: input to state
+#  so that the work is a few large (BLAS) matrix products instead of a python loop over filters.
+#  s is the state of direct form II transposed, same as scipy.signal.lfilter zi/zf,
+#  so states can be exchanged with lfilter.
+#  the block to block state recurrence (s_next = Phi s + G x_block) is a linear recurrence of same kind,
+#  and it is computed by the same block method again (next level), until a few blocks are left.
+
+import numpy as np
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+def tdf2_state_space(b, a):
+    # state space matrix of direct form II transposed (same state as scipy.signal.lfilter)
+    #   s[n+1] = A s[n] + B x[n]
+    #   y[n]   = C s[n] + D x[n]
+    # b, a shape (F, n), one filter per row
+    # return A (F,m,m), B (F,m,1), C (F,1,m), D (F,1,1)  m=n-1 is order
+    b= np.atleast_2d(np.asarray(b, dtype=np.float64))
+    a= np.atleast_2d(np.asarray(a, dtype=np.float64))
+    n= max(b.shape[1], a.shape[1], 2)
+    b= np.pad(b, ((0,0),(0, n - b.shape[1])))
+    a= np.pad(a, ((0,0),(0, n - a.shape[1])))
+    b= b / a[:,0:1]
+    a= a / a[:,0:1]
+    F= b.shape[0]
+    m= n - 1
+
+    A= np.zeros((F,m,m))
+    A[:,:,0]= -a[:,1:]
+    A[:,np.arange(m-1),np.arange(1,m)]= 1.0
+    B= (b[:,1:] - a[:,1:] * b[:,0:1])[:,:,None]
+    C= np.zeros((F,1,m))
+    C[:,0,0]= 1.0
+    D= b[:,0].reshape(F,1,1)
+    return A, B, C, D
+
+
+def tdf2_filtering(b, a, xin, zi=None, varying=False, dtype=np.float64):
+    # reference filtering process of direct form II transposed, one sample per step.
+    # same result as scipy.signal.lfilter(b, a, xin, zi=zi), filtering along the last axis.
+    # b, a shape (n,) or (..., n): one filter, or one filter per channel/band (leading axes broadcast with xin)
+    # varying: if True, b, a shape (..., len, n) are the coefficients of every sample (time-varying filter)
+    # xin shape (..., len), zi shape (..., n-1), return yout, zf
+    # dtype: dtype of filtering and output, the coefficients are normalized in float64
+    #   y[t]   = b[0] x[t] + z[0]
+    #   z[i]   = b[i+1] x[t] + z[i+1] - a[i+1] y[t]    (z[n-1]= 0)
+    # the recurrence over time is a python loop, but each step is vectorized over all channels/bands.
+    b= np.asarray(b, dtype=np.float64)
+    a= np.asarray(a, dtype=np.float64)
+    n= max(b.shape[-1], a.shape[-1], 2)
+    b= (np.concatenate([b, np.zeros(b.shape[:-1] + (n - b.shape[-1],))], axis=-1) / a[..., 0:1]).astype(dtype, copy=False)
+    a= (np.concatenate([a, np.zeros(a.shape[:-1] + (n - a.shape[-1],))], axis=-1) / a[..., 0:1]).astype(dtype, copy=False)
+    xin= np.asarray(xin, dtype=dtype)
+    nt= 2 if varying else 1  # number of trailing axes of coefficients
+    lead= np.broadcast_shapes(xin.shape[:-1], b.shape[:-nt], a.shape[:-nt])
+
+    # time axis first, so that every step reads and writes contiguous memory
+    xt= np.ascontiguousarray(np.moveaxis(np.broadcast_to(xin, lead + xin.shape[-1:]), -1, 0))
+    yt= np.empty(xt.shape, dtype=dtype)
+    if varying:
+        # coefficients of sample t are bt[i][t]
+        bt= [np.moveaxis(np.broadcast_to(b[..., i], lead + xin.shape[-1:]), -1, 0) for i in range(n)]
+        at= [np.moveaxis(np.broadcast_to(a[..., i], lead + xin.shape[-1:]), -1, 0) for i in range(n)]
+    else:
+        bt= [np.broadcast_to(b[..., i], lead)[None] for i in range(n)]
+        at= [np.broadcast_to(a[..., i], lead)[None] for i in range(n)]
+    z= [np.zeros(lead, dtype=dtype) for i in range(n)]  # z[n-1] stays 0
+    if zi is not None:
+        for i in range(n-1):
+            z[i][...]= np.asarray(zi)[..., i]
+    tmp= np.empty(lead, dtype=dtype)
+    for t in range(xt.shape[0]):
+        x= xt[t, ...]
+        y= yt[t, ...]
+        k= t if varying else 0
+        np.multiply(bt[0][k], x, out=y)
+        y += z[0]
+        for i in range(n-1):
+            np.multiply(bt[i+1][k], x, out=z[i])
+            z[i] += z[i+1]
+            np.multiply(at[i+1][k], y, out=tmp)
+            z[i] -= tmp
+    return np.moveaxis(yt, 0, -1), np.stack(z[:n-1], axis=-1)
+
+
+def _affine_scan(P, g):
+    # state sequence of s[k+1]= P[k] s[k] + g[k], s[0]= 0. return s[1...K]
+    # P shape (K,m,m), g shape (..., K, m)
+    # work efficient parallel scan: pairs of steps are combined into one step, the half length
+    # sequence is solved recursively, then the states between are filled.
+    K= P.shape[0]
+    if K == 1:
+        return g
+    K2= K // 2
+    P0, P1 = P[0:2*K2:2], P[1:2*K2:2]
+    g0, g1 = g[..., 0:2*K2:2, :], g[..., 1:2*K2:2, :]
+    s= np.empty(g.shape, dtype=g.dtype)
+    # odd steps: combined step of (2j, 2j+1)
+    s[..., 1:2*K2:2, :]= _affine_scan(np.matmul(P1, P0), np.einsum('kij,...kj->...ki', P1, g0) + g1)
+    # even steps: one step from the previous odd step
+    s[..., 0, :]= g[..., 0, :]
+    s[..., 2::2, :]= np.einsum('kij,...kj->...ki', P[2::2], s[..., 1:K-1:2, :]) + g[..., 2::2, :]
+    return s
+
+
+def tdf2_blockwise_filtering(b, a, xin, block_size, zi=None, dtype=np.float64):
+    # time-varying filtering process: block k of xin is filtered with coefficients b[k], a[k],
+    # and the state of direct form II transposed is carried over block to block.
+    # same result as calling scipy.signal.lfilter(b[k], a[k], block k, zi=zf of block k-1) for every block.
+    # b, a shape (K, n), K= number of blocks= ceil(len / block_size)
+    #   or shape (K, block_size, n), coefficients of every sample of block k (the last block uses the first ones)
+    # xin shape (..., len), zi shape (..., n-1), return yout, zf
+    # dtype: dtype of filtering and output, np.float64 or np.float32
+    # all blocks are computed at once:
+    #   1. zero-state response of every block, tdf2_filtering vectorized over blocks (loop over block_size samples)
+    #   2. zero-input response and state transition of every block, from the unit states
+    #   3. the state at the start of every block, by parallel prefix scan of the affine maps s -> Phi s + g
+    #   4. output= zero-state response + zero-input response of the state at the start of the block
+    varying= np.ndim(b) == 3
+    b= np.asarray(b, dtype=np.float64) if varying else np.atleast_2d(np.asarray(b, dtype=np.float64))
+    a= np.asarray(a, dtype=np.float64) if varying else np.atleast_2d(np.asarray(a, dtype=np.float64))
+    xin= np.asarray(xin, dtype=dtype)
+    L= block_size
+    n= xin.shape[-1]
+    K= n // L  # number of full blocks
+    m= max(b.shape[-1], a.shape[-1], 2) - 1
+    lead= xin.shape[:-1]
+    s= np.zeros(lead + (m,), dtype=dtype) if zi is None else np.array(np.broadcast_to(zi, lead + (m,)), dtype=dtype)
+    yout= np.empty(lead + (n,), dtype=dtype)
+
+    if K > 0:
+        bk= b[:K]
+        ak= a[:K]
+        X= xin[..., :K*L].reshape(lead + (K, L))
+        y0, g= tdf2_filtering(bk, ak, X, varying=varying, dtype=dtype)  # (..., K, L), (..., K, m)
+        eye= np.eye(m, dtype=dtype)[:, None, :]  # unit state (m, 1, m)
+        O, P= tdf2_filtering(bk, ak, np.zeros((m, K, L), dtype=dtype), zi=np.broadcast_to(eye, (m, K, m)), varying=varying, dtype=dtype)
+        O= O.transpose(1, 0, 2)  # (K, m, L) zero-input response of unit state j
+        P= P.transpose(1, 2, 0)  # (K, m, m) state transition, P[k][:, j]= state after block from unit state j
+
+        # state after every block, s[k+1]= P[k] s[k] + g[k]
+        g[..., 0, :] += np.einsum('ij,...j->...i', P[0], s)
+        g= _affine_scan(P, g)
+        S= np.empty(lead + (K, m), dtype=dtype)  # state at the start of every block
+        S[..., 0, :]= s
+        S[..., 1:, :]= g[..., :-1, :]
+        s= g[..., -1, :]
+        yout[..., :K*L]= (y0 + np.einsum('...km,kml->...kl', S, O)).reshape(lead + (K*L,))
+
+    if n > K * L:
+        # the last block, shorter than block_size
+        if varying:
+            r= n - K * L
+            yout[..., K*L:], s = tdf2_filtering(b[K, :r], a[K, :r], xin[..., K*L:], zi=s, varying=True, dtype=dtype)
+        else:
+            yout[..., K*L:], s = tdf2_filtering(b[K], a[K], xin[..., K*L:], zi=s, dtype=dtype)
+    return yout, s
+
+
+def _matmul_into(x1, x2, out, shape):
+    # out[...]= x1 @ x2, the result of shape is written into out (other shape)
+    y= out.reshape(shape)
+    if np.may_share_memory(y, out):
+        np.matmul(x1, x2, out=y)
+    else:
+        # out can not be reshaped without copy
+        out[...]= np.matmul(x1, x2).reshape(out.shape)
+
+
+class _Block_Level(object):
+    # one level of block processing of the linear recurrence
+    #   s[k+1] = A s[k] + B u[k]
+    #   y[k]   = C s[k] + D u[k]
+    # u shape (..., n, q), y shape (..., n, p), s shape (..., F, m)
+    # matrices are computed in float64, and stored in dtype (float32 halves memory traffic)
+    def __init__(self, A, B, C, D, L=32, dtype=np.float64):
+        self.A= A
+        self.dtype= np.dtype(dtype)
+        self.F, self.m, self.q= B.shape
+        self.p= C.shape[1]
+        self.L= L
+        F, m, q, p = self.F, self.m, self.q, self.p
+
+        # powers of A, Apow[i]= A^i,  i=0...L
+        self.Apow= np.zeros((L+1, F, m, m))
+        self.Apow[0]= np.eye(m)
+        for i in range(1, L+1):
+            self.Apow[i]= np.matmul(A, self.Apow[i-1])
+
+        # markov parameters (impulse response) H[0]=D, H[i]= C A^(i-1) B
+        H= np.zeros((L, F, p, q))
+        H[0]= D
+        H[1:]= np.matmul(np.matmul(C, self.Apow[:L-1]), B)
+
+        # Toeplitz matrix T (transposed, for row vector product): Tt[j*q+., k*p+.] = H[k-j]^T, k >= j
+        k= np.arange(L)
+        idx= k[None,:] - k[:,None]   # [j,k]
+        T4= np.where((idx >= 0)[:,:,None,None,None], H[np.maximum(idx,0)], 0.0)  # (L_j, L_k, F, p, q)
+        self.Tt= T4.transpose(2, 0, 4, 1, 3).reshape(F, L*q, L*p)
+
+        # zero-input response O (transposed): Ot[., k*p+.] = (C A^k)^T
+        O= np.matmul(C, self.Apow[:L])  # (L, F, p, m)
+        self.Ot= O.transpose(1, 3, 0, 2).reshape(F, m, L*p)
+
+        # input to state G (transposed): Gt[j*q+., .] = (A^(L-1-j) B)^T
+        G= np.matmul(self.Apow[L-1::-1], B)  # (L_j, F, m, q)
+        self.Gt= G.transpose(1, 0, 3, 2).reshape(F, L*q, m)
+
+        # block output from [input of block, state at start of block] in one matrix product
+        self.Wt= np.concatenate([self.Tt, self.Ot], axis=1)  # (F, L*q+m, L*p)
+        self.PhiT= self.Apow[L].transpose(0, 2, 1)
+        self.next_level= None
+        if self.dtype != np.float64:
+            self.Tt, self.Ot, self.Gt, self.Wt, self.PhiT = [M.astype(self.dtype) for M in (self.Tt, self.Ot, self.Gt, self.Wt, self.PhiT)]
+            self.Apow_d= self.Apow.astype(self.dtype)
+        else:
+            self.Apow_d= self.Apow
+
+    def get_next_level(self,):
+        # block to block state recurrence s[k+1]= Phi s[k] + g[k], output is s[k]
+        if self.next_level is None:
+            F, m = self.F, self.m
+            eye= np.broadcast_to(np.eye(m), (F, m, m))
+            self.next_level= _Block_Level(self.Apow[self.L], eye, eye, np.zeros((F, m, m)), self.L, self.dtype)
+        return self.next_level
+
+    def process(self, u, s, out):
+        # u (..., n, q) input, s (..., F, m) initial state, out (..., n, p) output buffer
+        # return final state
+        L, q, p = self.L, self.q, self.p
+        n= u.shape[-2]
+        nb= n // L
+        lead= out.shape[:-2]
+
+        if nb > 0:
+            U= u[..., :nb*L, :].reshape(u.shape[:-2] + (nb, L*q))
+            # X= [input of block, state at start of block]
+            X= np.empty(lead + (nb, L*q + self.m), dtype=self.dtype)
+            X[..., :L*q]= U
+            S= X[..., L*q:]
+            # input contribution of every block to the state at the end of the block
+            GU= np.matmul(U, self.Gt)  # (..., F, nb, m)
+            if nb == 1:
+                S[..., 0, :]= s
+                s= np.matmul(s[..., None, :], self.PhiT)[..., 0, :] + GU[..., 0, :]
+            else:
+                s= self.get_next_level().process(GU, s, S)
+            _matmul_into(X, self.Wt, out[..., :nb*L, :], lead + (nb, L*p))
+
+        r= n - nb * L
+        if r > 0:
+            # rest of samples, use the top-left part of block matrix
+            U= u[..., nb*L:, :].reshape(u.shape[:-2] + (1, r*q))
+            s1= s[..., None, :]
+            Y= np.matmul(U, self.Tt[:, :r*q, :r*p]) + np.matmul(s1, self.Ot[:, :, :r*p])
+            out[..., nb*L:, :]= Y.reshape(lead + (r, p))
+            s= (np.matmul(s1, self.Apow_d[r].transpose(0, 2, 1)) + np.matmul(U, self.Gt[:, (L-r)*q:, :]))[..., 0, :]
+        return s
+
+
+class Class_Block_Engine(object):
+    def __init__(self, b, a, block=32, segment_size=2**20, dtype=np.float64):
+        # b, a shape (F, n), one iir filter per row
+        # block: block length L of block processing
+        # segment_size: about number of output values computed at once, to bound temporary memory
+        # dtype: dtype of processing, input, output and state (np.float64 or np.float32)
+        A, B, C, D = tdf2_state_space(b, a)
+        self.F, self.m = A.shape[0], A.shape[1]
+        self.block= block
+        self.segment_size= segment_size
+        self.dtype= np.dtype(dtype)
+        self.level= _Block_Level(A, B, C, D, block, self.dtype)
+
+    def lead_shape(self, xin_shape):
+        # output shape except time axis, xin.shape[:-1] broadcasts with (F,)
+        return np.broadcast_shapes(tuple(xin_shape[:-1]), (self.F,))
+
+    def filtering(self, xin, out=None, zi=None):
+        # filtering process of all filters in one pass
+        # xin shape (n,) (same input to all filters) or (..., F, n) or (..., 1, n)
+        # out: output buffer shape (..., F, n), if None, it is allocated.
+        # zi: initial state shape (..., F, m), same as lfilter zi of each filter. if None, zero.
+        # return out, zf
+        xin= np.asarray(xin, dtype=self.dtype)
+        lead= self.lead_shape(xin.shape)
+        n= xin.shape[-1]
+        if out is None:
+            out= np.empty(lead + (n,), dtype=self.dtype)
+        if zi is None:
+            s= np.zeros(lead + (self.m,), dtype=self.dtype)
+        else:
+            s= np.broadcast_to(np.asarray(zi, dtype=self.dtype), lead + (self.m,))
+
+        u= xin[..., None]
+        y= out[..., None]
+        seg= max(1, self.segment_size // (int(np.prod(lead)) * self.block)) * self.block
+        for start in range(0, n, seg):
+            s= self.level.process(u[..., start:start+seg, :], s, y[..., start:start+seg, :])
+        return out, s
+
+
+if __name__ == '__main__':
+    from scipy import signal
+
+    # compare with scipy.signal.lfilter
+    rng= np.random.RandomState(0)
+    r= rng.uniform(0.5, 0.999, 8)
+    th= rng.uniform(0.01, 3.0, 8)
+    a= np.stack([np.ones(8), -2.0 * r * np.cos(th), r * r], axis=1)
+    b= rng.standard_normal((8,3))
+    x= rng.standard_normal(10000 + 7)
+
+    engine= Class_Block_Engine(b, a)
+    y, zf= engine.filtering(x)
+    for i in range(8):
+        y1, zf1 = signal.lfilter(b[i], a[i], x, zi=np.zeros(2))
+        print (i, 'max error', np.max(np.abs(y[i] - y1)), np.max(np.abs(zf[i] - zf1)))
+    y2, zf2 = tdf2_filtering(b, a, x)
+    print ('tdf2_filtering max error', np.max(np.abs(y2 - y)), np.max(np.abs(zf2 - zf)))
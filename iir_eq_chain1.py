@@ -0,0 +1,102 @@
+#coding:utf-8
+
+# A class of parametric EQ chain
+#  stacks peaking and shelving filter stages into one second-order-sections (sos) matrix,
+#  and processes the whole chain with one sosfilt pass.
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+#  matplotlib  3.10
+
+
+import numpy as np
+from scipy import signal
+
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_LowShelving1 import Class_IIR_LowShelving1
+from iir_HighShelving1 import Class_IIR_highShelving1
+from zero_phase1 import Zero_phase_mixin1
+from parallel1 import Parallel_mixin1
+from streaming1 import Streaming_mixin1
+
+
+class Class_IIR_EQ_Chain1(Zero_phase_mixin1, Parallel_mixin1, Streaming_mixin1):
+    def __init__(self, stages, sampling_rate=48000, dtype=np.float64):
+        # stages: list of filter stage, such as Class_IIR_Peaking1, Class_IIR_LowShelving1, Class_IIR_highShelving1
+        #         each stage has 2nd order b, a
+        # dtype: dtype of filtering and output, np.float64 or np.float32
+        # initalize
+        self.stages= list(stages)
+        self.sr= sampling_rate # sampling frequecny by unit is [Hz]
+        self.dtype= np.dtype(dtype)
+        self.sos= self.set_sos()
+        self.reset()
+
+    def set_sos(self,):
+        # stack (b, a) of every stage into sos matrix shape (number of stages, 6)
+        sos= np.zeros((max(len(self.stages), 1), 6))
+        sos[:,0]= 1.0 # flat, if no stage
+        sos[:,3]= 1.0
+        for i, stage in enumerate(self.stages):
+            if stage.sr != self.sr:
+                print ('warning: sampling rate of stage', i, 'is', stage.sr, ', not', self.sr)
+            b= np.asarray(stage.b, dtype=np.float64) / stage.a[0]
+            a= np.asarray(stage.a, dtype=np.float64) / stage.a[0]
+            sos[i,:len(b)]= b
+            sos[i,3:3+len(a)]= a
+        return sos
+
+    def filtering(self, xin, axis=-1):
+        # process filtering of whole chain in one pass, using scipy
+        # input xin, multichannel input such as shape (channels, samples) is filtered along axis in one call
+        # output filtered xin
+        return signal.sosfilt(self.sos.astype(self.dtype), np.asarray(xin, dtype=self.dtype), axis=axis)
+
+    def response(self, worN=1024):
+        # combined frequency response of the chain, using scipy
+        # return frequency list [Hz], complex response
+        return signal.sosfreqz(self.sos, worN=worN, fs=self.sr)
+
+    def f_show(self, worN=1024):
+        import matplotlib.pyplot as plt
+        # draw combined frequency response, using scipy
+        flist, fres = self.response(worN=worN)
+
+        fig = plt.figure()
+        ax1 = fig.add_subplot(111)
+        plt.title('frequency response of EQ chain')
+
+        plt.semilogx(flist, 20 * np.log10(abs(fres)), 'b')  # plt.plot(flist, 20 * np.log10(abs(fres)), 'b')
+        plt.ylabel('Amplitude [dB]', color='b')
+        plt.xlabel('Frequency [Hz]')
+
+        ax2 = ax1.twinx()
+        angles = np.unwrap(np.angle(fres))
+        angles = angles / ((2.0 * np.pi) / 360.0)
+        plt.semilogx(flist, angles, 'g')  # plt.plot(flist, angles, 'g')
+        plt.ylabel('Angle(deg)', color='g')
+        plt.grid()
+        plt.axis('tight')
+        plt.show()
+
+
+if __name__ == '__main__':
+
+    # 10 stages EQ sample: low shelf, 8 peaking, high shelf
+    stages= [Class_IIR_LowShelving1(fc=100, gain=2.0, slope=0.75, sampling_rate=48000)]
+    for fpeak, gain in zip([63, 125, 250, 500, 1000, 2000, 4000, 8000], [1.5, 0.7, 1.2, 0.8, 1.4, 0.6, 1.3, 0.9]):
+        stages.append(Class_IIR_Peaking1(fpeak=fpeak, gain=gain, Q=1.4, sampling_rate=48000))
+    stages.append(Class_IIR_highShelving1(fc=12000, gain=0.5, slope=1.0, sampling_rate=48000))
+    eq= Class_IIR_EQ_Chain1(stages, sampling_rate=48000)
+
+    # compare with stage by stage filtering
+    x= np.random.RandomState(0).standard_normal(48000)
+    y= x
+    for stage in stages:
+        y= stage.filtering(y)
+    print ('max error against stage by stage filtering', np.max(np.abs(eq.filtering(x) - y)))
+
+    # draw frequency response
+    eq.f_show()
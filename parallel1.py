@@ -0,0 +1,176 @@
+#coding:utf-8
+
+#
+# parallel-in-time filtering of one long signal
+#
+#  the signal is cut into chunks (one or a few per worker), and every chunk is filtered from zero state in a pool:
+#     y_k = zero-state response of chunk k,   g_k = final state of chunk k (from zero state)
+#  the true state at the start of every chunk is the linear recurrence over chunks
+#     s_{k+1} = Phi_k s_k + g_k       Phi_k = A^(length of chunk k), A: one sample state transition
+#  which is a short serial loop (one small matrix product per chunk). then the zero-input response of s_k
+#  is added to the head of chunk k. the zero-input response decays as (max pole radius) ** t, so it is computed
+#  only for decay_length(tol) samples, and the result is the serial lfilter / sosfilt result within about tol.
+#  scipy lfilter and sosfilt release the GIL, so the default pool is threads (no copy of the signal).
+#  a process pool pickles the chunks to the workers, it is for the case threads do not scale.
+#  Parallel_mixin1 gives filtering_parallel to the filter classes.
+
+import functools
+import numpy as np
+from scipy import signal
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from iir_block1 import tdf2_state_space
+from zero_phase1 import decay_length, ba_to_sos
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+def sos_state_transition(sos):
+    # one sample state transition matrix A of sosfilt state, the state (sections, 2) is flattened
+    sos= np.asarray(sos, dtype=np.float64)
+    m= 2 * len(sos)
+    A= np.empty((m, m))
+    for j in range(m):
+        zi= np.zeros(m)
+        zi[j]= 1.0
+        A[:, j]= signal.sosfilt(sos, np.zeros(1), zi=zi.reshape(-1, 2))[1].ravel()
+    return A
+
+
+def _lfilter_chunk(b, a, x):
+    # zero-state response and final state of a chunk
+    return signal.lfilter(b, a, x, zi=np.zeros(x.shape[:-1] + (len(a) - 1,), dtype=x.dtype))
+
+def _sosfilt_chunk(sos, x):
+    return signal.sosfilt(sos, x, zi=np.zeros((len(sos),) + x.shape[:-1] + (2,), dtype=x.dtype))
+
+
+def chunk_bounds(n, workers, chunk_size=None):
+    # start and end of chunks, default is one chunk per worker
+    if chunk_size is None:
+        chunk_size= -(-n // max(workers, 1))
+    chunk_size= max(int(chunk_size), 1)
+    return [(s, min(s + chunk_size, n)) for s in range(0, n, chunk_size)]
+
+
+def _parallel_filtering(chunk, zir, to_vec, from_vec, A, decay, x, workers, chunk_size, executor, zi):
+    # common process of parallel_lfilter and parallel_sosfilt
+    # chunk(x) -> zero-state y, zf (picklable for process pool).  zir(L, s) -> zero-input response of L samples from state s
+    # to_vec / from_vec convert the state layout of scipy to (..., m) vector and back
+    n= x.shape[-1]
+    bounds= chunk_bounds(n, workers, chunk_size)
+    out= np.empty(x.shape, dtype=x.dtype)
+    Pool= ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+
+    def run(k):
+        # thread worker writes its chunk into out
+        s, e = bounds[k]
+        y, zf = chunk(x[..., s:e])
+        out[..., s:e]= y
+        return None, zf
+
+    with Pool(workers) as pool:
+        if executor == 'process':
+            futures= [pool.submit(chunk, x[..., s:e]) for s, e in bounds]
+        else:
+            futures= [pool.submit(run, k) for k in range(len(bounds))]
+        g= []
+        for (s, e), fut in zip(bounds, futures):
+            y, zf = fut.result()
+            if y is not None:
+                out[..., s:e]= y
+            g.append(to_vec(zf))
+
+        # true state at the start of every chunk, serial recurrence over chunks
+        v= np.zeros(g[0].shape, dtype=np.float64) if zi is None else to_vec(np.asarray(zi, dtype=np.float64))
+        starts= []
+        powers= {}
+        for (s, e), gk in zip(bounds, g):
+            starts.append(v)
+            if e - s not in powers:
+                powers[e - s]= np.linalg.matrix_power(A, e - s)
+            v= np.einsum('ij,...j->...i', powers[e - s], v) + gk
+
+        # zero-input response correction of the head of every chunk
+        def correct(k):
+            s, e = bounds[k]
+            if not np.any(starts[k]):
+                return
+            L= min(decay, e - s)
+            out[..., s:s + L] += zir(L, from_vec(starts[k].astype(x.dtype)))
+
+        if executor == 'process':
+            for k in range(len(bounds)):
+                correct(k)
+        else:
+            list(pool.map(correct, range(len(bounds))))
+    return out, from_vec(v.astype(x.dtype))
+
+
+def parallel_lfilter(b, a, x_in, workers=4, chunk_size=None, executor='thread', zi=None, tol=1e-12, dtype=np.float64):
+    # same as scipy.signal.lfilter(b, a, x_in, zi=zi) along the last axis, within about tol of the output scale
+    # x_in shape (samples,) or (channels, samples)
+    # return y, or y, zf if zi is not None
+    dtype= np.dtype(dtype)
+    b= np.asarray(b, dtype=np.float64) / a[0]
+    a= np.asarray(a, dtype=np.float64) / a[0]
+    n= max(len(b), len(a))
+    b, a = np.pad(b, (0, n - len(b))), np.pad(a, (0, n - len(a)))
+    x= np.asarray(x_in, dtype=dtype)
+    if n < 2 or x.shape[-1] == 0:
+        y= signal.lfilter(b.astype(dtype), a.astype(dtype), x)
+        return y if zi is None else (y, np.zeros(x.shape[:-1] + (max(n - 1, 0),), dtype=dtype))
+    bd, ad = b.astype(dtype), a.astype(dtype)
+    A= tdf2_state_space(b, a)[0][0]
+    decay= decay_length(ba_to_sos(b, a), tol)
+    y, zf = _parallel_filtering(functools.partial(_lfilter_chunk, bd, ad),
+                                lambda L, s: signal.lfilter(bd, ad, np.zeros(s.shape[:-1] + (L,), dtype=dtype), zi=s)[0],
+                                lambda z: z, lambda v: v, A, decay, x, workers, chunk_size, executor, zi)
+    return y if zi is None else (y, zf)
+
+
+def parallel_sosfilt(sos, x_in, workers=4, chunk_size=None, executor='thread', zi=None, tol=1e-12, dtype=np.float64):
+    # same as scipy.signal.sosfilt(sos, x_in, zi=zi) along the last axis, within about tol of the output scale
+    # x_in shape (samples,) or (channels, samples), zi shape (sections, ..., 2)
+    # return y, or y, zf if zi is not None
+    dtype= np.dtype(dtype)
+    sos= np.array(sos, dtype=np.float64)
+    x= np.asarray(x_in, dtype=dtype)
+    sd= sos.astype(dtype)
+    if x.shape[-1] == 0:
+        return signal.sosfilt(sd, x, zi=zi) if zi is not None else signal.sosfilt(sd, x)
+    S= len(sos)
+    lead= x.shape[:-1]
+    to_vec= lambda z: np.moveaxis(z, 0, -2).reshape(lead + (2 * S,))
+    from_vec= lambda v: np.moveaxis(v.reshape(lead + (S, 2)), -2, 0)
+    y, zf = _parallel_filtering(functools.partial(_sosfilt_chunk, sd),
+                                lambda L, s: signal.sosfilt(sd, np.zeros(lead + (L,), dtype=dtype), zi=s)[0],
+                                to_vec, from_vec, sos_state_transition(sos), decay_length(sos, tol), x, workers, chunk_size, executor, zi)
+    return y if zi is None else (y, zf)
+
+
+class Parallel_mixin1(object):
+    # filtering_parallel of a filter class, by its sos (parallel_sosfilt), or (b, a) (parallel_lfilter)
+    def filtering_parallel(self, xin, workers=4, executor='thread'):
+        # same as the one-shot filtering along the last axis, the signal is cut into chunks and filtered in a pool of workers
+        sos= getattr(self, 'sos', None)
+        if sos is None:
+            return parallel_lfilter(self.b, self.a, xin, workers=workers, executor=executor, dtype=self.dtype)
+        return parallel_sosfilt(sos, xin, workers=workers, executor=executor, dtype=self.dtype)
+
+
+if __name__ == '__main__':
+
+    # compare with serial filtering
+    x= np.random.RandomState(0).standard_normal((2, 48000 * 20))
+    b, a = signal.iirpeak(1000, 5.0, fs=48000)
+    sos= signal.iirfilter(4, 100, btype='lowpass', ftype='butter', fs=48000, output='sos')
+    for name, serial, parallel in [('lfilter', lambda: signal.lfilter(b, a, x), lambda w: parallel_lfilter(b, a, x, workers=w)),
+                                   ('sosfilt', lambda: signal.sosfilt(sos, x), lambda w: parallel_sosfilt(sos, x, workers=w))]:
+        y0= serial()
+        for w in [1, 2, 4, 8]:
+            y1= parallel(w)
+            print (name, 'workers', w, 'max error / max output %.2e' % (np.max(np.abs(y1 - y0)) / np.max(np.abs(y0))))
@@ -0,0 +1,62 @@
+#coding:utf-8
+
+#
+# streaming (block by block) filtering of the filter classes
+#
+#  process_block filters one block and keeps the filter state (zi of scipy lfilter / sosfilt) for the next call,
+#  so that filtering block by block is same as one-shot filtering of all blocks at once.
+#  Streaming_mixin1 gives reset and process_block to the filter classes, by their sos (sosfilt), or (b, a) (lfilter).
+
+import numpy as np
+from scipy import signal
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+class Streaming_mixin1(object):
+    # reset and process_block of a filter class
+    # the class has sos, or (b, a), and dtype of filtering
+    zi= None  # filter state of process_block
+
+    def streaming_sos(self,):
+        # sos of process_block, or None to filter by (b, a)
+        return getattr(self, 'sos', None)
+
+    def reset(self,):
+        # clear the filter state of process_block
+        self.zi= None
+
+    def process_block(self, xin):
+        # streaming filtering process, using scipy
+        # the filter state is carried over to the next call, so that
+        # filtering block by block is same as filtering(all blocks at once)
+        # xin shape (samples,) or (channels, samples), block is along the last axis
+        x= np.asarray(xin, dtype=self.dtype)
+        sos= self.streaming_sos()
+        if self.zi is None:
+            if sos is None:
+                self.zi= np.zeros(x.shape[:-1] + (len(self.a) - 1,), dtype=self.dtype)
+            else:
+                self.zi= np.zeros((len(sos),) + x.shape[:-1] + (2,), dtype=self.dtype)
+        if x.shape[-1] == 0:  # filtering of empty input fails, the state is kept
+            return np.zeros(x.shape, dtype=self.dtype)
+        if sos is None:
+            yout, self.zi = signal.lfilter(self.b.astype(self.dtype), self.a.astype(self.dtype), x, zi=self.zi)
+        else:
+            yout, self.zi = signal.sosfilt(sos.astype(self.dtype), x, zi=self.zi)
+        return yout
+
+
+if __name__ == '__main__':
+
+    # compare with one-shot filtering
+    class Peak(Streaming_mixin1):
+        dtype= np.dtype(np.float64)
+        b, a = signal.iirpeak(1000, 5.0, fs=48000)
+    x= np.random.RandomState(0).standard_normal((2, 48000))
+    filt= Peak()
+    y1= np.concatenate([filt.process_block(x[:, s:s + 1000]) for s in range(0, 48000, 1000)], axis=-1)
+    print ('max error / max output %.2e' % (np.max(np.abs(y1 - signal.lfilter(filt.b, filt.a, x))) / np.max(np.abs(y1))))
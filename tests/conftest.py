@@ -0,0 +1,55 @@
+#coding:utf-8
+
+# the modules are flat files of the repository root and of filter_design, as the benchmark scripts use them
+# filter_case: the filter classes of the mixins (streaming, zero phase, parallel), shared by their tests
+
+import os
+import sys
+import contextlib
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_design'))
+
+from BPF import Class_BPF
+from BPF_bank import Class_BPF_bank
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_LowShelving1 import Class_IIR_LowShelving1
+from iir_HighShelving1 import Class_IIR_highShelving1
+from iir_eq_chain1 import Class_IIR_EQ_Chain1
+from filter_class1 import HPF4, LPF4, BPF4_butter, BPF2_Q, LPF1, Envelope1
+
+
+def quiet(make):
+    # some classes print their coefficients
+    with contextlib.redirect_stdout(None):
+        return make()
+
+
+# name: (make filter, one-shot filtering of the filter)
+filter_cases= {
+    'Class_BPF': (lambda: Class_BPF(fc=1000, Q=10.0), lambda f, x: f.filtering(x)),
+    'Class_IIR_Peaking1': (lambda: Class_IIR_Peaking1(fpeak=1000, gain=2.0, Q=1.0), lambda f, x: f.filtering(x)),
+    'Class_IIR_LowShelving1': (lambda: Class_IIR_LowShelving1(fc=100, gain=2.0), lambda f, x: f.filtering(x)),
+    'Class_IIR_highShelving1': (lambda: Class_IIR_highShelving1(fc=8000, gain=2.0), lambda f, x: f.filtering(x)),
+    'Class_IIR_EQ_Chain1': (lambda: Class_IIR_EQ_Chain1([Class_IIR_LowShelving1(fc=100), Class_IIR_Peaking1(fpeak=1000), Class_IIR_highShelving1(fc=8000)]),
+                            lambda f, x: f.filtering(x)),
+    'HPF4': (lambda: HPF4(), lambda f, x: f(x)),
+    'LPF4': (lambda: LPF4(), lambda f, x: f(x)),
+    'BPF4_butter': (lambda: BPF4_butter(), lambda f, x: f(x)),
+    'BPF2_Q': (lambda: BPF2_Q(), lambda f, x: f(x)),
+    # process_block only, select them by indirect parametrize of filter_case
+    'Class_BPF_bank': (lambda: Class_BPF_bank(fbase=100.0, fstep=300.0, fband=8, Q=10.0), lambda f, x: f.filtering(x)),
+    'LPF1': (lambda: LPF1(MAPN=64), lambda f, x: f(x)),
+    'Envelope1': (lambda: Envelope1(MAPN=64, hop=100, mode='rms', dtype=np.float64), lambda f, x: f(x)),
+}
+mixin_cases= sorted(set(filter_cases) - {'Class_BPF_bank', 'LPF1', 'Envelope1'})
+
+
+@pytest.fixture(params=mixin_cases)
+def filter_case(request):
+    # (make filter without its prints, one-shot filtering)
+    make, one_shot = filter_cases[request.param]
+    return lambda: quiet(make), one_shot
@@ -0,0 +1,88 @@
+#coding:utf-8
+
+# Class_IIR_Peaking1.process_block_automation: coefficients are interpolated sample by sample, without zipper steps
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from iir_peaking1 import Class_IIR_Peaking1
+from iir_block1 import tdf2_blockwise_filtering
+
+
+SR= 48000
+
+
+def second_difference(y):
+    # max |y[t+1] - 2 y[t] + y[t-1]|, a sine of low frequency is small, a step of output is large
+    return np.max(np.abs(np.diff(y, 2)))
+
+
+def test_constant_parameters_same_as_static():
+    x= np.random.RandomState(0).standard_normal((2, 5000))
+    pk= Class_IIR_Peaking1(fpeak=1000, gain=3.0, Q=2.0, sampling_rate=SR)
+    y= pk.process_block_automation(x)
+    y0= signal.lfilter(pk.b, pk.a, x)
+    np.testing.assert_allclose(y, y0, rtol=0.0, atol=1e-10 * np.max(np.abs(y0)))
+
+
+@pytest.mark.parametrize('block_size', [1, 32, 4096])
+@pytest.mark.parametrize('param, start, stop', [('gain', 1.0, 8.0), ('fpeak', 50.0, 200.0), ('Q', 0.5, 4.0)])
+def test_sweep_has_no_steps(param, start, stop, block_size):
+    # coarse automation (4096 samples per coefficient design) must be as smooth as the static filter of the loudest setting
+    n= SR // 2
+    x= np.sin(2.0 * np.pi * 100.0 * np.arange(n) / SR)
+    params= {'fpeak': 100.0, 'gain': 8.0, 'Q': 2.0}
+    pk= Class_IIR_Peaking1(sampling_rate=SR, **dict(params, **{param: start}))
+    y= pk.process_block_automation(x, block_size=block_size, **{param: np.geomspace(start, stop, n)})
+    y0= Class_IIR_Peaking1(sampling_rate=SR, **params).process_block(x)
+    skip= 4000  # start transient
+    assert second_difference(y[skip:]) <= 1.05 * second_difference(y0[skip:])
+    assert getattr(pk, param) == pytest.approx(stop)
+
+
+def test_blockwise_calls_same_as_one_call():
+    # trajectory cut at block boundaries, the filter state and the coefficients continue
+    n, block_size= 4096, 64
+    x= np.random.RandomState(1).standard_normal(n)
+    fpeak= np.geomspace(200.0, 5000.0, n)
+    y0= Class_IIR_Peaking1(fpeak=200, gain=4.0, Q=1.0, sampling_rate=SR).process_block_automation(x, fpeak=fpeak, block_size=block_size)
+    pk= Class_IIR_Peaking1(fpeak=200, gain=4.0, Q=1.0, sampling_rate=SR)
+    y= np.concatenate([pk.process_block_automation(x[sl], fpeak=fpeak[sl], block_size=block_size) for sl in [slice(0, 1024), slice(1024, 3072), slice(3072, n)]])
+    np.testing.assert_allclose(y, y0, rtol=0.0, atol=1e-10 * np.max(np.abs(y0)))
+
+
+def test_tdf2_blockwise_per_sample_coefficients():
+    # coefficients of every sample, same as lfilter one sample at a time
+    rng= np.random.RandomState(2)
+    n, L= 1000, 32
+    K= (n + L - 1) // L
+    b= np.array([1.0, -1.5, 0.7]) + 0.01 * rng.standard_normal((K, L, 3))
+    a= np.array([1.0, -1.6, 0.8]) + 0.01 * rng.standard_normal((K, L, 3))
+    x= rng.standard_normal((2, n))
+    zi= rng.standard_normal((2, 2))
+    y, zf= tdf2_blockwise_filtering(b, a, x, L, zi=zi)
+    y0= np.empty(x.shape)
+    z= zi
+    for t in range(n):
+        y0[:, t:t+1], z= signal.lfilter(b[t // L, t % L], a[t // L, t % L], x[:, t:t+1], zi=z)
+    np.testing.assert_allclose(y, y0, rtol=0.0, atol=1e-10 * np.max(np.abs(y0)))
+    np.testing.assert_allclose(zf, z, rtol=0.0, atol=1e-10 * np.max(np.abs(y0)))
+
+
+def test_dtype_and_no_cache_entries():
+    # filtering, state and output in dtype of the filter, and a sweep does not put its end coefficients into coef_cache
+    from coef_cache1 import coef_cache
+    n= 4096
+    x= np.random.RandomState(3).standard_normal(n)
+    fpeak= np.geomspace(200.0, 5000.0, n)
+    y0= Class_IIR_Peaking1(fpeak=200, gain=4.0, Q=1.0, sampling_rate=SR).process_block_automation(x, fpeak=fpeak)
+    pk= Class_IIR_Peaking1(fpeak=200, gain=4.0, Q=1.0, sampling_rate=SR, dtype=np.float32)
+    keys= set(coef_cache.data)
+    y= pk.process_block_automation(x, fpeak=fpeak)
+    assert set(coef_cache.data) == keys
+    assert y.dtype == np.float32 and pk.zi.dtype == np.float32
+    np.testing.assert_allclose(y, y0, rtol=0.0, atol=1e-3 * np.max(np.abs(y0)))  # float32, same as test_iir2
+    # b, a are of the last parameters, and process_block continues with them
+    np.testing.assert_allclose(np.array([pk.b, pk.a]), np.array(Class_IIR_Peaking1(fpeak=5000, gain=4.0, Q=1.0, sampling_rate=SR).set_peaking(5000, 4.0, 1.0)), rtol=1e-12)
+    assert pk.process_block(x[:100]).dtype == np.float32
@@ -0,0 +1,42 @@
+#coding:utf-8
+
+# filter spec check of batch1.py: a wrong spec raises ValueError (exit 2 of the command)
+# an output is made again, when the filter spec or dtype is changed
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from scipy.io.wavfile import write as wavwrite
+
+import batch1
+
+
+@pytest.mark.parametrize('spec', ['Class_BPF(fc=1000, Q=0)', 'Class_BPF_bank(Q=0)', 'Class_IIR_Peaking1(Q=0)',
+                                  'HPF4(N=4', 'Unknown(fc=1)', 'HPF4(order=4)'])
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')  # division by Q=0 of the peaking design
+def test_wrong_spec_raises(spec):
+    with pytest.raises(ValueError):
+        batch1.make_filter(spec, 48000)
+
+
+def test_wrong_spec_exits_2(tmp_path):
+    script= os.path.join(os.path.dirname(os.path.abspath(batch1.__file__)), 'batch1.py')
+    out= subprocess.run([sys.executable, script, '-i', str(tmp_path), '-o', str(tmp_path / 'out'), '-f', 'Class_BPF(Q=0)'],
+                        capture_output=True, text=True)
+    assert out.returncode == 2
+
+
+def test_changed_spec_or_dtype_is_made_again(tmp_path):
+    dir_in= tmp_path / 'in'
+    dir_in.mkdir()
+    wavwrite(str(dir_in / 'a.wav'), 8000, (np.random.default_rng(0).standard_normal(4000) * 3000).astype(np.int16))
+    run= lambda spec, dtype=np.float64: batch1.batch_filter(str(dir_in), str(tmp_path / 'out'), spec, jobs=1, dtype=dtype)
+    assert run('HPF4(fc=300)')['done'] == 1
+    assert run('HPF4( fc = 300 )')['skipped'] == 1  # the same spec
+    assert run('HPF4(fc=500)')['done'] == 1
+    assert run('HPF4(fc=500)', np.float32)['done'] == 1
+    assert run('HPF4(fc=500)', np.float32)['skipped'] == 1
+    assert batch1.read_manifest(str(tmp_path / 'out')) == {'a.wav': batch1.filter_settings('HPF4(fc=500)', np.float32)}
@@ -0,0 +1,41 @@
+#coding:utf-8
+
+# coef_cache holds only read-only coefficient arrays, not processing objects
+
+import numpy as np
+
+from coef_cache1 import coef_cache
+from BPF import Class_BPF
+from BPF_bank import Class_BPF_bank
+
+
+def arrays(value):
+    # numpy arrays in value (array, or tuple/list/dict of arrays), None if value has another type
+    if isinstance(value, np.ndarray):
+        return [value]
+    if isinstance(value, (tuple, list)):
+        items= list(value)
+    elif isinstance(value, dict):
+        items= list(value.values())
+    else:
+        return None
+    out= []
+    for v in items:
+        a= arrays(v)
+        if a is None:
+            return None
+        out += a
+    return out
+
+
+def test_cache_has_coefficients_only():
+    x= np.random.RandomState(0).standard_normal(4096)
+    bank= Class_BPF_bank(fbase=100.0, fstep=100.0, fband=40)
+    bank.filtering(x)
+    bank.octave().filtering(x, upsample=True)
+    Class_BPF(fc=1000).iir2(x)
+    for key, value in coef_cache.data.items():
+        a= arrays(value)
+        assert a is not None, key
+        assert not any(v.flags.writeable for v in a), key
+    assert bank.engine is not None
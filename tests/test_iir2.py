@@ -0,0 +1,91 @@
+#coding:utf-8
+
+# Class_BPF.iir2 backends and the engines of iir_block1.py against scipy.signal.lfilter
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from BPF import Class_BPF
+from iir_block1 import Class_Block_Engine, tdf2_filtering, tdf2_blockwise_filtering
+
+
+def random_filters(F, order=2, seed=0):
+    # stable filters of random poles (radius 0.5 ... 0.999) and random numerators, shape (F, order+1)
+    rng= np.random.RandomState(seed)
+    a= np.ones((F, 1))
+    for k in range(order // 2):
+        r= rng.uniform(0.5, 0.999, F)
+        th= rng.uniform(0.01, 3.0, F)
+        a= np.array([np.convolve(a[i], [1.0, -2.0 * r[i] * np.cos(th[i]), r[i] * r[i]]) for i in range(F)])
+    b= rng.standard_normal((F, order + 1))
+    return b, a
+
+
+def assert_close(y, y0, tol):
+    # max error relative to the max output
+    np.testing.assert_allclose(y, y0, rtol=0.0, atol=tol * max(np.max(np.abs(y0), initial=0.0), 1.0))
+
+
+@pytest.mark.parametrize('fc, Q', [(1000, 1.0), (1000, 10.0), (50, 30.0), (15000, 2.0)])
+@pytest.mark.parametrize('backend', ['block', 'tdf2', 'loop'])
+def test_iir2_backends(fc, Q, backend):
+    bpf= Class_BPF(fc=fc, Q=Q)
+    x= np.random.RandomState(1).standard_normal(2000 if backend == 'loop' else 20000 + 7)
+    y0= signal.lfilter(bpf.b, bpf.a, x)
+    assert_close(bpf.iir2(x, backend=backend), y0, 1e-9)
+
+
+@pytest.mark.parametrize('backend', ['block', 'tdf2'])
+def test_iir2_multichannel(backend):
+    bpf= Class_BPF(fc=1000, Q=10.0)
+    x= np.random.RandomState(2).standard_normal((3, 5000))
+    assert_close(bpf.iir2(x, backend=backend), signal.lfilter(bpf.b, bpf.a, x), 1e-9)
+
+
+@pytest.mark.parametrize('order', [2, 4])
+def test_tdf2_filtering_with_state(order):
+    b, a = random_filters(6, order, seed=order)
+    x= np.random.RandomState(3).standard_normal(3000)
+    zi= np.random.RandomState(4).standard_normal((6, a.shape[1] - 1))
+    y, zf = tdf2_filtering(b, a, x, zi=zi)
+    for i in range(6):
+        y0, zf0 = signal.lfilter(b[i], a[i], x, zi=zi[i])
+        assert_close(y[i], y0, 1e-10)
+        assert_close(zf[i], zf0, 1e-10)
+
+
+@pytest.mark.parametrize('n', [0, 1, 31, 32, 10007])
+def test_block_engine(n):
+    b, a = random_filters(8)
+    x= np.random.RandomState(5).standard_normal(n)
+    zi= np.random.RandomState(6).standard_normal((8, 2))
+    y, zf = Class_Block_Engine(b, a).filtering(x, zi=zi)
+    assert y.shape == (8, n)
+    for i in range(8):
+        y0, zf0 = signal.lfilter(b[i], a[i], x, zi=zi[i]) if n > 0 else (x, zi[i])
+        assert_close(y[i], y0, 1e-9)
+        assert_close(zf[i], zf0, 1e-9)
+
+
+def test_block_engine_float32():
+    b, a = random_filters(4)
+    x= np.random.RandomState(7).standard_normal(5000)
+    y, zf = Class_Block_Engine(b, a, dtype=np.float32).filtering(x)
+    assert y.dtype == np.float32
+    for i in range(4):
+        assert_close(y[i], signal.lfilter(b[i], a[i], x), 1e-3)
+
+
+def test_blockwise_filtering():
+    # time-varying coefficients: same as lfilter block by block with the state carried over
+    L, K = 64, 20
+    rng= np.random.RandomState(8)
+    b, a = random_filters(K + 1, seed=9)
+    x= rng.standard_normal(K * L + 13)
+    y, zf = tdf2_blockwise_filtering(b, a, x, L)
+    s= np.zeros(2)
+    for k in range(K + 1):
+        y0, s = signal.lfilter(b[k], a[k], x[k * L:(k + 1) * L], zi=s)
+        assert_close(y[k * L:(k + 1) * L], y0, 1e-9)
+    assert_close(zf, s, 1e-9)
@@ -0,0 +1,46 @@
+#coding:utf-8
+
+# import time budget of the processing modules, same measure as benchmark/bench_import1.py
+#  each case is imported in a fresh python process (after numpy and scipy.signal), so it takes a few seconds.
+
+import sys
+import json
+import subprocess
+
+import pytest
+
+from benchmark.bench_import1 import import_time, root
+
+
+BUDGET= 0.1  # [sec], same as the default of bench_import1.py
+
+
+@pytest.mark.parametrize('statement', [
+    'import filter_design',
+    'import filter_design; filter_design.HPF4',
+    'import filter_design; filter_design.Class_BPF_bank',
+    'import iir_peaking1',
+    'import wav_stream1',
+])
+def test_import_budget(statement):
+    r= import_time(statement, repeat=2)
+    assert r['plot'] == []
+    assert r['time'] < BUDGET
+
+
+def test_package_import_does_not_repeat_sys_path():
+    # the package puts the flat module directories on sys.path once, the modules do not add them again
+    code= 'import sys, os, json; import filter_design; filter_design.HPF4; filter_design.Class_BPF_bank; ' \
+          'print(json.dumps([os.path.normcase(os.path.abspath(p)) for p in sys.path if p]))'
+    out= subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=root)
+    paths= json.loads(out.stdout.strip().splitlines()[-1])
+    assert len(paths) == len(set(paths))
+
+
+def test_package_rejects_shadowed_module(tmp_path):
+    # a BPF.py earlier on sys.path is not taken as the flat module of the package
+    (tmp_path / 'BPF.py').write_text('Class_BPF= None\n')
+    code= 'import sys; sys.path.insert(0, %r); import filter_design\n' \
+          'try:\n    filter_design.Class_BPF\nexcept ImportError:\n    print("ImportError")' % str(tmp_path)
+    out= subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=root)
+    assert out.stdout.strip() == 'ImportError'
@@ -0,0 +1,48 @@
+#coding:utf-8
+
+# Class_BPF_bank_octave: magnitude response and upsampled band power are close to the full rate bank,
+# process_block is same as one-shot, and wrong arguments raise ValueError
+
+import numpy as np
+import pytest
+
+from BPF_bank import Class_BPF_bank, constant_Q
+from BPF_bank_octave1 import Class_BPF_bank_octave
+
+
+def test_response_close_to_full_rate_bank():
+    # magnitude response within 0.15dB where the full rate response is over -3dB (0.11dB measured)
+    bank= Class_BPF_bank(fbase=25.0, fband=54, Q=constant_Q(6), bands_per_octave=6)
+    freq= np.geomspace(20.0, 23000.0, 4000)
+    r0= 20 * np.log10(np.maximum(bank.response(freq), 1e-12))
+    r1= 20 * np.log10(np.maximum(bank.octave().response(freq), 1e-12))
+    assert np.max(np.abs(r1 - r0)[r0 > -3.0]) < 0.15
+
+
+def test_upsample_band_power_close_to_full_rate_bank():
+    # the waveform differs from the full rate bank (phase of the lowpass around fc), but the power of every band is
+    # within 0.6dB for noise (0.09 ... 0.52dB measured, from the response difference in the skirts)
+    bank= Class_BPF_bank(fbase=50.0, fband=36, Q=constant_Q(6), bands_per_octave=6)
+    x= np.random.RandomState(0).standard_normal(48000)
+    y0= bank.filtering(x)
+    y= bank.octave().filtering(x, upsample=True)
+    assert y.shape == y0.shape
+    skip= 5000  # start transient of the low bands
+    power_db= 10 * np.log10(np.mean(y[:, skip:] ** 2, axis=-1) / np.mean(y0[:, skip:] ** 2, axis=-1))
+    assert np.all(np.abs(power_db) < 0.6)
+
+
+def test_process_block_same_as_filtering():
+    octave_bank= Class_BPF_bank(fbase=100.0, fband=18, Q=constant_Q(6), bands_per_octave=6).octave()
+    x= np.random.RandomState(1).standard_normal((2, 9000))
+    y0= octave_bank.filtering(x)
+    ys= [octave_bank.process_block(x[..., s:s + 1000]) for s in range(0, 9000, 1000)]
+    for j in range(octave_bank.levels):
+        y1= np.concatenate([y[j] for y in ys], axis=-1)
+        np.testing.assert_allclose(y1, y0[j], rtol=0.0, atol=1e-10 * max(np.max(np.abs(y0[j]), initial=0.0), 1.0))
+
+
+@pytest.mark.parametrize('fc_list, Q', [([100.0, 1000.0], 0.0), ([100.0, 24000.0], 10.0)])
+def test_wrong_arguments(fc_list, Q):
+    with pytest.raises(ValueError):
+        Class_BPF_bank_octave(fc_list, Q=Q, sampling_rate=48000)
@@ -0,0 +1,24 @@
+#coding:utf-8
+
+# filtering_parallel (Parallel_mixin1 of parallel1.py) is the same as one-shot filtering
+
+import numpy as np
+import pytest
+
+from filter_class1 import HPF4
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_parallel_equals_one_shot(filter_case, workers):
+    make, one_shot = filter_case
+    filt= make()
+    x= np.random.RandomState(0).standard_normal((2, 60000))
+    y0= one_shot(filt, x)
+    y= filt.filtering_parallel(x, workers=workers)
+    np.testing.assert_allclose(y, y0, rtol=0.0, atol=1e-9 * np.max(np.abs(y0)))
+
+
+def test_parallel_alias():
+    filt= HPF4()
+    x= np.random.RandomState(1).standard_normal(50000)
+    np.testing.assert_array_equal(filt.parallel(x, workers=2), filt.filtering_parallel(x, workers=2))
@@ -0,0 +1,47 @@
+#coding:utf-8
+
+# Class_BPF_bank backend 'stft': filtering is close to the time domain, filtering_frames is always time domain,
+# and spectral_frames is the frequency domain estimate of band power
+
+import numpy as np
+import pytest
+
+from BPF_bank import Class_BPF_bank
+
+
+def banks(**kwargs):
+    return [Class_BPF_bank(fbase=200.0, fstep=500.0, fband=20, Q=10.0, backend=backend, **kwargs) for backend in ['iir', 'stft']]
+
+
+def test_filtering_close_to_time_domain():
+    iir, stft = banks()
+    x= np.random.RandomState(0).standard_normal((2, 20000))
+    y0= iir.filtering(x)
+    np.testing.assert_allclose(stft.filtering(x), y0, rtol=0.0, atol=1e-8 * np.max(np.abs(y0)))
+
+
+@pytest.mark.parametrize('mode', ['rms', 'peak', 'mean_abs', 'envelope'])
+def test_filtering_frames_same_for_both_backends(mode):
+    iir, stft = banks()
+    x= np.random.RandomState(1).standard_normal(20000)
+    np.testing.assert_array_equal(stft.filtering_frames(x, frame=512, mode=mode, tau=0.005),
+                                  iir.filtering_frames(x, frame=512, mode=mode, tau=0.005))
+
+
+def test_spectral_frames_mean_power():
+    iir, stft = banks()
+    x= np.random.RandomState(2).standard_normal(48000 * 4)
+    p0= iir.filtering_frames(x, frame=1024) ** 2
+    p1= stft.spectral_frames(x, frame=1024, mode='power')
+    assert p1.shape == p0.shape
+    skip= 8  # frames of the window over the start
+    assert np.max(np.abs(10 * np.log10(p1[:, skip:].mean(axis=-1) / p0[:, skip:].mean(axis=-1)))) < 0.1
+
+
+def test_unknown_mode_raises():
+    iir, stft = banks()
+    x= np.zeros(4096)
+    with pytest.raises(ValueError):
+        iir.filtering_frames(x, mode='power')
+    with pytest.raises(ValueError):
+        stft.spectral_frames(x, mode='peak')
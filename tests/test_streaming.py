@@ -0,0 +1,60 @@
+#coding:utf-8
+
+# process_block: filtering block by block (state carried over) is the same as one-shot filtering
+# Multirate1 and Envelope1 filter and return in dtype of the filter
+
+import numpy as np
+import pytest
+
+from filter_class1 import HPF4, LPF4, LPF1, Envelope1
+from multirate1 import Multirate1
+
+
+def check_blockwise(make, one_shot, shape):
+    # make filter, and its one-shot filtering (filter_case of conftest.py)
+    x= np.random.RandomState(0).standard_normal(shape)
+    y0= one_shot(make(), x)
+    filt= make()
+    # fixed 256 sample blocks, then irregular sizes (including empty and a single sample)
+    for sizes in ([256] * (shape[-1] // 256 + 1), [1, 0, 700, 33, 4000, 1, 5000]):
+        filt.reset()
+        ys, s = [], 0
+        for n in sizes:
+            ys.append(filt.process_block(x[..., s:s + n]))
+            s += n
+        y1= np.concatenate(ys, axis=-1)
+        assert y1.shape == y0.shape
+        np.testing.assert_allclose(y1, y0, rtol=0.0, atol=1e-10 * max(np.max(np.abs(y0)), 1.0))
+
+
+@pytest.mark.parametrize('shape', [(9000,), (2, 9000)])
+def test_blockwise_equals_one_shot(filter_case, shape):
+    check_blockwise(*filter_case, shape)
+
+
+# the classes of process_block without the other mixins
+@pytest.mark.parametrize('filter_case', ['Class_BPF_bank', 'LPF1', 'Envelope1'], indirect=True)
+@pytest.mark.parametrize('shape', [(9000,), (2, 9000)])
+def test_blockwise_equals_one_shot_others(filter_case, shape):
+    check_blockwise(*filter_case, shape)
+
+
+@pytest.mark.parametrize('make', [lambda: Envelope1(mode='peak'), lambda: LPF4(fc=1000).multirate(factor=64), lambda: Multirate1(HPF4())])
+def test_wrong_arguments_raise(make):
+    with pytest.raises(ValueError):
+        make()
+
+
+@pytest.mark.parametrize('make', [lambda dtype: LPF4(dtype=dtype).multirate(), lambda dtype: LPF1(dtype=dtype).multirate(),
+                                  lambda dtype: LPF4(dtype=dtype).multirate(interpolate=False), lambda dtype: Envelope1(MAPN=256, dtype=dtype)])
+def test_multirate_and_envelope_keep_dtype(make):
+    x= np.random.RandomState(1).standard_normal((2, 48000))
+    y0= make(np.float64)(x)
+    filt= make(np.float32)
+    y= filt(x)
+    assert y0.dtype == np.float64 and y.dtype == np.float32 and filt.process_block(x).dtype == np.float32
+    np.testing.assert_allclose(y, y0, rtol=0.0, atol=1e-4 * np.max(np.abs(y0)))
+
+
+def test_envelope_default_float32():
+    assert Envelope1(MAPN=256)(np.ones(1024)).dtype == np.float32
@@ -0,0 +1,46 @@
+#coding:utf-8
+
+# Class_Tone_Detector: method 'dft' and 'goertzel' give the same values, process_block is the same as detect,
+# the rms of a steady tone is the rms of Class_BPF output, and wrong arguments raise ValueError
+
+import numpy as np
+import pytest
+
+from BPF import Class_BPF
+from tone_detect1 import Class_Tone_Detector
+
+
+sr= 48000
+x= np.sin(2.0 * np.pi * 1000.0 * np.arange(sr) / sr) * 0.5 + np.random.RandomState(0).standard_normal((2, sr)) * 0.1
+
+
+@pytest.mark.parametrize('window', ['hann', 'rect'])
+def test_dft_same_as_goertzel(window):
+    detector= Class_Tone_Detector([500.0, 1000.0, 2000.0], Q=10.0, hop=1024, sampling_rate=sr, window=window)
+    np.testing.assert_allclose(detector.detect(x, method='goertzel'), detector.detect(x, method='dft'), rtol=1e-9, atol=1e-12)
+
+
+def test_process_block_same_as_detect():
+    detector= Class_Tone_Detector([500.0, 1000.0, 2000.0], Q=10.0, hop=1024, sampling_rate=sr)
+    y= np.concatenate([detector.process_block(x[:, i:i + 3000]) for i in range(0, sr, 3000)], axis=-1)
+    np.testing.assert_allclose(y, detector.detect(x), rtol=1e-9, atol=1e-12)
+
+
+def test_steady_tone_rms_same_as_bpf():
+    tone= np.sin(2.0 * np.pi * 1000.0 * np.arange(sr) / sr) * 0.5
+    bpf= Class_BPF(fc=1000.0, Q=10.0, sampling_rate=sr)
+    rms= np.median(bpf.tone_detector().detect(tone, mode='rms')[0, 10:])
+    rms_bpf= np.sqrt(np.mean(bpf.filtering(tone)[sr // 2:] ** 2))
+    assert abs(20 * np.log10(rms / rms_bpf)) < 0.01
+
+
+@pytest.mark.parametrize('kwargs', [{'window': 'hamming'}, {'freqs': [0.0]}, {'freqs': [sr / 2]}, {'Q': 0.0}])
+def test_wrong_arguments_raise(kwargs):
+    with pytest.raises(ValueError):
+        Class_Tone_Detector(**dict({'freqs': [1000.0], 'sampling_rate': sr}, **kwargs))
+
+
+@pytest.mark.parametrize('kwargs', [{'mode': 'db'}, {'method': 'fft'}])
+def test_wrong_frames_arguments_raise(kwargs):
+    with pytest.raises(ValueError):
+        Class_Tone_Detector([1000.0], sampling_rate=sr).detect(x, **kwargs)
@@ -0,0 +1,33 @@
+#coding:utf-8
+
+# 16bit conversion of wav_stream1.py: float data is clipped, int16 is not a filtering dtype
+
+import numpy as np
+import pytest
+
+from wav_stream1 import to_dtype, to_int16
+
+
+def test_to_int16_clips():
+    y= to_int16(np.array([1.2, -1.5, 0.5, -1.0]))
+    np.testing.assert_array_equal(y, [32767, -32767, 16383, -32767])
+    assert to_int16(np.float32([3.0]))[0] == 32767
+
+
+def test_to_int16_keeps_int16():
+    w= np.array([-32768, 0, 32767], dtype=np.int16)
+    assert to_int16(w) is w
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_to_dtype_scale(dtype):
+    w= np.array([-32768, 0, 16384], dtype=np.int16)
+    x= to_dtype(w, dtype)
+    assert x.dtype == dtype
+    np.testing.assert_array_equal(x, [-1.0, 0.0, 0.5])
+    np.testing.assert_array_equal(to_int16(x), [-32767, 0, 16383])
+
+
+def test_to_dtype_rejects_int16():
+    with pytest.raises(ValueError):
+        to_dtype(np.zeros(4, dtype=np.int16), np.int16)
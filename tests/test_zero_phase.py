@@ -0,0 +1,41 @@
+#coding:utf-8
+
+# filtfilt_chunks: chunked zero phase filtering deviates from one-shot filtfilt by less than the decay tolerance
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from filter_class1 import LPF4, BPF2_Q
+from zero_phase1 import sosfiltfilt_chunked
+
+
+@pytest.mark.parametrize('shape', [(30000,), (2, 30000)])
+def test_chunks_close_to_one_shot(filter_case, shape):
+    filt= filter_case[0]()
+    x= np.random.RandomState(0).standard_normal(shape)
+    y0= filt.filtfilt(x)
+    np.testing.assert_allclose(y0, signal.sosfiltfilt(np.array(filt.zero_phase_sos()), x), rtol=0.0, atol=1e-10 * np.max(np.abs(y0)))
+    ys= list(filt.filtfilt_chunks(x, chunk_size=4096))
+    assert all(y.shape[-1] <= 4096 for y in ys)
+    y1= np.concatenate(ys, axis=-1)
+    assert y1.shape == y0.shape
+    np.testing.assert_allclose(y1, y0, rtol=0.0, atol=1e-8 * np.max(np.abs(y0)))
+
+
+def test_short_overlap_deviates():
+    # the deviation is from the start of the backward pass of every chunk, it grows as overlap is shorter
+    filt= LPF4()
+    x= np.random.RandomState(1).standard_normal(30000)
+    y0= filt.filtfilt(x)
+    errors= [np.max(np.abs(np.concatenate(list(filt.filtfilt_chunks(x, chunk_size=4096, overlap=overlap))) - y0)) for overlap in [100, 1000, None]]
+    assert errors[0] > errors[1] > errors[2]
+
+
+def test_chunked_into_out():
+    filt= BPF2_Q()
+    x= np.random.RandomState(2).standard_normal((2, 20000))
+    out= np.empty(x.shape)
+    y= sosfiltfilt_chunked(filt.sos, x, chunk_size=3000, out=out)
+    assert y is out
+    np.testing.assert_allclose(out, filt.filtfilt(x), rtol=0.0, atol=1e-8 * np.max(np.abs(out)))
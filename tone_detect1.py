@@ -0,0 +1,185 @@
+#coding:utf-8
+
+#
+# tone detection at a set of frequencies: per frame magnitude by Goertzel (single frequency DFT)
+#
+#  the magnitude of frequency f in a frame is the DFT at f of the windowed last N samples,
+#     X = 2 / sum(w) * sum_n w[n] x[n] exp(-j 2 pi f n / sr)      (|X| is the amplitude of a steady tone at f)
+#  which is computed by
+#     'dft'      one matrix product of all frames (and channels) with the cos/sin kernel of all frequencies (default)
+#     'goertzel' the Goertzel recurrence s[n] = w[n] x[n] + 2 cos(w) s[n-1] - s[n-2], |X|^2 = s1^2 + s2^2 - 2 cos(w) s1 s2,
+#                vectorized over channels, frames and frequencies (a python loop over the N samples of the window)
+#  both give the same value, only the frames at hop are computed.
+#  bandwidth is mapped to Q of Class_BPF: the window length of every frequency is chosen so that its noise bandwidth
+#  (sr * sum(w^2) / sum(w)^2) is the noise bandwidth of Class_BPF(f, Q) (sr / 2 * sum(h^2), about pi / 2 * f / Q).
+#  then noise gives the same rms as the rms of Class_BPF(f, Q) output, and a steady tone at f gives the same amplitude.
+#     hann window  N = about 3 * Q * sr / (pi * f),   rectangular window  N = about 2 * Q * sr / (pi * f)
+#  near the peak the window is less selective than the band pass filter, but far from it (over 1.5 * f) much more.
+
+import numpy as np
+
+from iir_block1 import tdf2_state_space
+from BPF_bank import bpf1_batch
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+# noise bandwidth of windows [bins]
+window_enbw= {'hann': 1.5, 'rect': 1.0}
+
+def make_window(name, n):
+	if name == 'hann':
+		return np.hanning(n + 2)[1:-1]
+	return np.ones(n)
+
+
+def bpf_noise_bandwidth(freq, Q, sampling_rate=48000):
+	# noise bandwidth [Hz] of Class_BPF(freq, Q), sr / 2 * sum(h^2), from the state space (s = A s + B x, y = C s + D x):
+	# sum(h^2) = D^2 + C P C^T, P = A P A^T + B B^T
+	a, b = bpf1_batch(freq, 1.0, Q, sampling_rate)
+	A, B, C, D = tdf2_state_space(b, a)
+	m= A.shape[-1]
+	K= np.eye(m * m) - np.einsum('fij,fkl->fikjl', A, A).reshape(-1, m * m, m * m)
+	P= np.linalg.solve(K, (B @ np.swapaxes(B, -1, -2)).reshape(-1, m * m, 1)).reshape(-1, m, m)
+	return sampling_rate / 2.0 * (D[:, 0, 0] ** 2 + (C @ P @ np.swapaxes(C, -1, -2))[:, 0, 0])
+
+
+def window_length(freq, Q, sampling_rate=48000, window='hann'):
+	# window length [samples] of which noise bandwidth is the noise bandwidth of Class_BPF(freq, Q)
+	return np.maximum(np.round(window_enbw[window] * sampling_rate / bpf_noise_bandwidth(freq, Q, sampling_rate)).astype(int), 1)
+
+
+def equivalent_Q(freq, n, sampling_rate=48000, window='hann'):
+	# Q of Class_BPF of which noise bandwidth (pi / 2 * f / Q, bilinear warping is ignored) is the noise bandwidth of window length n
+	return np.pi * np.asarray(freq) * np.asarray(n) / (window_enbw[window] * 2.0 * sampling_rate)
+
+
+class Class_Tone_Detector(object):
+	def __init__(self, freqs, Q=10.0, frame=None, hop=1024, sampling_rate=48000, window='hann', dtype=np.float64):
+		# freqs: target frequencies [Hz]
+		# Q: scalar or array, bandwidth as Q of Class_BPF (window length of every frequency, see window_length)
+		# frame: if set, window length of all frequencies [samples], and Q_list is equivalent_Q(freqs, frame)
+		# hop: one value every hop samples. the value of frame k is of the window ending at sample (k+1) * hop
+		# window: 'hann' or 'rect'
+		# dtype: dtype of the computation and output, np.float64 or np.float32
+		self.freqs= np.atleast_1d(np.asarray(freqs, dtype=np.float64))
+		self.sr= sampling_rate
+		self.hop= int(hop)
+		self.dtype= np.dtype(dtype)
+		if window not in window_enbw:
+			raise ValueError('unknown window %r' % (window,))
+		self.window= window
+		if np.any(self.freqs <= 0.0) or np.any(self.freqs >= self.sr / 2):
+			raise ValueError('frequency must be 0 < f < sampling_rate / 2')
+		if frame is None:
+			if np.any(np.asarray(Q) <= 0.0):
+				raise ValueError('Q must be > 0')
+			self.N_list= window_length(self.freqs, Q, self.sr, window)
+			self.Q_list= np.broadcast_to(np.asarray(Q, dtype=np.float64), self.freqs.shape)
+		else:
+			self.N_list= np.full(self.freqs.shape, int(frame))
+			self.Q_list= equivalent_Q(self.freqs, self.N_list, self.sr, window)
+		self.length= int(max(self.N_list.max(), self.hop))  # length of buffer of one frame
+		
+		# every window is at the end of the buffer
+		F= len(self.freqs)
+		self.W= np.zeros((self.length, F))
+		for i, n in enumerate(self.N_list):
+			w= make_window(window, n)
+			self.W[self.length - n:, i]= w * 2.0 / np.sum(w)
+		t= np.arange(self.length)
+		wt= 2.0 * np.pi * self.freqs / self.sr
+		self.kernel= np.concatenate([self.W * np.cos(wt * t[:, None]), -self.W * np.sin(wt * t[:, None])], axis=1).astype(self.dtype)
+		self.coef= 2.0 * np.cos(wt)
+		self.reset()
+		
+	def reset(self,):
+		# clear the state of process_block
+		self.state= None
+		
+	def init_state(self, lead):
+		# samples before the next frame, zeros before the start
+		return {'buf': np.zeros(lead + (self.length - self.hop,), dtype=self.dtype)}
+		
+	def frames(self, xin, mode='amplitude', method='dft', state=None, chunk_size=2**22):
+		# values of all frequencies in every frame
+		# mode 'amplitude' |X|, 'rms' |X| / sqrt(2) (same as rms of Class_BPF output), 'power' |X|^2 / 2
+		# method 'dft' or 'goertzel'
+		# state: None (start from zeros), or the state returned by the previous call (streaming)
+		# return values shape (freqs, frames) or (channels, freqs, frames), and state
+		if mode not in ('amplitude', 'rms', 'power'):
+			raise ValueError('unknown mode %r' % (mode,))
+		if method not in ('dft', 'goertzel'):
+			raise ValueError('unknown method %r' % (method,))
+		x= np.asarray(xin, dtype=self.dtype)
+		lead= x.shape[:-1]
+		if state is None:
+			state= self.init_state(lead)
+		buf= np.concatenate([state['buf'], x], axis=-1)
+		K= max((buf.shape[-1] - self.length) // self.hop + 1, 0)
+		state['buf']= buf[..., K * self.hop:]
+		F= len(self.freqs)
+		power= np.empty(lead + (K, F), dtype=self.dtype)  # |X|^2
+		if K > 0:
+			segments= np.lib.stride_tricks.sliding_window_view(buf, self.length, axis=-1)[..., ::self.hop, :][..., :K, :]
+			if method == 'dft':
+				kc= max(1, chunk_size // (self.length * max(int(np.prod(lead)), 1)))  # frames per chunk
+				for k0 in range(0, K, kc):
+					k1= min(k0 + kc, K)
+					y= segments[..., k0:k1, :] @ self.kernel
+					power[..., k0:k1, :]= y[..., :F] ** 2 + y[..., F:] ** 2
+			else:
+				s1= np.zeros(lead + (K, F), dtype=self.dtype)
+				s2= np.zeros(lead + (K, F), dtype=self.dtype)
+				c= self.coef.astype(self.dtype)
+				W= self.W.astype(self.dtype)
+				for n in range(self.length - self.N_list.max(), self.length):
+					s0= segments[..., n, None] * W[n] + c * s1 - s2
+					s2= s1
+					s1= s0
+				power[...]= s1 * s1 + s2 * s2 - c * s1 * s2
+		values= np.swapaxes(power, -1, -2)
+		if mode == 'amplitude':
+			values= np.sqrt(np.maximum(values, 0.0))
+		elif mode == 'rms':
+			values= np.sqrt(np.maximum(values, 0.0) / 2.0)
+		else:
+			values= values / 2.0
+		return values, state
+		
+	def detect(self, xin, mode='amplitude', method='dft'):
+		# values of all frequencies in every frame, see frames()
+		# xin shape (samples,) or multichannel (channels, samples), the samples after the last full hop are ignored
+		values, state = self.frames(xin, mode=mode, method=method)
+		return values # output shape (freqs, len(xin) // hop) or (channels, freqs, frames)
+		
+	def process_block(self, xin, mode='amplitude', method='dft'):
+		# streaming values of all frequencies, see frames()
+		# the samples of unfinished frames are carried over to the next call
+		values, self.state = self.frames(xin, mode=mode, method=method, state=self.state)
+		return values
+		
+	def response(self, freq):
+		# amplitude of every frequency for a steady tone of amplitude 1 at freq (cosine, phase 0), shape (freqs, len(freq))
+		freq= np.asarray(freq, dtype=np.float64)
+		t= np.arange(self.length)
+		tone= np.cos(2.0 * np.pi * np.outer(freq, t) / self.sr)
+		return np.abs(tone @ (self.W * np.exp(-2j * np.pi * self.freqs * t[:, None] / self.sr))).T
+
+
+if __name__ == '__main__':
+	
+	from BPF import Class_BPF
+	# 1000Hz tone with noise: detector and rms of Class_BPF(fc=1000, Q=10) output in frames of 1024 samples
+	sr= 48000
+	x= np.sin(2.0 * np.pi * 1000.0 * np.arange(sr) / sr) * 0.5 + np.random.RandomState(0).standard_normal(sr) * 0.1
+	detector= Class_Tone_Detector([500.0, 1000.0, 2000.0], Q=10.0, hop=1024, sampling_rate=sr)
+	bpf_rms= [np.sqrt(np.mean(Class_BPF(fc=f, Q=10.0, sampling_rate=sr).filtering(x)[:46 * 1024].reshape(46, 1024) ** 2, axis=-1)) for f in detector.freqs]
+	print ('window length', detector.N_list, 'equivalent Q', np.round(detector.Q_list, 2))
+	print ('detector rms', np.round(np.median(detector.detect(x, mode='rms'), axis=-1), 4))
+	print ('Class_BPF rms', np.round(np.median(bpf_rms, axis=-1), 4))
+	
+#This file uses TAB
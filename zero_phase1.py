@@ -0,0 +1,131 @@
+#coding:utf-8
+
+#
+# zero phase (forward and backward) filtering, one-shot and chunked
+#
+#  one-shot is scipy.signal.sosfiltfilt: the input is extended at both ends by odd extension of padlen samples,
+#  the forward pass starts from the steady state of the first extended sample, and the backward pass from the steady state
+#  of the last forward output.
+#  chunked gives the same result chunk by chunk, with memory of about chunk_size + overlap samples per channel:
+#    the forward pass is streaming (state carried over), so it is exact.
+#    the backward pass of a chunk starts overlap samples after the chunk end, from the steady state of the forward
+#    output there. the error of the start decays as (max pole radius) ** overlap, so overlap is chosen from the
+#    pole radius (decay_length). the last chunk starts from the real end, so it is exact as sosfiltfilt.
+#  Zero_phase_mixin1 gives filtfilt and filtfilt_chunks to the filter classes.
+
+import numpy as np
+from scipy import signal
+
+# Check version
+#  Python 3.11
+#  numpy 2.4
+#  scipy 1.17
+
+
+def ba_to_sos(b, a):
+    # (b, a) to second-order sections, for zero phase filtering of (b, a) filter classes
+    return signal.tf2sos(np.asarray(b, dtype=np.float64), np.asarray(a, dtype=np.float64))
+
+
+def sos_padlen(sos):
+    # default padlen of scipy.signal.sosfiltfilt
+    sos= np.asarray(sos)
+    return 3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum()))
+
+
+def decay_length(sos, tol=1e-9, max_length=2**22):
+    # number of samples, until the zero input response decays to tol (by the max pole radius)
+    r= max(np.max(np.abs(np.roots(section[3:]))) for section in np.asarray(sos, dtype=np.float64))
+    if r <= 0.0:
+        return 1
+    if r >= 1.0:
+        return max_length
+    return int(min(max_length, np.ceil(np.log(tol) / np.log(r))))
+
+
+def sosfiltfilt_chunks(sos, x_in, chunk_size=2**16, overlap=None, dtype=np.float64):
+    # generator of zero phase output along the last axis, chunk_size samples per chunk
+    # x_in shape (samples,) or (channels, samples), it may be memory-mapped. it is read chunk by chunk
+    # overlap: length of backward pass after the chunk. if None, decay_length(sos)
+    dtype= np.dtype(dtype)
+    sos= np.array(sos, dtype=dtype)
+    n= x_in.shape[-1]
+    p= sos_padlen(sos)
+    if n <= p:
+        raise ValueError('the length of the input must be over padlen %d' % p)
+    L= decay_length(sos) if overlap is None else int(overlap)
+    lead= x_in.shape[:-1]
+    zi0= signal.sosfilt_zi(sos).astype(dtype).reshape((len(sos),) + (1,) * len(lead) + (2,))
+
+    def ext(a, b):
+        # samples [a, b) of the odd extended input, index 0 is p samples before x_in[0]
+        parts= []
+        if a < p:
+            j= np.arange(a, min(b, p))
+            parts.append(2 * x0 - np.asarray(x_in[..., p - j], dtype=dtype))
+        if b > p and a < n + p:
+            parts.append(np.asarray(x_in[..., max(a, p) - p:min(b, n + p) - p], dtype=dtype))
+        if b > n + p:
+            j= np.arange(max(a, n + p), b)
+            parts.append(2 * x1 - np.asarray(x_in[..., 2 * n + p - 2 - j], dtype=dtype))
+        return np.concatenate(parts, axis=-1)
+
+    x0= np.asarray(x_in[..., 0:1], dtype=dtype)
+    x1= np.asarray(x_in[..., n - 1:n], dtype=dtype)
+    # forward output buffer yf[..., k] is at extended index start + k
+    head= ext(0, p)
+    yf, zf = signal.sosfilt(sos, head, zi=zi0 * head[..., 0:1])
+    start= 0
+    for s in range(0, n, chunk_size):
+        e= min(s + chunk_size, n)
+        need= min(e + L, n) + p if e + L < n else n + 2 * p  # extended index end of backward pass
+        if start + yf.shape[-1] < need:
+            y, zf = signal.sosfilt(sos, ext(start + yf.shape[-1], need), zi=zf)
+            yf= np.concatenate([yf, y], axis=-1)
+        # backward pass from need to s + p, from the steady state of the forward output at need - 1
+        seg= yf[..., s + p - start:need - start]
+        last= seg[..., -1:]
+        yb, zb = signal.sosfilt(sos, seg[..., ::-1], zi=zi0 * last)
+        yield yb[..., ::-1][..., :e - s]
+        yf= yf[..., e + p - start:]
+        start= e + p
+
+
+def sosfiltfilt_chunked(sos, x_in, chunk_size=2**16, overlap=None, dtype=np.float64, out=None):
+    # zero phase filtering of x_in by chunks, see sosfiltfilt_chunks
+    # out: output array shape x_in.shape (it may be memory-mapped). if None, it is allocated
+    if out is None:
+        out= np.empty(x_in.shape, dtype=dtype)
+    s= 0
+    for y in sosfiltfilt_chunks(sos, x_in, chunk_size=chunk_size, overlap=overlap, dtype=dtype):
+        out[..., s:s + y.shape[-1]]= y
+        s += y.shape[-1]
+    return out
+
+
+class Zero_phase_mixin1(object):
+    # filtfilt and filtfilt_chunks of a filter class, by its second-order sections
+    # the class has sos, or (b, a) that is converted by ba_to_sos, and dtype of filtering
+    def zero_phase_sos(self,):
+        sos= getattr(self, 'sos', None)
+        return ba_to_sos(self.b, self.a) if sos is None else sos
+
+    def filtfilt(self, xin, axis=-1):
+        # zero phase filtering, forward and backward, with the edge handling of scipy sosfiltfilt
+        return signal.sosfiltfilt(self.zero_phase_sos().astype(self.dtype), np.asarray(xin, dtype=self.dtype), axis=axis)
+
+    def filtfilt_chunks(self, xin, chunk_size=2**16, overlap=None):
+        # generator of zero phase output by chunks along the last axis, memory is about chunk_size + overlap samples
+        # same as filtfilt within (max pole radius) ** overlap
+        return sosfiltfilt_chunks(self.zero_phase_sos(), xin, chunk_size=chunk_size, overlap=overlap, dtype=self.dtype)
+
+
+if __name__ == '__main__':
+
+    # compare with sosfiltfilt
+    sos= signal.iirfilter(4, 100, btype='lowpass', ftype='butter', fs=48000, output='sos')
+    x= np.random.RandomState(0).standard_normal((2, 48000 * 5))
+    y0= signal.sosfiltfilt(sos, x)
+    for overlap in [None, 1000, 4000]:
+        y1= sosfiltfilt_chunked(sos, x, chunk_size=10000, overlap=overlap)
+        print ('overlap', decay_length(sos) if overlap is None else overlap, 'max error / max output %.2e' % (np.max(np.abs(y1 - y0)) / np.max(np.abs(y0))))